@@ -0,0 +1,79 @@
+"""
+Painted row action buttons for table views.
+
+ActionButtonsDelegate draws a row of rounded buttons in one column and
+reports clicks as (row, button index), so a table of thousands of rows
+needs no per-row QWidget/QPushButton objects. Enable mouse tracking on the
+view for the hover colour.
+"""
+
+from PyQt5.QtCore import QEvent, QRect, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate
+
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """Paints action buttons and emits clicked(row, button) when one is pressed"""
+
+    clicked = pyqtSignal(int, int)
+
+    BUTTON_WIDTH = 64
+    BUTTON_HEIGHT = 28
+    SPACING = 6
+
+    def __init__(self, buttons, parent=None):
+        """buttons: (label, background, hover background) per button"""
+        super().__init__(parent)
+        self.buttons = [(label, QColor(background), QColor(hover)) for label, background, hover in buttons]
+        self._hover = None   # (row, button index)
+
+    def button_rects(self, cell):
+        total = len(self.buttons) * self.BUTTON_WIDTH + (len(self.buttons) - 1) * self.SPACING
+        left = cell.left() + max(0, (cell.width() - total) // 2)
+        top = cell.top() + max(0, (cell.height() - self.BUTTON_HEIGHT) // 2)
+        return [QRect(left + i * (self.BUTTON_WIDTH + self.SPACING), top, self.BUTTON_WIDTH, self.BUTTON_HEIGHT)
+                for i in range(len(self.buttons))]
+
+    def button_at(self, cell, pos):
+        for i, rect in enumerate(self.button_rects(cell)):
+            if rect.contains(pos):
+                return i
+        return None
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        font = QFont(option.font)
+        font.setPointSize(9)
+        font.setWeight(QFont.DemiBold)
+        painter.setFont(font)
+        for i, rect in enumerate(self.button_rects(option.rect)):
+            label, background, hover = self.buttons[i]
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(hover if self._hover == (index.row(), i) else background)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(Qt.white)
+            painter.drawText(rect, Qt.AlignCenter, label)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setWidth(len(self.buttons) * (self.BUTTON_WIDTH + self.SPACING) + self.SPACING)
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove:
+            button = self.button_at(option.rect, event.pos())
+            hover = (index.row(), button) if button is not None else None
+            if hover != self._hover:
+                self._hover = hover
+                if self.parent() is not None:
+                    self.parent().viewport().update()
+        elif event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            button = self.button_at(option.rect, event.pos())
+            if button is not None:
+                self.clicked.emit(index.row(), button)
+                return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,210 @@
+"""
+Process-local barcode -> product index for scan-to-cart.
+
+The POS loads every product with a barcode once and answers scans from a
+dict. Freshness comes from row versions: triggers on products stamp every
+inserted or updated row with the server clock in microseconds
+(products.row_version) and log deletions with their time in
+product_deletions. A catalog read is versioned with the clock at the time
+of the read, and a refresh reads only the rows stamped since.
+
+The triggers only touch the row being written, so concurrent checkouts
+never queue on a shared counter row. A stamp is taken when the statement
+runs but only becomes visible at commit; a refresh therefore re-reads the
+last CHANGE_OVERLAP_US before its version, so a transaction that commits
+late is still picked up (rows already applied are applied again, harmlessly).
+
+Without the triggers (no TRIGGER privilege) nothing is stamped; the index
+then reloads in full every FALLBACK_RELOAD_SECONDS instead.
+"""
+
+import time
+
+PRODUCT_COLUMNS = 'id, name, code_bar, price_buy, price_sell, quantity, category'
+FALLBACK_RELOAD_SECONDS = 60
+CHANGE_OVERLAP_US = 5_000_000     # longest a product write may wait for its commit and still be seen
+
+# Microseconds since the epoch on the server clock, whatever the session time zone
+CATALOG_CLOCK = "TIMESTAMPDIFF(MICROSECOND, '1970-01-01', UTC_TIMESTAMP(6))"
+
+CATALOG_TRIGGERS = {
+    'products_version_insert': f'''
+        CREATE TRIGGER products_version_insert BEFORE INSERT ON products FOR EACH ROW
+        SET NEW.row_version = {CATALOG_CLOCK}''',
+    'products_version_update': f'''
+        CREATE TRIGGER products_version_update BEFORE UPDATE ON products FOR EACH ROW
+        SET NEW.row_version = {CATALOG_CLOCK}''',
+    'products_version_delete': f'''
+        CREATE TRIGGER products_version_delete AFTER DELETE ON products FOR EACH ROW
+        INSERT INTO product_deletions (product_id, version) VALUES (OLD.id, {CATALOG_CLOCK})''',
+}
+
+
+def ensure_catalog_versioning(cursor):
+    """Row versions, deletion log and the triggers maintaining them"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_deletions (
+            product_id INT NOT NULL,
+            version BIGINT NOT NULL,
+            INDEX idx_product_deletions_version (version)
+        )
+    ''')
+
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'products' AND column_name = 'row_version'
+    ''')
+    if not cursor.fetchone()[0]:
+        cursor.execute('ALTER TABLE products ADD COLUMN row_version BIGINT NOT NULL DEFAULT 0')
+        cursor.execute('CREATE INDEX idx_products_row_version ON products (row_version)')
+
+    # Versions used to come from a single counter row every product write locked
+    cursor.execute('DROP TABLE IF EXISTS catalog_version')
+
+    try:
+        for name, ddl in CATALOG_TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(ddl)
+    except Exception as e:
+        print(f"Catalog version triggers not created ({e}); "
+              f"barcode indexes will reload every {FALLBACK_RELOAD_SECONDS}s instead")
+
+
+def catalog_version(cursor):
+    """Version of a catalog read starting now: the server clock in microseconds"""
+    cursor.execute(f'SELECT {CATALOG_CLOCK}')
+    return cursor.fetchone()[0]
+
+
+def _triggers_installed(cursor):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.triggers
+        WHERE trigger_schema = DATABASE() AND event_object_table = 'products'
+          AND trigger_name IN (%s, %s, %s)
+    ''', tuple(CATALOG_TRIGGERS))
+    return cursor.fetchone()[0] == len(CATALOG_TRIGGERS)
+
+
+def fetch_catalog(cursor, barcodes_only=True):
+    """Everything BarcodeIndex.apply needs for a full load (every product, in name order, without barcodes_only)"""
+    version = catalog_version(cursor)
+    versioned = _triggers_installed(cursor)
+    if barcodes_only:
+        cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products WHERE code_bar IS NOT NULL')
+    else:
+        cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY name')
+    return {'full': True, 'version': version, 'versioned': versioned,
+            'rows': cursor.fetchall(), 'deleted': []}
+
+
+def fetch_changes(cursor, since):
+    """Rows changed and products deleted after catalog version since; None if nothing moved"""
+    version = catalog_version(cursor)
+    after = since - CHANGE_OVERLAP_US
+    cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products WHERE row_version > %s', (after,))
+    rows = cursor.fetchall()
+    cursor.execute('SELECT product_id FROM product_deletions WHERE version > %s', (after,))
+    deleted = [row[0] for row in cursor.fetchall()]
+    if not rows and not deleted:
+        return None
+    return {'full': False, 'version': version, 'versioned': True, 'rows': rows, 'deleted': deleted}
+
+
+class BarcodeIndex:
+    """Barcode -> product tuple (PRODUCT_COLUMNS order) with hit/miss/stale counters
+
+    Reads and applies are meant for the GUI thread; the fetch_* functions
+    above are the part that touches the database and can run on a worker.
+    """
+
+    def __init__(self):
+        self._by_code = {}
+        self._code_of = {}       # product id -> barcode currently indexed
+        self.version = None
+        self.versioned = False
+        self.loaded_at = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0           # refreshes that found the catalog had moved on
+        self.lookup_ns = 0
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def load(self, cursor):
+        """Synchronous full load on the caller's connection"""
+        self.apply(fetch_catalog(cursor))
+
+    def refresh(self, cursor):
+        """Synchronous refresh; returns True if anything changed"""
+        changes = self.pending_changes(cursor)
+        if changes is None:
+            return False
+        self.apply(changes)
+        return True
+
+    def pending_changes(self, cursor):
+        """Fetch whatever refresh() would apply (for running on a worker thread)"""
+        if not self.loaded or self.needs_reload():
+            return fetch_catalog(cursor)
+        if not self.versioned:
+            return None
+        return fetch_changes(cursor, self.version)
+
+    def needs_reload(self):
+        return (not self.versioned and self.loaded_at is not None
+                and time.monotonic() - self.loaded_at >= FALLBACK_RELOAD_SECONDS)
+
+    def apply(self, changes):
+        """Apply the result of fetch_catalog/fetch_changes; None means up to date"""
+        if changes is None:
+            return
+        if changes['full']:
+            self._by_code = {}
+            self._code_of = {}
+            self.loaded_at = time.monotonic()
+        else:
+            self.stale += 1
+        for product_id in changes['deleted']:
+            self._remove(product_id)
+        for product in changes['rows']:
+            self._remove(product[0])
+            code = (product[2] or '').strip()
+            if code:
+                self._by_code[code] = product
+                self._code_of[product[0]] = code
+        self.version = changes['version']
+        self.versioned = changes['versioned']
+
+    def _remove(self, product_id):
+        code = self._code_of.pop(product_id, None)
+        if code is not None and self._by_code.get(code, (None,))[0] == product_id:
+            del self._by_code[code]
+
+    def lookup(self, code):
+        """Product tuple for a scanned barcode, or None"""
+        started = time.perf_counter_ns()
+        product = self._by_code.get(code.strip())
+        self.lookup_ns += time.perf_counter_ns() - started
+        if product is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return product
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'products': len(self._by_code),
+            'version': self.version,
+            'versioned': self.versioned,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'avg_lookup_us': self.lookup_ns / lookups / 1000 if lookups else 0.0,
+        }
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Catalog snapshot: cold-start load time against the 1 s target.
+
+Writes a snapshot of a synthetic catalog (or of the configured database
+with --db) to a scratch file, then times loading it back the way the POS
+does at launch, and merging a small delta:
+
+    python benchmarks/catalog_snapshot_bench.py [--products 50000] [--db]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_snapshot import CatalogSnapshot
+from product_search_bench import database_catalog, synthetic_catalog
+
+TARGET_MS = 1000
+
+
+def timed(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog snapshot load benchmark")
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--db', action='store_true', help="Snapshot the configured database instead")
+    args = parser.parse_args()
+
+    rows = database_catalog() if args.db else synthetic_catalog(args.products)
+    snapshot = CatalogSnapshot.from_changes({'full': True, 'version': 1, 'versioned': True, 'rows': rows})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.snap')
+        save_ms, _ = timed(lambda: snapshot.save(path))
+        load_ms, loaded = timed(lambda: CatalogSnapshot.load(path))
+        assert loaded.products == snapshot.products
+
+        changed = [row[:5] + (row[5] - 1,) + row[6:] for row in snapshot.products[:100]]
+        delta = {'full': False, 'version': 2, 'versioned': True, 'rows': changed, 'deleted': []}
+        merge_ms, _ = timed(lambda: loaded.merge(delta).save(path))
+
+        print(f"{len(snapshot):,} products, {os.path.getsize(path) / 1024:,.0f} KiB on disk")
+    print(f"save {save_ms:8.1f} ms")
+    print(f"load {load_ms:8.1f} ms")
+    print(f"merge 100 changes and save {merge_ms:8.1f} ms")
+    met = load_ms <= TARGET_MS
+    print(f"target {TARGET_MS} ms: {'met' if met else 'MISSED'}")
+    return 0 if met else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
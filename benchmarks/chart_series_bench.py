@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Dashboard chart: per-bucket queries vs one grouped series query.
+
+Runs both strategies against the configured MySQL database and reports
+round trips and wall time per refresh:
+
+    python benchmarks/chart_series_bench.py [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_ranges import day_range, last_days_range
+from mysql_config import MySQLConnectionManager
+from sales_series import sales_series
+
+
+class CountingCursor:
+    """Cursor proxy counting execute() calls (one round trip each)"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.round_trips = 0
+
+    def execute(self, *args, **kwargs):
+        self.round_trips += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def legacy_chart(cursor, period):
+    """The pre-series implementation: one SUM query per bucket"""
+    if period == "Today":
+        start = day_range().start
+        buckets = [(start + timedelta(hours=h), timedelta(hours=1)) for h in range(24)]
+    else:
+        start = last_days_range(7).start
+        buckets = [(start + timedelta(days=d), timedelta(days=1)) for d in range(7)]
+    data = []
+    for bucket_start, width in buckets:
+        cursor.execute("""
+            SELECT COALESCE(SUM(total_price), 0)
+            FROM tickets
+            WHERE date >= %s AND date < %s
+        """, (bucket_start, bucket_start + width))
+        data.append(cursor.fetchone()[0])
+    return data
+
+
+def series_chart(cursor, period):
+    if period == "Today":
+        return [p.total for p in sales_series(cursor, day_range(), 'hour')]
+    return [p.total for p in sales_series(cursor, last_days_range(7), 'day')]
+
+
+def measure(strategy, cursor, period, repeat):
+    counting = CountingCursor(cursor)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        strategy(counting, period)
+    elapsed = time.perf_counter() - started
+    return counting.round_trips / repeat, elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with MySQLConnectionManager() as (cursor, conn):
+        print(f"{'view':<12} {'strategy':<10} {'round trips':>12} {'ms/refresh':>12}")
+        for period in ("Today", "This Week"):
+            for name, strategy in (("legacy", legacy_chart), ("series", series_chart)):
+                trips, ms = measure(strategy, cursor, period, args.repeat)
+                print(f"{period:<12} {name:<10} {trips:>12.0f} {ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
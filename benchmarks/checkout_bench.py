@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Checkout: p50/p99 latency of one sale for 1, 10 and 50-line carts.
+
+Compares checkout_service.checkout (fixed statement count, one transaction)
+with the previous per-line loop (COUNT(*) numbering, one stock UPDATE per
+line). Sales are really written, so the database name must contain "bench":
+
+    MYSQL_DATABASE=pos_bench python benchmarks/checkout_bench.py [--sales 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkout_service import checkout
+from mysql_config import MySQLConnectionManager, get_mysql_config
+from sales_ledger import record_sale_lines, ticket_items
+
+CART_SIZES = (1, 10, 50)
+
+
+def legacy_checkout(cursor, cart_items, total):
+    """The N+2 round-trip checkout this benchmark is measured against"""
+    cursor.execute('SELECT COUNT(*) FROM tickets')
+    ticket_number = f"LEG{cursor.fetchone()[0] + 1:09d}-{random.randrange(10 ** 6)}"
+    sale_date = datetime.now()
+    cursor.execute('''
+        INSERT INTO tickets (ticket_number, date, total_price, remis, payment_method, customer_name, items, status, cashier_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ''', (ticket_number, sale_date, total, 0, 'Cash', 'Walk-in Customer',
+          json.dumps(ticket_items(cart_items)), 'Completed', 1))
+    record_sale_lines(cursor, cursor.lastrowid, sale_date, cart_items)
+    for item in cart_items:
+        cursor.execute('UPDATE products SET quantity = quantity - %s WHERE id = %s',
+                       (item['quantity'], item['id']))
+
+
+def service_checkout(cursor, cart_items, total):
+    checkout(cursor, cart_items, total, customer='Walk-in Customer')
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run(fn, products, size, sales):
+    samples = []
+    for _ in range(sales):
+        cart = [{'id': product_id, 'name': name, 'quantity': 1, 'price': float(price)}
+                for product_id, name, price in random.sample(products, size)]
+        total = sum(item['price'] for item in cart)
+        started = time.perf_counter()
+        with MySQLConnectionManager() as (cursor, conn):
+            fn(cursor, cart, total)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return percentile(samples, 0.5), percentile(samples, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkout latency benchmark")
+    parser.add_argument('--sales', type=int, default=200, help="Sales per cart size and variant")
+    args = parser.parse_args()
+
+    database = get_mysql_config()['database']
+    if 'bench' not in database:
+        sys.exit(f"Refusing to write sales to '{database}': use a database whose name contains 'bench'")
+
+    with MySQLConnectionManager() as (cursor, conn):
+        cursor.execute('SELECT id, name, price_sell FROM products LIMIT 1000')
+        products = cursor.fetchall()
+        if len(products) < max(CART_SIZES):
+            sys.exit(f"Need at least {max(CART_SIZES)} products; run database_setup.py and add some first")
+        # Enough stock that the not-below-zero guard never trips mid-run
+        cursor.execute('UPDATE products SET quantity = 1000000')
+
+    print(f"{'variant':<10} {'lines':>5} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in CART_SIZES:
+        for name, fn in (("legacy", legacy_checkout), ("service", service_checkout)):
+            p50, p99 = run(fn, products, size, args.sales)
+            print(f"{name:<10} {size:>5} {p50:>8.2f} {p99:>8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
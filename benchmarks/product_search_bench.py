@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+POS product search: per-keystroke latency of the in-memory index.
+
+Builds a synthetic catalog (or loads the configured database with --db),
+then replays typing of a few queries one character at a time and reports
+the slowest keystroke against the 5 ms target:
+
+    python benchmarks/product_search_bench.py [--products 50000] [--db]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_search import ProductSearchIndex
+
+TARGET_MS = 5.0
+QUERIES = ["coca cola", "lait", "6130", "حليب", "chocolat noir", "eau min", "zz"]
+
+WORDS = ["Coca", "Cola", "Pepsi", "Fanta", "Lait", "Café", "Thé", "Chocolat", "Noir", "Blanc",
+         "Eau", "Minérale", "Jus", "Orange", "Pomme", "Biscuit", "Fromage", "Yaourt", "Pain", "Huile",
+         "حليب", "قهوة", "شاي", "ماء", "عصير", "خبز", "زيت", "سكر", "أرز", "جبن"]
+CATEGORIES = ["Beverages", "Dairy", "Snacks", "Bakery", "Grocery", "مشروبات", "ألبان"]
+
+
+def synthetic_catalog(count, seed=1):
+    rng = random.Random(seed)
+    return [(i, " ".join(rng.sample(WORDS, rng.randint(2, 4))) + f" {rng.choice([250, 500, 1000, 1500])}g",
+             f"613{rng.randrange(10 ** 10):010d}", 0, 0, 0, rng.choice(CATEGORIES))
+            for i in range(1, count + 1)]
+
+
+def database_catalog():
+    from mysql_config import MySQLConnectionManager
+    with MySQLConnectionManager() as (cursor, conn):
+        cursor.execute('SELECT id, name, code_bar, price_buy, price_sell, quantity, category FROM products')
+        return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product search latency benchmark")
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--db', action='store_true', help="Index the configured database instead")
+    args = parser.parse_args()
+
+    products = database_catalog() if args.db else synthetic_catalog(args.products)
+    started = time.perf_counter()
+    index = ProductSearchIndex(products)
+    print(f"indexed {len(index):,} products in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    worst = 0.0
+    print(f"{'query':<16} {'results':>8} {'max ms/key':>11} {'total ms':>9}")
+    for query in QUERIES:
+        timings = []
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            results = index.search(query[:end])
+            timings.append((time.perf_counter() - started) * 1000)
+        worst = max(worst, max(timings))
+        print(f"{query:<16} {len(results):>8} {max(timings):>11.2f} {sum(timings):>9.2f}")
+
+    print(f"slowest keystroke {worst:.2f} ms, target {TARGET_MS:.0f} ms: {'met' if worst <= TARGET_MS else 'MISSED'}")
+    return 0 if worst <= TARGET_MS else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Reports: end-to-end latency of the four sections, sequential vs parallel.
+
+Target: all four sections of a 90-day range in under TARGET_MS on a
+1M-ticket database. Seed a scratch database first (its name must contain
+"bench" so production data is never touched):
+
+    MYSQL_DATABASE=pos_bench python benchmarks/reports_bench.py --seed 1000000
+    MYSQL_DATABASE=pos_bench python benchmarks/reports_bench.py --days 90
+
+Exits with status 1 when the parallel load misses the target.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_ranges import last_days_range
+from mysql_config import MySQLConnectionManager, get_mysql_config
+from reports_widget import REPORT_SECTIONS, ReportsWidget
+from sales_ledger import INSERT_SALE_LINE
+
+TARGET_MS = 1500
+
+
+def fetch_section(section, period):
+    with MySQLConnectionManager() as (cursor, conn):
+        return getattr(ReportsWidget, f"fetch_{section}")(cursor, period)
+
+
+def run_sequential(period):
+    with MySQLConnectionManager() as (cursor, conn):
+        for section in REPORT_SECTIONS:
+            getattr(ReportsWidget, f"fetch_{section}")(cursor, period)
+
+
+def run_parallel(period):
+    with ThreadPoolExecutor(max_workers=len(REPORT_SECTIONS)) as executor:
+        list(executor.map(lambda section: fetch_section(section, period), REPORT_SECTIONS))
+
+
+def timed(fn, period, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(period)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[-1]
+
+
+def seed(tickets, batch=5000):
+    """Insert synthetic tickets and sale lines spread over the last year"""
+    database = get_mysql_config()['database']
+    if 'bench' not in database:
+        sys.exit(f"Refusing to seed '{database}': use a database whose name contains 'bench'")
+
+    customers = ['Walk-in Customer'] * 8 + [f"Customer {i}" for i in range(2000)]
+    now = datetime.now()
+    with MySQLConnectionManager() as (cursor, conn):
+        cursor.execute('SELECT id, name, price_sell FROM products')
+        products = cursor.fetchall()
+        if not products:
+            sys.exit("Seed needs products; run database_setup.py on the bench database first")
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM tickets')
+        next_id = cursor.fetchone()[0] + 1
+
+        for offset in range(0, tickets, batch):
+            ticket_rows, line_rows = [], []
+            for ticket_id in range(next_id + offset, next_id + min(offset + batch, tickets)):
+                date = now - timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+                total = 0.0
+                for product_id, name, price in random.sample(products, min(len(products), random.randint(1, 5))):
+                    quantity = random.randint(1, 4)
+                    line_total = float(price) * quantity
+                    total += line_total
+                    line_rows.append((ticket_id, product_id, name, quantity, price, line_total, date))
+                ticket_rows.append((ticket_id, f"BENCH{ticket_id:09d}", date, total, 0, 'Cash',
+                                    random.choice(customers), '[]', 'Completed', 1))
+            cursor.executemany('''
+                INSERT INTO tickets (id, ticket_number, date, total_price, remis, payment_method,
+                                     customer_name, items, status, cashier_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ''', ticket_rows)
+            cursor.executemany(INSERT_SALE_LINE, line_rows)
+            conn.commit()
+            print(f"  {offset + len(ticket_rows):,} / {tickets:,} tickets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report section latency benchmark")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS)
+    parser.add_argument('--seed', type=int, metavar='TICKETS', help="Insert synthetic tickets first")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+
+    period = last_days_range(args.days)
+    with MySQLConnectionManager() as (cursor, conn):
+        cursor.execute('SELECT COUNT(*) FROM tickets')
+        print(f"{cursor.fetchone()[0]:,} tickets, range {period.start:%Y-%m-%d} .. {period.end:%Y-%m-%d}")
+
+    medians = {}
+    for name, fn in (("sequential", run_sequential), ("parallel", run_parallel)):
+        medians[name], worst = timed(fn, period, args.repeat)
+        print(f"{name:<12} median {medians[name]:8.1f} ms   max {worst:8.1f} ms")
+
+    met = medians["parallel"] <= args.target_ms
+    print(f"target {args.target_ms:.0f} ms: {'met' if met else 'MISSED'}")
+    return 0 if met else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
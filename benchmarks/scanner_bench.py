@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Camera scanner: replay synthetic or recorded video through both scanner setups.
+
+Each scenario is a clip of one symbology (EAN13, CODE128, QR) under one
+distortion (clean, blur, glare, rotation), held in front of the camera
+--presentations times with a pause longer than the debounce in between. The
+clip is played at camera speed through a fake cv2.VideoCapture source into
+the scanner as POSWidget builds it (CameraPipeline) and as barcode_utils
+does (BarcodeScanner), and reports:
+
+    decode      share of code frames the decoder reads (decoded offline, one thread)
+    first       ms from the code appearing to barcode_scanned
+    repeats     barcode_scanned beyond one per presentation (debounce leaks)
+    cpu/frame   process CPU time per captured frame, all pipeline threads
+
+pyzbar is used when installed, otherwise an OpenCV decoder that reads EAN/UPC
+and QR but not CODE128 (those scenarios are then skipped). Runs headless:
+
+    python benchmarks/scanner_bench.py [--fps 30] [--json results.json]
+    python benchmarks/scanner_bench.py --video lane3.mp4 --expect 5901234123457
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+from camera_pipeline import CameraPipeline, decode_gray, load_camera_stack, to_decode_gray
+
+SYMBOLOGIES = ('EAN13', 'CODE128', 'QRCODE')
+DISTORTIONS = ('clean', 'blur', 'glare', 'rotation')
+PAYLOADS = {'EAN13': '590123412345', 'CODE128': 'LKS-000123', 'QRCODE': 'LKS-POS:PRODUCT:42'}
+BACKGROUND = 170
+DRAIN_SECONDS = 0.5            # after the last frame, for decodes still in flight
+
+EAN_L = ['0001101', '0011001', '0010011', '0111101', '0100011', '0110001', '0101111', '0111011', '0110111', '0001011']
+EAN_G = ['0100111', '0110011', '0011011', '0100001', '0011101', '0111001', '0000101', '0010001', '0001001', '0010111']
+EAN_R = ['1110010', '1100110', '1101100', '1000010', '1011100', '1001110', '1010000', '1000100', '1001000', '1110100']
+EAN_PARITY = ['LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG', 'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL']
+
+# Bar/space widths of Code 128 symbols 0-105, then the stop pattern
+CODE128 = ('212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 221312 231212 112232 122132 '
+           '122231 113222 123122 123221 223211 221132 221231 213212 223112 312131 311222 321122 321221 312212 '
+           '322112 322211 212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 231113 231311 '
+           '112133 112331 132131 113123 113321 133121 313121 211331 231131 213113 213311 213131 311123 311321 '
+           '331121 312113 312311 332111 314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 '
+           '112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 111242 121142 121241 114212 '
+           '124112 124211 411212 421112 421211 212141 214121 412121 111143 111341 131141 114113 114311 411113 '
+           '411311 113141 114131 311141 411131 211412 211214 211232').split()
+CODE128_START_B = 104
+CODE128_STOP = '2331112'
+
+Clip = namedtuple('Clip', 'name code frames presentations')   # presentations: [(first, last)] frame indices
+Symbol = namedtuple('Symbol', 'data type rect')                # the fields camera_pipeline reads from pyzbar
+
+
+# ---------------- Synthetic symbols ----------------
+
+def ean13(digits):
+    """(13-digit code, module string) for 12 digits"""
+    checksum = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    code = digits + str((10 - checksum % 10) % 10)
+    parity = EAN_PARITY[int(code[0])]
+    left = ''.join((EAN_L if parity[i] == 'L' else EAN_G)[int(d)] for i, d in enumerate(code[1:7]))
+    right = ''.join(EAN_R[int(d)] for d in code[7:])
+    return code, '101' + left + '01010' + right + '101'
+
+
+def code128(text):
+    """Module string for text in code set B"""
+    values = [CODE128_START_B] + [ord(c) - 32 for c in text]
+    values.append((values[0] + sum(i * v for i, v in enumerate(values[1:], 1))) % 103)
+    widths = ''.join(CODE128[v] for v in values) + CODE128_STOP
+    return ''.join(('1' if i % 2 == 0 else '0') * int(w) for i, w in enumerate(widths))
+
+
+def linear_symbol(modules, module_px=4):
+    row = np.array([0 if m == '1' else 255 for m in modules], np.uint8)
+    height = max(len(modules) // 2, 40)
+    symbol = cv2.copyMakeBorder(np.tile(row, (height, 1)), 6, 6, 10, 10, cv2.BORDER_CONSTANT, value=255)
+    return cv2.resize(symbol, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+
+
+def qr_symbol(text, module_px=6):
+    symbol = cv2.copyMakeBorder(cv2.QRCodeEncoder.create().encode(text), 4, 4, 4, 4, cv2.BORDER_CONSTANT, value=255)
+    return cv2.resize(symbol, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+
+
+def make_symbol(symbology):
+    """(payload the scanner should report, grayscale symbol image)"""
+    payload = PAYLOADS[symbology]
+    if symbology == 'EAN13':
+        code, modules = ean13(payload)
+        return code, linear_symbol(modules)
+    if symbology == 'CODE128':
+        return payload, linear_symbol(code128(payload))
+    return payload, qr_symbol(payload)
+
+
+# ---------------- Clips ----------------
+
+def rotate(symbol, degrees):
+    height, width = symbol.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    size = (int(height * sin + width * cos), int(height * cos + width * sin))
+    matrix[0, 2] += size[0] / 2 - width / 2
+    matrix[1, 2] += size[1] / 2 - height / 2
+    return cv2.warpAffine(symbol, matrix, size, borderMode=cv2.BORDER_CONSTANT, borderValue=BACKGROUND)
+
+
+def code_frame(symbol, distortion, index, size, rng):
+    """One camera frame of the symbol, drifting a little as a hand-held item does"""
+    width, height = size
+    frame = np.full((height, width), BACKGROUND, np.float32)
+    symbol_height, symbol_width = symbol.shape
+    x = (width - symbol_width) // 2 + int(12 * np.sin(index / 5))
+    y = (height - symbol_height) // 2 + int(6 * np.cos(index / 7))
+    frame[y:y + symbol_height, x:x + symbol_width] = symbol
+    if distortion == 'glare':
+        yy, xx = np.mgrid[0:height, 0:width]
+        spread = symbol_height * 0.6
+        frame += 140 * np.exp(-((xx - x - symbol_width * 0.65) ** 2 + (yy - y - symbol_height * 0.4) ** 2)
+                              / (2 * spread ** 2))
+    if distortion == 'blur':
+        frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    frame += rng.normal(0, 3, frame.shape)
+    return cv2.cvtColor(np.clip(frame, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+
+def synthetic_clip(symbology, distortion, fps, size, hold, gap, presentations):
+    """The symbol shown `presentations` times for hold seconds, gap seconds apart"""
+    rng = np.random.default_rng(0)
+    code, symbol = make_symbol(symbology)
+    if distortion == 'rotation':
+        symbol = rotate(symbol, 20)
+    blank = cv2.cvtColor(np.full(size[::-1], BACKGROUND, np.uint8), cv2.COLOR_GRAY2BGR)
+    held = [code_frame(symbol, distortion, i, size, rng) for i in range(max(int(hold * fps), 1))]
+    lead, pause = [blank] * int(0.5 * fps), [blank] * max(int(gap * fps), 1)
+    frames, shown = list(lead), []
+    for _ in range(presentations):
+        shown.append((len(frames), len(frames) + len(held) - 1))
+        frames += held + pause
+    return Clip(f"{symbology}/{distortion}", code, frames, shown)
+
+
+def recorded_clip(path, code, max_frames):
+    """A recording treated as one presentation of code"""
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {path}")
+    return Clip(os.path.basename(path), code, frames, [(0, len(frames) - 1)])
+
+
+# ---------------- Decoders ----------------
+
+class OpenCVDecoder:
+    """pyzbar-shaped decode over OpenCV's EAN/UPC and QR detectors, one pair per thread"""
+    SYMBOLOGIES = {'EAN13', 'EAN8', 'UPCA', 'UPCE', 'QRCODE'}
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, gray):
+        local = self._local
+        if not hasattr(local, 'barcode'):
+            local.barcode, local.qr = cv2.barcode.BarcodeDetector(), cv2.QRCodeDetector()
+        symbols = []
+        ok, infos, types, corners = local.barcode.detectAndDecodeWithType(gray)
+        if ok:
+            for info, kind, points in zip(infos, types, corners):
+                if info:
+                    symbols.append(Symbol(info.encode(), kind.replace('_', ''), cv2.boundingRect(points.astype(np.int32))))
+        data, points, _ = local.qr.detectAndDecode(gray)
+        if data and points is not None:
+            symbols.append(Symbol(data.encode(), 'QRCODE', cv2.boundingRect(points.astype(np.int32))))
+        return symbols
+
+
+def pick_decoder(name):
+    """(name, decode callable, readable symbologies or None for all)"""
+    if name in ('auto', 'pyzbar'):
+        try:
+            from pyzbar.pyzbar import decode
+            return 'pyzbar', decode, None
+        except Exception as e:
+            if name == 'pyzbar':
+                raise SystemExit(f"pyzbar unavailable: {e}")
+    return 'opencv', OpenCVDecoder(), OpenCVDecoder.SYMBOLOGIES
+
+
+def scanner_setups():
+    """Scanner constructors as the application builds them"""
+    setups = {'pos_widget': CameraPipeline}
+    try:
+        from barcode_utils import BarcodeScanner
+        setups['barcode_utils'] = BarcodeScanner
+    except Exception as e:
+        print(f"barcode_utils scanner skipped: {e}")
+    return setups
+
+
+# ---------------- Measuring ----------------
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in handing out a clip's frames at camera speed"""
+
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.fps = fps
+        self.served = []          # perf_counter when each frame was read
+        self.done = threading.Event()
+        self._started = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        index = len(self.served)
+        if index >= len(self.frames):
+            self.done.set()
+            time.sleep(1 / self.fps)
+            return False, None
+        if self._started is None:
+            self._started = time.perf_counter()
+        delay = self._started + index / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.served.append(time.perf_counter())
+        return True, self.frames[index]
+
+    def release(self):
+        pass
+
+
+def offline_decode(clip, decoder):
+    """Share of the first presentation's frames decoded to the right code, and CPU ms per frame"""
+    first, last = clip.presentations[0]
+    hits = 0
+    started = time.process_time()
+    for frame in clip.frames[first:last + 1]:
+        found, _ = decode_gray(to_decode_gray(frame), None, decoder)
+        hits += any(data == clip.code for data, _, _ in found)
+    count = last - first + 1
+    return {'decode_rate': round(hits / count, 3),
+            'decode_cpu_ms': round((time.process_time() - started) * 1000 / count, 2)}
+
+
+def replay(setup, clip, fps, decoder):
+    """Play clip through a freshly built scanner; what the cashier would have seen"""
+    scanner = setup()
+    capture = ReplayCapture(clip.frames, fps)
+    scanner.source = lambda device: capture
+    scanner.decoder = decoder
+    scans = []
+    # Direct connection: timestamp on the decode thread, no event loop in between
+    scanner.barcode_scanned.connect(lambda code: scans.append((time.perf_counter(), code)), Qt.DirectConnection)
+
+    started = time.process_time()
+    scanner.start_scanning()
+    capture.done.wait(len(clip.frames) / fps + 5)
+    time.sleep(DRAIN_SECONDS)
+    scanner.stop_scanning()
+    scanner._join()
+    cpu = time.process_time() - started
+
+    starts = [capture.served[first] for first, _ in clip.presentations if first < len(capture.served)]
+    per_presentation = [[] for _ in starts]
+    misreads = strays = 0
+    for at, code in scans:
+        if code != clip.code:
+            misreads += 1
+            continue
+        shown = [i for i, start in enumerate(starts) if start <= at]
+        if shown:
+            per_presentation[shown[-1]].append(at)
+        else:
+            strays += 1
+    first_ms = [(hits[0] - starts[i]) * 1000 for i, hits in enumerate(per_presentation) if hits]
+    repeats = sum(len(hits) - 1 for hits in per_presentation if hits) + strays
+    return {
+        'detected': len(first_ms),
+        'presentations': len(clip.presentations),
+        'first_detect_ms': round(sum(first_ms) / len(first_ms), 1) if first_ms else None,
+        'repeats': repeats,
+        'repeat_rate': round(repeats / len(clip.presentations), 2),
+        'misreads': misreads,
+        'cpu_ms_per_frame': round(cpu * 1000 / max(len(capture.served), 1), 2),
+        'pipeline': scanner.stats(),
+    }
+
+
+def report_line(name, result):
+    first = f"{result['first_detect_ms']:7.1f}" if result['first_detect_ms'] is not None else "      -"
+    return (f"  {name:<14} found {result['detected']}/{result['presentations']}  first {first} ms  "
+            f"repeats {result['repeat_rate']:4.2f}/presentation  misreads {result['misreads']}  "
+            f"cpu {result['cpu_ms_per_frame']:6.2f} ms/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera scanner replay benchmark")
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--size', default='1280x720', help="synthetic frame size, WIDTHxHEIGHT")
+    parser.add_argument('--hold', type=float, default=1.0, help="seconds each presentation lasts")
+    parser.add_argument('--gap', type=float, default=1.2, help="seconds between presentations (above the debounce)")
+    parser.add_argument('--presentations', type=int, default=2)
+    parser.add_argument('--symbologies', default=','.join(SYMBOLOGIES))
+    parser.add_argument('--distortions', default=','.join(DISTORTIONS))
+    parser.add_argument('--decoder', choices=('auto', 'pyzbar', 'opencv'), default='auto')
+    parser.add_argument('--video', help="replay a recording instead of synthetic clips")
+    parser.add_argument('--expect', help="code the recording shows (with --video)")
+    parser.add_argument('--max-frames', type=int, default=900)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+    if args.video and not args.expect:
+        parser.error("--video needs --expect")
+
+    app = QApplication(sys.argv)
+    load_camera_stack()
+    decoder_name, decoder, readable = pick_decoder(args.decoder)
+    setups = scanner_setups()
+    size = tuple(int(part) for part in args.size.lower().split('x'))
+
+    if args.video:
+        clips = [recorded_clip(args.video, args.expect, args.max_frames)]
+    else:
+        clips = []
+        for symbology in args.symbologies.split(','):
+            if readable is not None and symbology not in readable:
+                print(f"{symbology} skipped: the {decoder_name} decoder cannot read it")
+                continue
+            clips += [synthetic_clip(symbology, distortion, args.fps, size, args.hold, args.gap, args.presentations)
+                      for distortion in args.distortions.split(',')]
+
+    print(f"decoder {decoder_name}, {args.fps:g} fps, setups: {', '.join(setups)}")
+    results = {}
+    for clip in clips:
+        result = offline_decode(clip, decoder)
+        print(f"{clip.name:<20} decode {result['decode_rate'] * 100:5.1f}%  {result['decode_cpu_ms']:6.2f} ms/frame")
+        for name, setup in setups.items():
+            result[name] = replay(setup, clip, args.fps, decoder)
+            print(report_line(name, result[name]))
+        results[clip.name] = result
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'decoder': decoder_name, 'fps': args.fps, 'scenarios': results}, f, indent=2)
+    app.quit()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
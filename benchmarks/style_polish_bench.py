@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Theme engine: widget styling cost, inline stylesheets vs style classes.
+
+Builds the same KPI cards and cart remove buttons both ways and times
+construction plus polish, then times updating the change display for every
+keystroke of a payment (negative change, then positive once it is covered):
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/style_polish_bench.py [--count 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+
+import theme
+from theme import polish_time, set_style, set_tone
+
+COLORS = ['#22c55e', '#3b82f6', '#f59e0b', '#ef4444']
+TONES = ['green', 'blue', 'amber', 'red']
+
+
+def inline_card(index):
+    color = COLORS[index % len(COLORS)]
+    card = QWidget()
+    card.setStyleSheet(f"""
+        QWidget {{ background: white; border: 1px solid #e0e0e0; border-radius: 8px; border-left: 4px solid {color}; }}
+    """)
+    layout = QVBoxLayout(card)
+    value = QLabel("0.00 DA")
+    value.setStyleSheet(f"font-size: 22px; font-weight: 700; color: {color};")
+    title = QLabel("REVENUE")
+    title.setStyleSheet("font-size: 12px; font-weight: 600; color: #6b7280;")
+    layout.addWidget(value)
+    layout.addWidget(title)
+    return card
+
+
+def classed_card(index):
+    tone = TONES[index % len(TONES)]
+    card = set_style(QWidget(), 'card', tone)
+    layout = QVBoxLayout(card)
+    layout.addWidget(set_style(QLabel("0.00 DA"), 'card-value', tone))
+    layout.addWidget(set_style(QLabel("REVENUE"), 'card-title'))
+    return card
+
+
+def inline_button(index):
+    button = QPushButton("✕")
+    button.setStyleSheet("""
+        QPushButton { background: #ef4444; color: white; border: none; border-radius: 4px; padding: 4px 8px; font-weight: bold; }
+        QPushButton:hover { background: #dc2626; }
+    """)
+    return button
+
+
+def classed_button(index):
+    return set_style(QPushButton("✕"), 'row-action', 'red')
+
+
+def build(factory, count):
+    """ms to build count widgets into one container and polish it"""
+    container = QWidget()
+    layout = QHBoxLayout(container)
+    started = time.perf_counter()
+    for index in range(count):
+        layout.addWidget(factory(index))
+    polish_time(container)
+    elapsed = (time.perf_counter() - started) * 1000
+    container.deleteLater()
+    return elapsed
+
+
+def typed_inline(label, count):
+    started = time.perf_counter()
+    for index in range(count):
+        color = COLORS[0] if index >= count // 2 else COLORS[3]
+        label.setStyleSheet(f"QLabel {{ font-size: 20px; font-weight: 600; color: {color}; border: 2px solid {color}; }}")
+        label.ensurePolished()
+    return (time.perf_counter() - started) * 1000
+
+
+def typed_classed(label, count):
+    started = time.perf_counter()
+    for index in range(count):
+        set_tone(label, TONES[0] if index >= count // 2 else TONES[3])
+        label.ensurePolished()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stylesheet vs style class benchmark")
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    started = time.perf_counter()
+    theme.apply_theme(app, dark=False)
+    print(f"compile and install app stylesheet {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    for label, inline, classed in (("KPI cards", inline_card, classed_card),
+                                   ("cart remove buttons", inline_button, classed_button)):
+        print(f"{args.count} {label}: inline {build(inline, args.count):8.1f} ms, "
+              f"style class {build(classed, args.count):8.1f} ms")
+
+    print(f"{args.count} payment keystrokes: inline {typed_inline(QLabel('0.00 DA'), args.count):8.1f} ms, "
+          f"style class {typed_classed(set_style(QLabel('0.00 DA'), 'amount'), args.count):8.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
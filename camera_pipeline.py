@@ -0,0 +1,458 @@
+"""
+Staged camera barcode pipeline.
+
+    capture thread -> FrameQueue (bounded, drops oldest) -> decode workers
+
+The capture thread only reads frames, so the camera is drained at its own
+frame rate and a slow decode never makes frames pile up: when every worker
+is busy the oldest queued frame is dropped for the newest. Decode workers
+grayscale, downscale and run zbar; OpenCV and zbar release the GIL, so
+several workers decode in parallel on multi-core lanes.
+
+Once a code is found, workers first decode only the region around it (ROI
+tracking), which is most of the time where the next item is held, and fall
+back to the whole frame when the region comes up empty. With nothing
+decoded for IDLE_SECONDS the capture thread forwards only every n-th frame,
+n growing with the idle time up to MAX_SKIP, and returns to every frame as
+soon as a code decodes, so an idle lane costs little CPU.
+
+The camera preview is rate-capped on its own (PREVIEW_FPS) and built in the
+capture thread: each frame is shrunk straight into one of a ring of
+preallocated buffers at the size of the label showing it (set_preview_size),
+and the QImage is made over that buffer as BGR888 (Qt 5.14+), so there is no
+colour conversion, no full-size copy and no scaling on the GUI thread.
+frame_ready is emitted on the GUI thread and a buffer only goes back to the
+ring once its slots have returned, so they must be done with the image
+(QPixmap.fromImage) by then; while the GUI holds every buffer, preview
+frames are skipped.
+
+stats() reports per-stage latency: camera read, queue wait, decode, and
+capture-to-signal (what the cashier waits for).
+
+OpenCV and pyzbar are imported on first use (load_camera_stack).
+
+    POS_DECODE_WORKERS    decode threads (default 2, 1 on single-core PCs)
+    POS_PREVIEW_FPS       camera preview frames per second (default 15, 0 for none)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
+
+QUEUE_SIZE = 2
+DECODE_WIDTH = 640             # frames are decoded at most this wide
+DEBOUNCE_SECONDS = 0.5         # a code seen again within this of its last sighting is the same scan
+ROI_SECONDS = 1.5              # how long the last code's region is tried first
+ROI_MARGIN = 0.5               # region grows by this fraction of the code's size on each side
+IDLE_SECONDS = 2.0
+MAX_SKIP = 5
+PREVIEW_FPS = int(os.getenv('POS_PREVIEW_FPS', 15))
+PREVIEW_BUFFERS = 3
+PREVIEW_SIZE = (320, 240)      # until the view reports its own
+READ_RETRY_SECONDS = 0.1
+MAX_READ_FAILURES = 50
+
+# Qt 5.14 reads OpenCV's BGR byte order directly; older Qt needs RGB
+PREVIEW_FORMAT = getattr(QImage, 'Format_BGR888', None)
+
+cv2 = None
+numpy = None
+zbar_decode = None
+
+
+def load_camera_stack():
+    """Import cv2 and pyzbar if not done yet; True when both are available"""
+    global cv2, numpy, zbar_decode
+    if cv2 is None:
+        try:
+            import cv2
+            import numpy
+        except Exception:
+            cv2 = None
+    if zbar_decode is None:
+        try:
+            from pyzbar.pyzbar import decode as zbar_decode
+        except Exception:
+            zbar_decode = None
+    return cv2 is not None and zbar_decode is not None
+
+
+def default_workers():
+    configured = int(os.getenv('POS_DECODE_WORKERS', 0))
+    return configured if configured > 0 else (2 if (os.cpu_count() or 1) > 1 else 1)
+
+
+class StageTimer:
+    """Count, mean and max duration of one pipeline stage; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            mean = self.total / self.count if self.count else 0.0
+            return {'count': self.count, 'mean_ms': round(mean * 1000, 2), 'max_ms': round(self.max * 1000, 2)}
+
+
+class FrameQueue:
+    """Bounded queue of (captured_at, frame); putting into a full queue drops the oldest"""
+
+    def __init__(self, size=QUEUE_SIZE):
+        self._frames = deque(maxlen=size)
+        self._ready = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._ready:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(item)
+            self._ready.notify()
+
+    def get(self):
+        """Next frame, or None once the queue is closed"""
+        with self._ready:
+            while not self._frames and not self._closed:
+                self._ready.wait()
+            return self._frames.popleft() if self._frames and not self._closed else None
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._frames.clear()
+            self._ready.notify_all()
+
+
+class RoiTracker:
+    """Region of the decode frame around the last code found; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._region = None        # (x0, y0, x1, y1)
+        self._at = 0.0
+
+    def current(self, now):
+        with self._lock:
+            return self._region if self._region and now - self._at < ROI_SECONDS else None
+
+    def update(self, rect, shape, now):
+        left, top, width, height = rect
+        margin_x = max(int(width * ROI_MARGIN), 40)
+        margin_y = max(int(height * ROI_MARGIN), 40)
+        frame_height, frame_width = shape[:2]
+        with self._lock:
+            self._region = (max(left - margin_x, 0), max(top - margin_y, 0),
+                            min(left + width + margin_x, frame_width), min(top + height + margin_y, frame_height))
+            self._at = now
+
+
+class PreviewRing:
+    """Preview QImages built over a ring of preallocated buffers, one size at a time.
+
+    image() takes a free buffer and release() gives it back once the GUI is
+    done with the image; the caller keeps the buffer alive until then.
+    Buffers of a previous size are dropped when released.
+    """
+
+    def __init__(self, count=PREVIEW_BUFFERS):
+        self.count = count
+        self._shape = None
+        self._free = []
+        self._scratch = None
+        self._lock = threading.Lock()
+
+    def _allocate(self, width, height):
+        self._shape = (height, width, 3)
+        self._free = [numpy.empty(self._shape, numpy.uint8) for _ in range(self.count)]
+        self._scratch = numpy.empty(self._shape, numpy.uint8)
+
+    def image(self, frame, size, mirror=False):
+        """(QImage, buffer): frame shrunk to fit size (never enlarged) in a ring buffer.
+
+        Returns (None, None) while every buffer is out.
+        """
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(size[0] / frame_width, size[1] / frame_height, 1.0)
+        width, height = max(int(frame_width * scale), 1), max(int(frame_height * scale), 1)
+        with self._lock:
+            if self._shape != (height, width, 3):
+                self._allocate(width, height)
+            if not self._free:
+                return None, None
+            buffer = self._free.pop()
+
+        if mirror:
+            cv2.resize(frame, (width, height), dst=self._scratch, interpolation=cv2.INTER_LINEAR)
+            cv2.flip(self._scratch, 1, dst=buffer)
+        else:
+            cv2.resize(frame, (width, height), dst=buffer, interpolation=cv2.INTER_LINEAR)
+        if PREVIEW_FORMAT is not None:
+            return QImage(buffer.data, width, height, 3 * width, PREVIEW_FORMAT), buffer
+        cv2.cvtColor(buffer, cv2.COLOR_BGR2RGB, dst=buffer)
+        return QImage(buffer.data, width, height, 3 * width, QImage.Format_RGB888), buffer
+
+    def release(self, buffer):
+        """Give a buffer back once no image over it is in use"""
+        with self._lock:
+            if buffer.shape == self._shape and len(self._free) < self.count:
+                self._free.append(buffer)
+
+
+def decode_gray(gray, region=None, decoder=None):
+    """[(data, symbology, rect)] in a grayscale frame, trying region first.
+
+    rect is (left, top, width, height) in frame coordinates. The second item
+    returned says whether the region alone was enough.
+    """
+    decoder = decoder or zbar_decode
+    if region is not None:
+        x0, y0, x1, y1 = region
+        found = _symbols(decoder(gray[y0:y1, x0:x1]), x0, y0)
+        if found:
+            return found, True
+    return _symbols(decoder(gray), 0, 0), False
+
+
+def _symbols(results, offset_x, offset_y):
+    symbols = []
+    for result in results:
+        try:
+            data = result.data.decode('utf-8').strip()
+        except Exception:
+            continue
+        if data:
+            left, top, width, height = result.rect
+            symbols.append((data, (result.type or '').upper(), (left + offset_x, top + offset_y, width, height)))
+    return symbols
+
+
+def to_decode_gray(frame):
+    """Grayscale copy of a BGR frame, at most DECODE_WIDTH wide"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    height, width = gray.shape[:2]
+    if width > DECODE_WIDTH:
+        gray = cv2.resize(gray, (DECODE_WIDTH, int(height * DECODE_WIDTH / width)), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+class CameraPipeline(QObject):
+    """Camera scanner: signals arrive on the thread that owns the pipeline (the GUI thread)"""
+    barcode_scanned = pyqtSignal(str)
+    unknown_barcode = pyqtSignal(str)    # decoded, but not one of the accepted symbologies
+    scan_status = pyqtSignal(str, str)   # message, theme tone
+    frame_ready = pyqtSignal(QImage)
+    _preview_built = pyqtSignal(QImage, object)    # image, the ring buffer under it
+
+    def __init__(self, parent=None, device=0, workers=None, symbologies=None,
+                 debounce=DEBOUNCE_SECONDS, mirror_preview=False, source=None, decoder=None):
+        super().__init__(parent)
+        self.device = device
+        self.workers = workers or default_workers()
+        self.symbologies = symbologies       # accepted symbology names, None for all
+        self.debounce = debounce
+        self.mirror_preview = mirror_preview
+        self.preview_fps = PREVIEW_FPS
+        self.preview_size = PREVIEW_SIZE
+        self.source = source or (lambda device: cv2.VideoCapture(device))
+        self.decoder = decoder
+        self.scanning = False
+        self._threads = []
+        self._stopping = threading.Event()
+        self._preview_built.connect(self._deliver_preview)
+        self._reset()
+
+    def _reset(self):
+        self.queue = FrameQueue()
+        self.roi = RoiTracker()
+        self.timers = {stage: StageTimer() for stage in ('read', 'queue', 'decode', 'scan', 'preview')}
+        self.preview = PreviewRing()
+        self.frames = 0
+        self.skipped = 0
+        self.previews_skipped = 0
+        self.roi_hits = 0
+        self._last_code = ''
+        self._last_code_at = 0.0
+        self._last_hit = time.monotonic()
+        self._report_lock = threading.Lock()
+
+    def stats(self):
+        """Per-stage latency and frame counters since scanning started"""
+        result = {stage: timer.snapshot() for stage, timer in self.timers.items()}
+        result.update(frames=self.frames, skipped=self.skipped, dropped=self.queue.dropped, roi_hits=self.roi_hits,
+                      previews_skipped=self.previews_skipped)
+        return result
+
+    @pyqtSlot(int, int)
+    def set_preview_size(self, width, height):
+        """Size of the view showing frame_ready; preview images are made to fit it"""
+        if width > 0 and height > 0:
+            self.preview_size = (width, height)
+
+    @pyqtSlot()
+    def start_scanning(self):
+        if self.scanning:
+            return
+        # An injected decoder (benchmarks, tests) stands in for pyzbar
+        if not load_camera_stack() and (cv2 is None or self.decoder is None):
+            self.scan_status.emit("Camera scanning requires cv2 + pyzbar", "red")
+            return
+        self._join()
+        self._reset()
+        self._stopping = threading.Event()
+        self.scanning = True
+        self._threads = [threading.Thread(target=self._capture, name='camera-capture', daemon=True)]
+        self._threads += [threading.Thread(target=self._decode_frames, name=f'camera-decode-{i}', daemon=True)
+                          for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @pyqtSlot()
+    def stop_scanning(self):
+        """Ask the threads to stop; the camera is released by the capture thread"""
+        if not self.scanning:
+            return
+        self.scanning = False
+        self._stopping.set()
+        self.queue.close()
+
+    def _join(self, timeout=1.0):
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ---------------- Capture thread ----------------
+
+    def _capture(self):
+        stopping, queue = self._stopping, self.queue
+        try:
+            capture = self.source(self.device)
+        except Exception as e:
+            self._capture_failed(f"Camera error: {e}")
+            return
+        try:
+            if capture is None or not capture.isOpened():
+                self._capture_failed("Cannot open camera")
+                return
+            self.scan_status.emit("Camera scanning started", "green")
+            failures = 0
+            preview_every = 1.0 / self.preview_fps if self.preview_fps > 0 else None
+            next_preview = 0.0
+            while not stopping.is_set():
+                started = time.perf_counter()
+                ok, frame = capture.read()
+                captured_at = time.perf_counter()
+                if not ok or frame is None:
+                    failures += 1
+                    if failures == 1:
+                        self.scan_status.emit("Camera read failed", "red")
+                    if failures >= MAX_READ_FAILURES:
+                        self._capture_failed("Camera stopped delivering frames")
+                        return
+                    stopping.wait(READ_RETRY_SECONDS)
+                    continue
+                failures = 0
+                self.timers['read'].add(captured_at - started)
+                self.frames += 1
+
+                if preview_every is not None and captured_at >= next_preview:
+                    next_preview = captured_at + preview_every
+                    self._emit_preview(frame)
+
+                idle = time.monotonic() - self._last_hit
+                skip = min(MAX_SKIP, max(1, int(idle / IDLE_SECONDS)))
+                if self.frames % skip:
+                    self.skipped += 1
+                    continue
+                queue.put((captured_at, frame))
+        finally:
+            try:
+                if capture is not None:
+                    capture.release()
+            except Exception:
+                pass
+            queue.close()
+            if stopping.is_set():
+                self.scan_status.emit("Camera scanning stopped", "gray")
+
+    def _capture_failed(self, message):
+        # The finally block in _capture closes the queue, which stops the workers
+        self.scanning = False
+        self.scan_status.emit(message, "red")
+
+    def _emit_preview(self, frame):
+        started = time.perf_counter()
+        try:
+            image, buffer = self.preview.image(frame, self.preview_size, self.mirror_preview)
+        except Exception:
+            return
+        if image is None:
+            self.previews_skipped += 1      # the GUI is behind
+            return
+        self.timers['preview'].add(time.perf_counter() - started)
+        # Queued to the GUI thread; the signal's reference keeps the buffer alive
+        self._preview_built.emit(image, buffer)
+
+    @pyqtSlot(QImage, object)
+    def _deliver_preview(self, image, buffer):
+        """On the GUI thread: show the frame, then hand its buffer back to the ring"""
+        try:
+            self.frame_ready.emit(image)
+        finally:
+            self.preview.release(buffer)
+
+    # ---------------- Decode workers ----------------
+
+    def _decode_frames(self):
+        queue = self.queue
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            captured_at, frame = item
+            started = time.perf_counter()
+            self.timers['queue'].add(started - captured_at)
+            try:
+                gray = to_decode_gray(frame)
+                found, in_region = decode_gray(gray, self.roi.current(time.monotonic()), self.decoder)
+            except Exception as e:
+                print(f"Camera decode failed: {e}")
+                continue
+            self.timers['decode'].add(time.perf_counter() - started)
+            if found:
+                now = time.monotonic()
+                self._last_hit = now
+                self.roi_hits += in_region
+                self.roi.update(found[0][2], gray.shape, now)
+                for data, symbology, _ in found:
+                    self._report(data, symbology, captured_at)
+
+    def _report(self, data, symbology, captured_at):
+        """Emit a decoded code unless it repeats the previous scan (several workers may see it)"""
+        now = time.monotonic()
+        with self._report_lock:
+            if data == self._last_code and now - self._last_code_at < self.debounce:
+                self._last_code_at = now
+                return
+            self._last_code, self._last_code_at = data, now
+        if self.symbologies is not None and symbology.replace('-', '') not in self.symbologies:
+            self.unknown_barcode.emit(data)
+            self.scan_status.emit(f"Unknown format: {symbology or 'UNKNOWN'}", "amber")
+            return
+        self.barcode_scanned.emit(data)
+        self.timers['scan'].add(time.perf_counter() - captured_at)
+        self.scan_status.emit(f"Detected: {data}", "sky")
@@ -0,0 +1,158 @@
+"""
+On-disk catalog snapshot for instant POS startup.
+
+The whole catalog is kept in one file of array-backed columns: prices,
+ids and quantities as packed arrays, names, barcodes and categories as an
+offsets array plus a UTF-8 blob. Loading maps the file and slices the
+columns out without parsing, so a 50k-product lane is usable before any
+query has run. The snapshot records the catalog version it reflects; a
+sync then reads only the products changed or deleted since that version
+(see barcode_index for row versions) and writes a new file.
+
+Without the version triggers a sync reloads the full catalog, as the POS
+did before. Writes go to a temporary file renamed over the old one, so a
+crash never leaves a torn snapshot.
+
+    POS_CATALOG    snapshot path (default pos_catalog.snap in the working directory)
+"""
+
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+from barcode_index import fetch_catalog, fetch_changes
+
+SNAPSHOT_PATH = os.getenv('POS_CATALOG', 'pos_catalog.snap')
+MAGIC = b'LKSCAT01'
+HEADER = struct.Struct('<8sqIB3x')        # magic, catalog version (-1: none), products, versioned
+NUMBER_COLUMNS = (('price_buy', 'd'), ('price_sell', 'd'), ('id', 'i'), ('quantity', 'i'))
+TEXT_COLUMNS = ('name', 'code_bar', 'category')
+
+
+def _product(row):
+    """Product tuple (PRODUCT_COLUMNS order) with plain Python types"""
+    return (int(row[0]), row[1] or '', row[2] or None, float(row[3] or 0), float(row[4] or 0),
+            int(row[5] or 0), row[6] or '')
+
+
+def _name_order(product):
+    return product[1].casefold(), product[0]
+
+
+def _pack_text(values):
+    offsets, blobs, end = array('I', [0]), [], 0
+    for value in values:
+        data = (value or '').encode('utf-8')
+        blobs.append(data)
+        end += len(data)
+        offsets.append(end)
+    return offsets.tobytes(), b''.join(blobs)
+
+
+def _unpack_text(view, count, position):
+    offsets = view[position:position + 4 * (count + 1)].cast('I').tolist()
+    position += 4 * (count + 1)
+    blob = bytes(view[position:position + offsets[-1]])
+    values = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+    return values, position + offsets[-1]
+
+
+class CatalogSnapshot:
+    """Immutable catalog: product tuples in name order and the catalog version they reflect"""
+
+    def __init__(self, products, version=None, versioned=False):
+        self.products = products
+        self.version = version
+        self.versioned = versioned
+
+    def __len__(self):
+        return len(self.products)
+
+    @classmethod
+    def from_changes(cls, changes):
+        """Snapshot of a full fetch_catalog() load"""
+        products = sorted(map(_product, changes['rows']), key=_name_order)
+        return cls(products, changes['version'], changes['versioned'])
+
+    def merge(self, changes):
+        """New snapshot with fetch_changes() applied"""
+        if changes['full']:
+            return CatalogSnapshot.from_changes(changes)
+        by_id = {product[0]: product for product in self.products}
+        for product_id in changes['deleted']:
+            by_id.pop(product_id, None)
+        for row in changes['rows']:
+            by_id[row[0]] = _product(row)
+        return CatalogSnapshot(sorted(by_id.values(), key=_name_order),
+                               changes['version'], changes['versioned'])
+
+    # ---------------- File format ----------------
+
+    def save(self, path=SNAPSHOT_PATH):
+        columns = list(zip(*self.products)) if self.products else [()] * 7
+        product_id, name, code_bar, price_buy, price_sell, quantity, category = columns
+        values = {'id': product_id, 'price_buy': price_buy, 'price_sell': price_sell, 'quantity': quantity}
+        version = -1 if self.version is None else self.version
+
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, version, len(self.products), int(self.versioned)))
+            for column, typecode in NUMBER_COLUMNS:
+                f.write(array(typecode, values[column]).tobytes())
+            for texts in (name, code_bar, category):
+                offsets, blob = _pack_text(texts)
+                f.write(offsets)
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Snapshot saved at path, or None if there is none (or it is unreadable)"""
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    return cls._read(view)
+                finally:
+                    view.release()
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            if os.path.exists(path):
+                print(f"Ignoring unreadable catalog snapshot {path}: {e}")
+            return None
+
+    @classmethod
+    def _read(cls, view):
+        magic, version, count, versioned = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("not a catalog snapshot")
+        position = HEADER.size
+        numbers = {}
+        for column, typecode in NUMBER_COLUMNS:
+            size = array(typecode).itemsize * count
+            numbers[column] = view[position:position + size].cast(typecode).tolist()
+            position += size
+        texts = []
+        for _ in TEXT_COLUMNS:
+            values, position = _unpack_text(view, count, position)
+            texts.append(values)
+        name, code_bar, category = texts
+        products = list(zip(numbers['id'], name, [code or None for code in code_bar],
+                            numbers['price_buy'], numbers['price_sell'], numbers['quantity'], category))
+        return cls(products, None if version < 0 else version, bool(versioned))
+
+
+def sync_snapshot(cursor, snapshot, path=SNAPSHOT_PATH):
+    """Bring snapshot up to date and save it; None when nothing changed (runs on a query worker)"""
+    if snapshot is None or not snapshot.versioned:
+        updated = CatalogSnapshot.from_changes(fetch_catalog(cursor, barcodes_only=False))
+    else:
+        changes = fetch_changes(cursor, snapshot.version)
+        if changes is None:
+            return None
+        updated = snapshot.merge(changes)
+    updated.save(path)
+    return updated
@@ -0,0 +1,296 @@
+"""
+Thread-safe MySQL connection pool.
+
+Widgets borrow connections from one shared pool instead of opening a new
+TCP+auth session per query. A thread that borrows again while it already
+holds a connection gets the same connection back, so nested helpers do not
+drain the pool. The transaction belongs to the outermost borrow: nested
+borrowers must leave commit and rollback to it (see `nested`).
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+
+from mysql.connector.errors import PoolError
+
+
+@dataclass
+class PoolMetrics:
+    """Counters describing how the pool has been used"""
+    checkouts: int = 0          # every borrow, including nested ones
+    hits: int = 0               # borrows served by an idle connection
+    reentrant_hits: int = 0     # borrows served by the thread's own connection
+    creations: int = 0          # new physical connections opened
+    recycled: int = 0           # idle connections closed for being too old
+    health_failures: int = 0    # idle connections that failed the ping
+    timeouts: int = 0           # borrows that gave up waiting
+    waits: int = 0              # borrows that had to wait for a free slot
+    total_wait: float = 0.0     # seconds spent waiting, all borrows
+    max_wait: float = 0.0
+
+    @property
+    def avg_wait(self):
+        return self.total_wait / self.waits if self.waits else 0.0
+
+    def snapshot(self):
+        data = asdict(self)
+        data['avg_wait'] = self.avg_wait
+        return data
+
+
+class PooledConnection:
+    """Proxy around a raw MySQL connection; close() hands it back to the pool"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._owner = None
+        self._depth = 0
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def nested(self):
+        """True while an outer borrow of this thread holds the same connection"""
+        return self._depth > 1
+
+    def is_connected(self):
+        try:
+            return self._raw.is_connected()
+        except Exception:
+            return False
+
+    def close(self):
+        """Return the connection to the pool (the socket stays open)"""
+        self._pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded pool with health checks, idle recycling and per-thread borrowing
+
+    Pings and socket closes happen outside the pool's lock. Idle connections
+    past idle_recycle are closed as borrows come and go (recycle_idle).
+
+    factory        -- callable returning a new raw connection (raises on failure)
+    size           -- maximum number of physical connections
+    timeout        -- seconds to wait for a free connection before PoolError
+    idle_recycle   -- close idle connections older than this many seconds
+    health_check_after -- ping connections that sat idle longer than this
+    """
+
+    def __init__(self, factory, size=5, timeout=10.0, idle_recycle=300.0,
+                 health_check_after=30.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.idle_recycle = idle_recycle
+        self.health_check_after = health_check_after
+
+        self._idle = deque()
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self.metrics = PoolMetrics()
+
+    # ---------------- Borrowing ----------------
+
+    def acquire(self, timeout=None):
+        """Borrow a connection for the calling thread"""
+        current = getattr(self._local, 'conn', None)
+        if current is not None:
+            current._depth += 1
+            with self._cond:
+                self.metrics.checkouts += 1
+                self.metrics.reentrant_hits += 1
+            return current
+
+        conn = self._checkout(self.timeout if timeout is None else timeout)
+        conn._owner = threading.get_ident()
+        conn._depth = 1
+        self._local.conn = conn
+        return conn
+
+    def release(self, conn):
+        """Give a borrowed connection back; only the outermost release frees it"""
+        if conn._depth > 1:
+            conn._depth -= 1
+            return
+        conn._depth = 0
+        conn._owner = None
+        if getattr(self._local, 'conn', None) is conn:
+            self._local.conn = None
+
+        healthy = conn.is_connected()
+        if healthy:
+            try:
+                if conn._raw.in_transaction:
+                    conn._raw.rollback()
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            keep = healthy and not self._closed
+            if keep:
+                conn.released_at = time.monotonic()
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._close_raw(conn)
+        # Borrows keep the pool moving, so they also age out the connections nobody took
+        self.recycle_idle()
+
+    def _checkout(self, timeout):
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn, expired, waited_now = self._claim(deadline, timeout)
+            waited = waited or waited_now
+            for old in expired:
+                self._close_raw(old)
+            if conn is None:
+                break
+            # Ping outside the lock: a dead socket must not hold up every other borrow
+            if time.monotonic() - conn.released_at <= self.health_check_after or self._ping(conn):
+                break
+            self._close_raw(conn)
+            with self._cond:
+                self.metrics.health_failures += 1
+                self._open -= 1
+                self._cond.notify()
+
+        with self._cond:
+            self.metrics.checkouts += 1
+            if conn is not None:
+                self.metrics.hits += 1
+            wait = time.monotonic() - started
+            if waited:
+                self.metrics.waits += 1
+                self.metrics.total_wait += wait
+                self.metrics.max_wait = max(self.metrics.max_wait, wait)
+
+        if conn is None:
+            # Open the socket outside the lock so other threads keep moving
+            try:
+                conn = PooledConnection(self, self._factory())
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.metrics.creations += 1
+        return conn
+
+    def _claim(self, deadline, timeout):
+        """Wait for an idle connection or a free slot (None) under the lock.
+
+        Returns (connection or None, expired idle connections for the caller
+        to close, whether it had to wait).
+        """
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+
+                expired = self._expire_idle()
+                if self._idle:
+                    return self._idle.pop(), expired, waited
+
+                if self._open < self.size:
+                    self._open += 1
+                    return None, expired, waited
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.timeouts += 1
+                    raise PoolError(f"No MySQL connection available after {timeout:.1f}s "
+                                    f"(pool size {self.size})")
+                waited = True
+                self._cond.wait(remaining)
+
+    def _expire_idle(self):
+        """Take idle connections past idle_recycle out of the pool (caller holds the lock)
+
+        Returns them for the caller to close once it has let go of the lock.
+        """
+        if not self.idle_recycle or not self._idle:
+            return []
+        now = time.monotonic()
+        expired = [conn for conn in self._idle if now - conn.released_at > self.idle_recycle]
+        if expired:
+            self._idle = deque(conn for conn in self._idle if now - conn.released_at <= self.idle_recycle)
+            self._open -= len(expired)
+            self.metrics.recycled += len(expired)
+        return expired
+
+    # ---------------- Maintenance ----------------
+
+    def recycle_idle(self):
+        """Close idle connections past idle_recycle; returns how many were closed"""
+        with self._cond:
+            expired = self._expire_idle()
+            if expired:
+                self._cond.notify_all()
+        for conn in expired:
+            self._close_raw(conn)
+        return len(expired)
+
+    def close_all(self):
+        """Close idle connections and refuse new borrows until reopen()"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_raw(conn)
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def stats(self):
+        """Pool occupancy plus the metric counters, as a plain dict"""
+        with self._cond:
+            data = self.metrics.snapshot()
+            data.update(size=self.size, open=self._open, idle=len(self._idle),
+                        in_use=self._open - len(self._idle))
+        return data
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            conn._raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_raw(conn):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
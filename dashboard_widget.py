@@ -1,23 +1,28 @@
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from datetime import datetime, timedelta
 import json
 import mysql.connector
 from mysql.connector import Error
-from mysql_config import get_mysql_connection
+from date_ranges import day_range, last_days_range, period_range
+from sales_series import sales_series
+from kpi_service import load_kpis, LOW_STOCK_THRESHOLD
+from query_worker import QueryRunner
+from theme import set_style, set_tone
 
 
 class DashboardWidget(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self.queries = QueryRunner(self)
+        self._loaded_period = None
         self.init_ui()
         self.load_data()
         
         # Auto-refresh timer
         self.timer = QTimer()
-        self.timer.timeout.connect(self.load_data)
+        self.timer.timeout.connect(self.refresh_if_visible)
         self.timer.start(30000)  # Refresh every 30 seconds
     
     def init_ui(self):
@@ -65,10 +70,10 @@ class DashboardWidget(QWidget):
         self.kpi_layout.setSpacing(15)
         self.kpi_container.setLayout(self.kpi_layout)
         
-        self.revenue_card = self.create_kpi_card("REVENUE", "0.00 DA", "#4CAF50", "💰", 180)
-        self.transactions_card = self.create_kpi_card("TRANSACTIONS", "0", "#2196F3", "🛒", 180)
-        self.products_card = self.create_kpi_card("PRODUCTS", "0", "#FFC107", "📦", 180)
-        self.low_stock_card = self.create_kpi_card("LOW STOCK", "0", "#F44336", "⚠️", 180)
+        self.revenue_card = self.create_kpi_card("REVENUE", "0.00 DA", "green", "💰", 180)
+        self.transactions_card = self.create_kpi_card("TRANSACTIONS", "0", "blue", "🛒", 180)
+        self.products_card = self.create_kpi_card("PRODUCTS", "0", "yellow", "📦", 180)
+        self.low_stock_card = self.create_kpi_card("LOW STOCK", "0", "red", "⚠️", 180)
         
         self.kpi_layout.addWidget(self.revenue_card)
         self.kpi_layout.addWidget(self.transactions_card)
@@ -235,52 +240,27 @@ class DashboardWidget(QWidget):
             
             super().resizeEvent(event)
 
-    def create_kpi_card(self, title, value, color, icon, width=180):
-        """Create KPI card with improved icon visibility"""
-        card = QWidget()
+    def create_kpi_card(self, title, value, tone, icon, width=180):
+        """Create KPI card (tone: one of theme.TONES)"""
+        card = set_style(QWidget(), 'card', tone)
         card.setMinimumSize(width, 120)
-        card.setStyleSheet(f"""
-            QWidget {{
-                background: white;
-                border-radius: 10px;
-                border-left: 5px solid {color};
-                padding: 15px;
-            }}
-        """)
         
         layout = QVBoxLayout()
-        layout.setContentsMargins(5, 5, 5, 5)
+        layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(5)
         
         # Value with icon
         value_layout = QHBoxLayout()
         
-        icon_label = QLabel(icon)
-        icon_label.setStyleSheet(f"""
-            font-size: 36px;  /* Larger icon */
-            color: {color};
-        """)
-        
-        value_label = QLabel(value)
-        value_label.setStyleSheet(f"""
-            font-size: 24px;
-            font-weight: bold;
-            color: {color};
-        """)
+        icon_label = set_style(QLabel(icon), 'card-icon', tone)
+        value_label = set_style(QLabel(value), 'card-value', tone)
         
         value_layout.addWidget(icon_label)
         value_layout.addWidget(value_label)
         value_layout.addStretch()
         
         # Title
-        title_label = QLabel(title)
-        title_label.setStyleSheet("""
-            font-size: 16px;
-            font-weight: bold;
-            color: #616161;
-            border-top: 1px solid #EEEEEE;
-            padding-top: 8px;
-        """)
+        title_label = set_style(QLabel(title), 'card-title')
         
         layout.addLayout(value_layout)
         layout.addWidget(title_label)
@@ -305,129 +285,79 @@ class DashboardWidget(QWidget):
     
     def load_data(self):
         """Load dashboard data based on selected period"""
-        cursor = self.parent.conn.cursor()
-        
         # Get date filter based on selection
         period = self.date_range_combo.currentText() if hasattr(self, 'date_range_combo') else "Today"
         date_filter = self.get_date_filter(period)
         
-        # Load KPI data with proper filtering
-        if date_filter:
-            # Revenue for selected period
-            cursor.execute("SELECT COALESCE(SUM(total_price), 0) FROM tickets WHERE date >= %s", (date_filter,))
-            total_revenue = cursor.fetchone()[0]
-            
-            # Transaction count for selected period
-            cursor.execute("SELECT COUNT(*) FROM tickets WHERE date >= %s", (date_filter,))
-            total_transactions = cursor.fetchone()[0]
-        else:
-            # All time data
-            cursor.execute("SELECT COALESCE(SUM(total_price), 0) FROM tickets")
-            total_revenue = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM tickets")
-            total_transactions = cursor.fetchone()[0]
+        # Skeleton while a new period loads; auto-refreshes keep the old figures
+        if period != self._loaded_period:
+            self.show_loading()
+        self._loaded_period = period
         
+        # Each section is queried in the background and filled in as it arrives
+        self.queries.submit('kpis', load_kpis, self.show_kpis, date_filter)
+        self.load_top_products(date_filter)
+        self.load_low_stock_alerts()
+        self.load_chart_data(period)
+    
+    def show_loading(self):
+        """Placeholder state shown until the first results of a period arrive"""
+        for card in (self.revenue_card, self.transactions_card, self.products_card, self.low_stock_card):
+            card.value_label.setText("…")
+        self.top_products_table.setRowCount(0)
+        self.low_stock_list.clear()
+        self.low_stock_list.addItem("Loading…")
+    
+    def show_kpis(self, kpis):
+        """Fill the KPI cards from a KpiSnapshot"""
         # Update KPI cards with clear labels
-        self.revenue_card.value_label.setText(f"{total_revenue:.2f} DA")
-        self.transactions_card.value_label.setText(str(total_transactions))
-        
-        # Total products in stock
-        cursor.execute("SELECT COUNT(*) FROM products WHERE quantity > 0")
-        products_in_stock = cursor.fetchone()[0]
-        self.products_card.value_label.setText(str(products_in_stock))
+        self.revenue_card.value_label.setText(f"{kpis.revenue:.2f} DA")
+        self.transactions_card.value_label.setText(str(kpis.transactions))
+        self.products_card.value_label.setText(str(kpis.in_stock))
         
-        # Low stock items count
-        cursor.execute("SELECT COUNT(*) FROM products WHERE quantity < 10 AND quantity > 0")
-        low_stock_count = cursor.fetchone()[0]
-        
-        # Out of stock count
-        cursor.execute("SELECT COUNT(*) FROM products WHERE quantity <= 0")
-        out_of_stock_count = cursor.fetchone()[0]
-        
-        total_alerts = low_stock_count + out_of_stock_count
+        total_alerts = kpis.stock_alerts
         self.low_stock_card.value_label.setText(str(total_alerts))
 
         # Update card colors based on stock status
-        if total_alerts > 0:
-            self.low_stock_card.setStyleSheet("""
-                QWidget {
-                    background: white;
-                    border: 1px solid #e9ecef;
-                    border-radius: 12px;
-                    border-left: 4px solid #dc3545;
-                    padding: 20px;
-                }
-            """)
-        else:
-            self.low_stock_card.setStyleSheet("""
-                QWidget {
-                    background: white;
-                    border: 1px solid #e9ecef;
-                    border-radius: 12px;
-                    border-left: 4px solid #28a745;
-                    padding: 20px;
-                }
-            """)
-        
-        # Load detailed data
-        self.load_top_products(date_filter)
-        self.load_low_stock_alerts()
-        self.load_chart_data(period)
+        set_tone(self.low_stock_card, 'red' if total_alerts > 0 else 'green')
     
     def get_date_filter(self, period):
-        """Get date filter based on selected period"""
-        now = datetime.now()
-        
-        if period == "Today":
-            return now.strftime("%Y-%m-%d")
-        elif period == "This Week":
-            week_start = now - timedelta(days=now.weekday())
-            return week_start.strftime("%Y-%m-%d")
-        elif period == "This Month":
-            return now.strftime("%Y-%m-01")
-        else:  # All Time
-            return None
+        """Get the [start, end) date range for the selected period (None for all time)"""
+        return period_range(period)
     
     def load_top_products(self, date_filter):
         """Load top selling products with full names"""
-        cursor = self.parent.conn.cursor()
-        
+        self.queries.submit('top_products', self.fetch_top_products, self.show_top_products, date_filter)
+    
+    @staticmethod
+    def fetch_top_products(cursor, date_filter):
         if date_filter:
             cursor.execute("""
                 SELECT 
-                    JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].name'))) as product_name,
-                    SUM(CAST(JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].quantity'))) AS UNSIGNED)) as total_quantity,
-                    SUM(CAST(JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].total'))) AS DECIMAL(10,2))) as total_revenue
-                FROM tickets
-                CROSS JOIN (
-                    SELECT 0 as n UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 
-                    UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9
-                ) numbers
-                WHERE date >= %s
-                AND JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].name'))) IS NOT NULL
+                    product_name,
+                    SUM(quantity) as total_quantity,
+                    SUM(total_price) as total_revenue
+                FROM sales
+                WHERE date >= %s AND date < %s
                 GROUP BY product_name
                 ORDER BY total_quantity DESC
                 LIMIT 10
-            """, (date_filter,))
+            """, date_filter.params())
         else:
             cursor.execute("""
                 SELECT 
-                    JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].name'))) as product_name,
-                    SUM(CAST(JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].quantity'))) AS UNSIGNED)) as total_quantity,
-                    SUM(CAST(JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].total'))) AS DECIMAL(10,2))) as total_revenue
-                FROM tickets
-                CROSS JOIN (
-                    SELECT 0 as n UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 
-                    UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9
-                ) numbers
-                WHERE JSON_UNQUOTE(JSON_EXTRACT(items, CONCAT('$[', numbers.n, '].name'))) IS NOT NULL
+                    product_name,
+                    SUM(quantity) as total_quantity,
+                    SUM(total_price) as total_revenue
+                FROM sales
                 GROUP BY product_name
                 ORDER BY total_quantity DESC
                 LIMIT 10
             """)
         
-        products = cursor.fetchall()
+        return cursor.fetchall()
+    
+    def show_top_products(self, products):
         self.top_products_table.setRowCount(len(products))
         
         for row, (name, quantity, revenue) in enumerate(products):
@@ -448,15 +378,19 @@ class DashboardWidget(QWidget):
     
     def load_low_stock_alerts(self):
         """Load specific low stock items with details"""
-        cursor = self.parent.conn.cursor()
+        self.queries.submit('low_stock', self.fetch_low_stock_alerts, self.show_low_stock_alerts)
+    
+    @staticmethod
+    def fetch_low_stock_alerts(cursor):
         cursor.execute("""
             SELECT name, quantity, price_sell 
             FROM products 
-            WHERE quantity < 10
+            WHERE quantity < %s
             ORDER BY quantity ASC, name ASC
-        """)
-        
-        items = cursor.fetchall()
+        """, (LOW_STOCK_THRESHOLD,))
+        return cursor.fetchall()
+    
+    def show_low_stock_alerts(self, items):
         self.low_stock_list.clear()
         
         if not items:
@@ -479,39 +413,27 @@ class DashboardWidget(QWidget):
     
     def load_chart_data(self, period):
         """Load chart data with improved visualization"""
-        cursor = self.parent.conn.cursor()
-        
-        # Get sales data based on period
+        self.queries.submit('chart', self.fetch_chart_data,
+                            lambda chart_data: self.show_chart_data(chart_data, period), period)
+    
+    def show_chart_data(self, chart_data, period):
+        self.chart_data = list(reversed(chart_data))
+        self.update_chart(period)
+    
+    @staticmethod
+    def fetch_chart_data(cursor, period):
+        """Query the per-hour or per-day sales amounts for the chart"""
+        # Get sales data based on period, one grouped query either way
         if period == "Today":
             # Hourly data for today
-            chart_data = []
-            today = datetime.now().strftime("%Y-%m-%d")
-            for hour in range(24):
-                hour_start = f"{today} {hour:02d}:00:00"
-                hour_end = f"{today} {hour:02d}:59:59"
-                cursor.execute("""
-                    SELECT COALESCE(SUM(total_price), 0)
-                    FROM tickets 
-                    WHERE date >= %s AND date <= %s
-                """, (hour_start, hour_end))
-                amount = cursor.fetchone()[0]
-                chart_data.append((f"{hour:02d}:00", amount))
+            series = sales_series(cursor, day_range(), 'hour')
+            chart_data = [(p.start.strftime("%H:00"), p.total) for p in series]
         else:
-            # Daily data for last 7 days
-            chart_data = []
-            for i in range(7):
-                date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-                cursor.execute("""
-                    SELECT COALESCE(SUM(total_price), 0)
-                    FROM tickets 
-                    WHERE DATE(date) = %s
-                """, (date,))
-                amount = cursor.fetchone()[0]
-                day_name = (datetime.now() - timedelta(days=i)).strftime("%a")
-                chart_data.append((day_name, amount))
+            # Daily data for last 7 days, most recent first
+            series = sales_series(cursor, last_days_range(7), 'day')
+            chart_data = [(p.start.strftime("%a"), p.total) for p in reversed(series)]
         
-        self.chart_data = list(reversed(chart_data))
-        self.update_chart(period)
+        return chart_data
     
     def update_chart(self, period):
         """Update the chart with improved visualization"""
@@ -572,8 +494,19 @@ class DashboardWidget(QWidget):
         
         self.sales_chart.setLayout(layout)
     
+    def refresh_if_visible(self):
+        """Auto-refresh tick; a dashboard kept alive off screen skips it"""
+        if self.isVisible():
+            self.load_data()
+    
+    def screen_shown(self, hidden_for):
+        """Back on screen: reload if an auto-refresh was skipped meanwhile"""
+        if hidden_for >= 30:
+            self.load_data()
+    
     def closeEvent(self, event):
         """Clean up timer when widget is closed"""
         if hasattr(self, 'timer'):
             self.timer.stop()
+        self.queries.cancel()
         event.accept()
@@ -4,6 +4,9 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 
+from sales_ledger import backfill_tickets
+from schema_migrations import migrate
+
 load_dotenv()
 
 def get_mysql_config():
@@ -104,10 +107,14 @@ def create_database():
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 ticket_id INT,
                 product_id INT,
+                product_name VARCHAR(255),
                 quantity INT,
                 unit_price DECIMAL(10,2),
                 total_price DECIMAL(10,2),
                 date DATETIME,
+                INDEX idx_sales_ticket (ticket_id),
+                INDEX idx_sales_date_product (date, product_id),
+                INDEX idx_sales_product_date (product_id, date),
                 FOREIGN KEY (ticket_id) REFERENCES tickets (id),
                 FOREIGN KEY (product_id) REFERENCES products (id)
             )
@@ -133,6 +140,9 @@ def create_database():
             )
         ''')
         
+        # Indexes, constraints and columns added after the tables above
+        migrate(cursor, conn)
+
         print("Checking for existing data...")
         
         # Check if admin user already exists
@@ -214,6 +224,9 @@ def create_database():
                     INSERT INTO tickets (ticket_number, date, total_price, remis, payment_method, customer_name, items, status, cashier_id)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ''', (*ticket, 'Completed', 1))
+
+            # Sale lines for the sample tickets
+            backfill_tickets(cursor)
         else:
             print("Sample data already exists. Skipping insertion.")
         
@@ -0,0 +1,85 @@
+"""
+Half-open date ranges for SQL filters.
+
+`date LIKE '2024-05-01%'` and `DATE(date) = %s` wrap the column, so MySQL
+cannot use the tickets.date index and scans the whole table. A DateRange
+is rendered as `date >= start AND date < end` instead, which stays an
+index range scan and never drops rows stamped at 23:59:59.5.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+
+class DateRange(NamedTuple):
+    """Interval [start, end) of datetimes"""
+    start: datetime
+    end: datetime
+
+    def sql(self, column='date'):
+        """WHERE fragment for this range on the given column"""
+        return f"{column} >= %s AND {column} < %s"
+
+    def params(self):
+        return (self.start, self.end)
+
+    def days(self):
+        return (self.end - self.start).days
+
+
+def to_day(value=None):
+    """Midnight of a date, datetime or 'YYYY-MM-DD' string (today if None)"""
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d")
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime(value.year, value.month, value.day)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_range(value=None):
+    start = to_day(value)
+    return DateRange(start, start + timedelta(days=1))
+
+
+def week_range(value=None):
+    """Monday-based week containing the given day"""
+    day = to_day(value)
+    start = day - timedelta(days=day.weekday())
+    return DateRange(start, start + timedelta(days=7))
+
+
+def month_range(value=None):
+    start = to_day(value).replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return DateRange(start, end)
+
+
+def custom_range(from_day, to_day_inclusive):
+    """Range covering whole days from_day..to_day_inclusive"""
+    start = to_day(from_day)
+    end = to_day(to_day_inclusive) + timedelta(days=1)
+    if end <= start:
+        start, end = end - timedelta(days=1), start + timedelta(days=1)
+    return DateRange(start, end)
+
+
+def last_days_range(days, value=None):
+    """The given number of whole days ending with (and including) the given day"""
+    end = to_day(value) + timedelta(days=1)
+    return DateRange(end - timedelta(days=days), end)
+
+
+def period_range(period, value=None):
+    """Range for the dashboard period names; None means all time"""
+    if period == "Today":
+        return day_range(value)
+    elif period == "This Week":
+        return week_range(value)
+    elif period == "This Month":
+        return month_range(value)
+    return None
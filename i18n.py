@@ -91,6 +91,7 @@ _STRINGS: Dict[str, Dict[str, str]] = {
     "ADDED": {"en": "Added: {name}", "ar": "تمت إضافة: {name}"},
     "PLEASE_ENTER_BARCODE": {"en": "Please enter a barcode", "ar": "يرجى إدخال الباركود"},
     "PRODUCT_NOT_FOUND": {"en": "Product not found", "ar": "المنتج غير موجود"},
+    "QUANTITY_PENDING": {"en": "Quantity × {quantity}: scan the item", "ar": "الكمية × {quantity}: امسح المنتج"},
 
     # Sales flow
     "EMPTY_CART": {"en": "Cart is empty", "ar": "السلة فارغة"},
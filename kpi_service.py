@@ -0,0 +1,69 @@
+"""
+Dashboard and main-menu counters in one round trip.
+
+Ticket totals for the period and every product stock counter are computed
+with conditional aggregation in two derived tables joined into a single
+row, instead of one SELECT per card.
+"""
+
+from dataclasses import dataclass
+
+from mysql_config import MySQLConnectionManager
+
+LOW_STOCK_THRESHOLD = 10
+
+
+@dataclass
+class KpiSnapshot:
+    """Counters shown on the dashboard and main-menu cards"""
+    transactions: int = 0       # tickets in the period
+    revenue: float = 0.0        # sum of ticket totals in the period
+    total_products: int = 0
+    in_stock: int = 0           # quantity > 0
+    low_stock: int = 0          # 0 < quantity < threshold
+    out_of_stock: int = 0       # quantity <= 0
+    below_threshold: int = 0    # quantity < threshold, out of stock included
+
+    @property
+    def stock_alerts(self):
+        return self.low_stock + self.out_of_stock
+
+    @property
+    def average_sale(self):
+        return self.revenue / self.transactions if self.transactions else 0.0
+
+
+def load_kpis(cursor, period=None, low_stock_threshold=LOW_STOCK_THRESHOLD):
+    """Compute a KpiSnapshot for the DateRange (None for all time) with one query"""
+    ticket_filter = f"WHERE {period.sql('date')}" if period else ""
+    params = (list(period.params()) if period else []) + [low_stock_threshold] * 2
+    cursor.execute(f"""
+        SELECT
+            t.transactions, t.revenue,
+            p.total_products, p.in_stock, p.low_stock, p.out_of_stock, p.below_threshold
+        FROM (
+            SELECT COUNT(*) as transactions, COALESCE(SUM(total_price), 0) as revenue
+            FROM tickets
+            {ticket_filter}
+        ) t
+        CROSS JOIN (
+            SELECT
+                COUNT(*) as total_products,
+                COALESCE(SUM(quantity > 0), 0) as in_stock,
+                COALESCE(SUM(quantity > 0 AND quantity < %s), 0) as low_stock,
+                COALESCE(SUM(quantity <= 0), 0) as out_of_stock,
+                COALESCE(SUM(quantity < %s), 0) as below_threshold
+            FROM products
+        ) p
+    """, params)
+    row = cursor.fetchone()
+    if not row:
+        return KpiSnapshot()
+    transactions, revenue, *stock = row
+    return KpiSnapshot(int(transactions), float(revenue), *(int(value) for value in stock))
+
+
+def fetch_kpis(period=None, low_stock_threshold=LOW_STOCK_THRESHOLD):
+    """load_kpis on a pooled connection"""
+    with MySQLConnectionManager() as (cursor, conn):
+        return load_kpis(cursor, period, low_stock_threshold)
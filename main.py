@@ -1,7 +1,25 @@
 import sys
+
+import startup_profile
+
+# Time every import below when started with --profile-startup
+_profile = startup_profile.requested(sys.argv)
+if _profile:
+    startup_profile.enable(_profile if isinstance(_profile, str) else None)
+
 import mysql.connector
-from mysql.connector import Error
-from mysql_config import get_mysql_connection, MySQLConnectionManager
+from mysql.connector import Error, errorcode
+from mysql_config import get_connection_pool, MySQLConnectionManager
+from date_ranges import day_range, month_range
+from sales_series import sales_series, series_totals
+from kpi_service import fetch_kpis
+from query_worker import QueryRunner
+from ticket_sequence import DEFAULT_FORMAT, format_ticket_number, get_numberer
+from offline_journal import get_journal, start_replication
+from schema_migrations import run_migrations
+from unknown_barcodes import stop_collector
+from screen_manager import ScreenManager, lazy_class
+import theme
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
@@ -9,23 +27,18 @@ from datetime import datetime
 import json
 import os
 import time
-from dashboard_widget import DashboardWidget
-from pos_widget import POSWidget
-from product_management_widget import ProductManagementWidget
-from ticket_management_widget import TicketManagementWidget
-from reports_widget import ReportsWidget
 from i18n import tr, set_language
 
-# Initialize MySQL connection on startup
-try:
-    conn = get_mysql_connection()
-    if not conn:
-        from database_setup import create_database
-        create_database()
-        conn = get_mysql_connection()
-except Error as e:
-    print(f"Database connection error: {e}")
-    conn = None
+# Screens living in their own modules are imported on first visit; the POS
+# pulls in the camera stack, which only loads once scanning starts
+LAZY_SCREENS = {
+    'pos': lazy_class('pos_widget', 'POSWidget'),
+    'dashboard': lazy_class('dashboard_widget', 'DashboardWidget'),
+    'products': lazy_class('product_management_widget', 'ProductManagementWidget'),
+    'tickets': lazy_class('ticket_management_widget', 'TicketManagementWidget'),
+    'reports': lazy_class('reports_widget', 'ReportsWidget'),
+    'unknown_barcodes': lazy_class('unknown_barcodes_widget', 'UnknownBarcodesWidget'),
+}
 
 
 class POSApplication(QMainWindow):
@@ -38,19 +51,23 @@ class POSApplication(QMainWindow):
         self.showMaximized()
         self.setMinimumSize(1200, 800)
 
-        # Apply modern styling
-        self.setStyleSheet(self.get_modern_stylesheet())
+        # Apply modern styling (light until the settings say otherwise)
+        theme.apply_theme(QApplication.instance(), dark=False)
 
         # Initialize database
-        self.conn = None
         self.current_user = None
-        self.init_database()
+        self.offline = False
+        with startup_profile.phase("database connect"):
+            self.init_database()
 
         # Load app theme and language
-        self.load_app_settings()
+        with startup_profile.phase("settings"):
+            self.load_app_settings()
 
         # Show login screen
-        self.show_login_screen()
+        with startup_profile.phase("main window"):
+            self.init_screens()
+            self.show_login_screen()
 
         # Enable keyboard shortcuts
         self.setFocusPolicy(Qt.StrongFocus)
@@ -72,78 +89,115 @@ class POSApplication(QMainWindow):
     def init_database(self):
         """Initialize database connection"""
         try:
-            self.conn = get_mysql_connection()
-            if not self.conn:
-                raise Error("Failed to connect to MySQL database")
-            
-            cursor = self.conn.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = cursor.fetchall()
+            try:
+                get_connection_pool().reopen()
+                with MySQLConnectionManager() as (cursor, conn):
+                    cursor.execute("SHOW TABLES")
+                    tables = cursor.fetchall()
+            except Error as e:
+                if e.errno != errorcode.ER_BAD_DB_ERROR:
+                    raise
+                # First run on this server: create the database, then connect again
+                from database_setup import create_database
+                create_database()
+                get_connection_pool().reopen()
+                with MySQLConnectionManager() as (cursor, conn):
+                    cursor.execute("SHOW TABLES")
+                    tables = cursor.fetchall()
 
             if not tables:
-                raise Error("Database is empty")
+                QMessageBox.critical(self, "Database Error",
+                                     "Database is empty.\n\n"
+                                     "Please run 'python database_setup.py' first to create the database.")
+                sys.exit(1)
+
+            # Replication needs the current schema (idempotency keys), so migrate before it starts
+            try:
+                _, deferred = run_migrations()
+            except RuntimeError as e:
+                QMessageBox.critical(self, "Database Error", f"Database upgrade failed:\n\n{e}")
+                sys.exit(1)
+            # Data the upgrade cannot take yet is fixed from inside the app, so start anyway
+            for reason in dict.fromkeys(reason for _, reason in deferred):
+                QMessageBox.warning(self, "Database Upgrade Pending", reason)
 
         except Error as e:
-            QMessageBox.critical(self, "Database Error",
-                                 f"Database error: {e}\n\n"
-                                 "Please run 'python database_setup.py' first to create the database.")
-            sys.exit(1)
-
+            # Keep selling from the local journal and catalog snapshot until MySQL is back
+            self.offline = True
+            QMessageBox.warning(self, "Offline Mode",
+                                f"Database unreachable: {e}\n\n"
+                                "Sales are saved on this lane and sent when the connection returns.")
+
+        start_replication()
+
+
+    def init_screens(self):
+        """Screens are built on first visit and kept alive afterwards (see screen_manager)"""
+        self.screens = ScreenManager(int(os.getenv('POS_RETAINED_SCREENS', 5)), self)
+        for name, factory, retain in (
+                ('login', LoginWidget, False),
+                ('activation', ActivationWidget, False),
+                ('main_menu', MainMenuWidget, True),
+                ('pos', LAZY_SCREENS['pos'], True),
+                ('dashboard', LAZY_SCREENS['dashboard'], True),
+                ('products', LAZY_SCREENS['products'], True),
+                ('tickets', LAZY_SCREENS['tickets'], True),
+                ('settings', SettingsWidget, True),
+                ('day_state', DayStateWidget, True),
+                ('seller_account', SellerAccountWidget, True),
+                ('reports', LAZY_SCREENS['reports'], True),
+                ('unknown_barcodes', LAZY_SCREENS['unknown_barcodes'], True)):
+            self.screens.register(name, lambda factory=factory: factory(self), retain)
+        self.setCentralWidget(self.screens)
 
     def show_login_screen(self):
-        """Show login screen"""
-        self.login_widget = LoginWidget(self)
-        self.setCentralWidget(self.login_widget)
+        """Show login screen, dropping the previous user's screens"""
+        self.login_widget = self.screens.show_screen('login')
+        self.screens.clear(keep='login')
 
     def show_activation_screen(self):
         """Show activation screen"""
-        self.activation_widget = ActivationWidget(self)
-        self.setCentralWidget(self.activation_widget)
+        self.activation_widget = self.screens.show_screen('activation')
 
     def show_main_menu(self):
         """Show main menu"""
-        self.main_menu_widget = MainMenuWidget(self)
-        self.setCentralWidget(self.main_menu_widget)
+        self.main_menu_widget = self.screens.show_screen('main_menu')
 
     def show_pos_screen(self):
         """Show POS interface"""
-        self.pos_widget = POSWidget(self)
-        self.setCentralWidget(self.pos_widget)
+        self.pos_widget = self.screens.show_screen('pos')
 
     def show_dashboard(self):
         """Show dashboard"""
-        self.dashboard_widget = DashboardWidget(self)
-        self.setCentralWidget(self.dashboard_widget)
+        self.dashboard_widget = self.screens.show_screen('dashboard')
 
     def show_product_management(self):
         """Show product management"""
-        self.product_widget = ProductManagementWidget(self)
-        self.setCentralWidget(self.product_widget)
+        self.product_widget = self.screens.show_screen('products')
 
     def show_ticket_management(self):
         """Show ticket management"""
-        self.ticket_widget = TicketManagementWidget(self)
-        self.setCentralWidget(self.ticket_widget)
+        self.ticket_widget = self.screens.show_screen('tickets')
 
     def show_settings(self):
         """Show settings"""
-        self.settings_widget = SettingsWidget(self)
-        self.setCentralWidget(self.settings_widget)
+        self.settings_widget = self.screens.show_screen('settings')
 
     def show_day_state(self):
         """Show day state"""
-        self.day_state_widget = DayStateWidget(self)
-        self.setCentralWidget(self.day_state_widget)
+        self.day_state_widget = self.screens.show_screen('day_state')
 
     def show_seller_account(self):
         """Show seller account"""
-        self.seller_account_widget = SellerAccountWidget(self)
-        self.setCentralWidget(self.seller_account_widget)
+        self.seller_account_widget = self.screens.show_screen('seller_account')
 
     def show_reports(self):
         """Show reports"""
-        self.reports_widget = ReportsWidget(self)
-        self.setCentralWidget(self.reports_widget)
+        self.reports_widget = self.screens.show_screen('reports')
+
+    def show_unknown_barcodes(self):
+        """Show the review queue of unknown barcodes"""
+        self.screens.show_screen('unknown_barcodes')
 
     def keyPressEvent(self, event):
         """Handle keyboard shortcuts restricting cashier role."""
@@ -151,7 +205,7 @@ class POSApplication(QMainWindow):
         role = (user.get("role") if user else "") or ""
         is_cashier = role.lower() == "cashier"
 
-        if hasattr(self, 'main_menu_widget') and self.centralWidget() == self.main_menu_widget:
+        if self.screens.current_name() == 'main_menu':
             key = event.key()
             if key == Qt.Key_F1 and not is_cashier:
                 self.show_dashboard()
@@ -167,252 +221,28 @@ class POSApplication(QMainWindow):
                 self.show_reports()
         super().keyPressEvent(event)
 
-    def get_modern_stylesheet(self):
-        return """
-            QMainWindow {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #f3f4f6, stop:1 #e5e7eb);
-                font-family: 'Segoe UI', 'Arial', sans-serif;
-            }
-
-            QPushButton {
-                border: none;
-                border-radius: 8px;
-                padding: 12px 20px;
-                font-weight: 600;
-                font-size: 14px;
-                color: white;
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #10b981, stop:1 #059669);
-            }
-
-            QushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #34d399, stop:1 #10b981);
-            }
-
-            QPushButton:pressed {
-                background: #047857;
-            }
-
-            QLineEdit, QTextEdit, QComboBox {
-                border: 2px solid #e5e7eb;
-                border-radius: 8px;
-                padding: 12px 16px;
-                font-size: 14px;
-                background-color: white;
-                selection-background-color: #10b981;
-            }
-
-            QLineEdit:focus, QTextEdit:focus, QComboBox:focus {
-                border-color: #10b981;
-            }
-
-            QLabel {
-                color: #1f2937;
-                font-size: 14px;
-            }
-
-            QTableWidget {
-               border: 1px solid #e5e7eb;
-                border-radius: 8px;
-                background-color: white;
-                gridline-color: #e5e7eb;
-                font-size: 13px;
-                selection-background-color: #d1fae5;
-                selection-color: #065f46;
-            }
-
-            QTableWidget::item {
-                padding: 10px;
-                border-bottom: 1px solid #f3f4f6;
-            }
-
-            QTableWidget::item:selected {
-                background-color: #d1fae5;
-                color: #065f46;
-            }
-
-            QHeaderView::section {
-                background: #f9fafb;
-                padding: 12px;
-                border: none;
-                border-bottom: 2px solid #e5e7eb;
-                font-weight: 600;
-                font-size: 12px;
-                color: #374151;
-            }
-
-            QGroupBox {
-                font-weight: 600;
-                font-size: 16px;
-                border: 2px solid #e5e7eb;
-                border-radius: 8px;
-                margin-top: 12px;
-                padding-top: 16px;
-                background-color: white;
-            }
-
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 12px;
-                padding: 0 8px;
-                color: #374151;
-                background-color: white;
-            }
-
-            QTabWidget::pane {
-                border: 1px solid #e5e7eb;
-                border-radius: 8px;
-                background-color: white;
-                margin-top: -1px;
-            }
-
-            QTabBar::tab {
-                background: #f3f4f6;
-                padding: 12px 24px;
-                margin-right: 2px;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-                font-weight: 600;
-                color: #6b7280;
-            }
-
-            QTabBar::tab:selected {
-                background: white;
-                color: #10b981;
-                border-bottom: 2px solid #10b981;
-            }
-
-            QTabBar::tab:hover:!selected {
-                background: #e5e7eb;
-            }
-        """
-
     def apply_theme(self, dark: bool):
         app = QApplication.instance()
         if not app:
             return
-        app.setStyle("Fusion")
-        if dark:
-            palette = QPalette()
-            # Base surfaces
-            palette.setColor(QPalette.Window, QColor(24, 24, 27))        # zinc-900
-            palette.setColor(QPalette.Base, QColor(17, 17, 19))          # near-black
-            palette.setColor(QPalette.AlternateBase, QColor(32, 32, 36))
-            # Text
-            palette.setColor(QPalette.WindowText, QColor(229, 231, 235)) # gray-200
-            palette.setColor(QPalette.Text, QColor(229, 231, 235))
-            palette.setColor(QPalette.ButtonText, QColor(229, 231, 235))
-            palette.setColor(QPalette.ToolTipBase, QColor(17, 17, 19))
-            palette.setColor(QPalette.ToolTipText, QColor(229, 231, 235))
-            # Controls
-            palette.setColor(QPalette.Button, QColor(38, 38, 42))
-            # Accents
-            palette.setColor(QPalette.Highlight, QColor(16, 185, 129))   # emerald-500
-            palette.setColor(QPalette.HighlightedText, QColor(17, 24, 39))
-            palette.setColor(QPalette.BrightText, QColor(239, 68, 68))   # red-500
-            app.setPalette(palette)
-
-            # App-wide stylesheet to normalize component-level "white" backgrounds
-            app.setStyleSheet("""
-                QMainWindow, QWidget {
-                    background-color: #18181b;
-                    color: #e5e7eb;
-                }
-                QPushButton {
-                    background-color: #10b981;
-                    color: #081016;
-                    border: none; border-radius: 8px; padding: 10px 16px; font-weight: 600;
-                }
-                QPushButton:hover { background-color: #34d399; }
-                QPushButton:pressed { background-color: #059669; }
-
-                QLineEdit, QTextEdit, QComboBox, QDateEdit {
-                    background-color: #111115;
-                    color: #e5e7eb;
-                    border: 1px solid #3f3f46;
-                    border-radius: 8px;
-                    selection-background-color: #10b981;
-                    selection-color: #081016;
-                }
-                QLineEdit:focus, QTextEdit:focus, QComboBox:focus, QDateEdit:focus {
-                    border: 1px solid #10b981;
-                }
-
-                QLabel { color: #e5e7eb; }
-
-                QTableWidget {
-                    background-color: #111115;
-                    color: #e5e7eb;
-                    border: 1px solid #27272a;
-                    gridline-color: #27272a;
-                }
-                QHeaderView::section {
-                    background-color: #202022;
-                    color: #d1d5db;
-                    border: none;
-                    border-bottom: 1px solid #27272a;
-                    padding: 10px;
-                }
-                QTableWidget::item:selected {
-                    background: #064e3b;
-                    color: #ecfdf5;
-                }
-
-                QGroupBox {
-                    background-color: #111115;
-                    border: 1px solid #27272a;
-                    border-radius: 8px;
-                    margin-top: 12px;
-                    padding-top: 16px;
-                }
-                QGroupBox::title {
-                    color: #d1d5db;
-                    subcontrol-origin: margin;
-                    left: 12px;
-                    padding: 0 6px;
-                    background-color: #111115;
-                }
-
-                QTabWidget::pane {
-                    background-color: #111115;
-                    border: 1px solid #27272a;
-                    border-radius: 8px;
-                }
-                QTabBar::tab {
-                    background-color: #202022;
-                    color: #a3a3a3;
-                    padding: 10px 18px;
-                    border-top-left-radius: 8px;
-                    border-top-right-radius: 8px;
-                    margin-right: 2px;
-                }
-                QTabBar::tab:selected {
-                    background-color: #111115;
-                    color: #10b981;
-                    border-bottom: 2px solid #10b981;
-                }
-            """)
-        else:
-            app.setPalette(QPalette())
-            app.setStyleSheet("")
+        theme.apply_theme(app, dark)
 
     def apply_language(self, lang: str):
         app = QApplication.instance()
         if not app:
             return
         app.setLayoutDirection(Qt.LeftToRight)
-        # Force relayout
-        if self.centralWidget():
-            self.centralWidget().update()
+        # Screens kept alive were built with the old texts; rebuild them on their next visit
+        if hasattr(self, 'screens'):
+            self.screens.clear(keep=self.screens.current_name())
+            self.screens.update()
 
     def load_app_settings(self):
         """Load Dark Mode and Language from DB settings and apply."""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT `key`, value FROM settings")
-            data = dict(cursor.fetchall())
+            with MySQLConnectionManager() as (cursor, conn):
+                cursor.execute("SELECT `key`, value FROM settings")
+                data = dict(cursor.fetchall())
             dark = data.get("dark_mode", "off").lower() in ("1", "true", "on", "yes")
             lang = data.get("language", "en")
             set_language(lang)
@@ -558,7 +388,7 @@ class LoginWidget(QWidget):
             color: #dc3545;
             font-size: 14px;
             font-weight: 600;
-           极 margin: 10px 0;
+            margin: 10px 0;
             padding: 10px;
             background-color: #f8d7da;
             border: 1px solid #f5c6cb;
@@ -636,10 +466,28 @@ class LoginWidget(QWidget):
             self.show_error("Please enter both username and password")
             return
 
-        cursor = self.parent.conn.cursor()
-        # FIXED: Use %s instead of ? for MySQL
-        cursor.execute('SELECT * FROM users WHERE username = %s AND password = %s', (username, password))
-        user = cursor.fetchone()
+        try:
+            with MySQLConnectionManager() as (cursor, conn):
+                # FIXED: Use %s instead of ? for MySQL
+                cursor.execute('SELECT * FROM users WHERE username = %s AND password = %s', (username, password))
+                user = cursor.fetchone()
+
+                if user:
+                    # Update last login
+                    # FIXED: Use %s instead of ? for MySQL
+                    cursor.execute('UPDATE users SET last_login = %s WHERE id = %s',
+                                   (datetime.now(), user[0]))
+        except Error as e:
+            # Offline: users who logged in on this lane before can still sell
+            print(f"Login against the database failed, checking offline logins: {e}")
+            profile = get_journal().check_user(username, password)
+            if profile is None:
+                self.show_error("Database unreachable and no offline login for this user")
+                return
+            self.parent.current_user = profile
+            self.error_label.hide()
+            self.parent.show_main_menu()
+            return
 
         if user:
             self.parent.current_user = {
@@ -649,12 +497,7 @@ class LoginWidget(QWidget):
                 'full_name': user[4],
                 'email': user[5]
             }
-
-            # Update last login
-            # FIXED: Use %s instead of ? for MySQL
-            cursor.execute('UPDATE users SET last_login = %s WHERE id = %s',
-                           (datetime.now(), user[0]))
-            self.parent.conn.commit()
+            get_journal().remember_user(username, password, self.parent.current_user)
 
             self.error_label.hide()
             self.parent.show_main_menu()
@@ -681,7 +524,7 @@ class ActivationWidget(QWidget):
         left_panel = QWidget()
         left_panel.setStyleSheet("""
             QWidget {
-                background: qlineargradient(x1:0, y1:0,极2:1, y2:1,
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
                     stop:0 #667eea, stop:1 #764ba2);
             }
         """)
@@ -730,7 +573,7 @@ class ActivationWidget(QWidget):
         right_panel.setStyleSheet("background-color: white;")
         right_layout = QVBoxLayout()
         right_layout.setAlignment(Qt.AlignCenter)
-        right_layout.setContentsMargins(60, 极0, 60, 60)
+        right_layout.setContentsMargins(60, 60, 60, 60)
 
         welcome_label = QLabel("Get Started!")
         welcome_label.setAlignment(Qt.AlignCenter)
@@ -791,60 +634,32 @@ class MainMenuWidget(QWidget):
         self.init_ui()
         self.setFocusPolicy(Qt.StrongFocus)
 
-    def create_menu_button(self, title, icon, shortcut, description, callback, color):
-        """Create a menu button widget"""
-        btn_widget = QWidget()
+    def create_menu_button(self, title, icon, shortcut, description, callback, tone):
+        """Create a menu button widget (tone: one of theme.TONES)"""
+        btn_widget = theme.set_style(QWidget(), 'tile', tone)
         btn_widget.setFixedSize(200, 140)
-        btn_widget.setStyleSheet(f"""
-            QWidget {{
-                background: white;
-                border: 1px solid #e9ecef;
-                border-radius: 10px;
-                border-left: 4px solid {color};
-            }}
-            QWidget:hover {{
-                border-color: {color};
-                background: #f8f9fa;
-            }}
-        """)
+        btn_widget.setAttribute(Qt.WA_Hover, True)
 
         layout = QVBoxLayout()
         layout.setContentsMargins(10, 10, 10, 10)
         layout.setSpacing(5)
 
         # Icon
-        icon_label = QLabel(icon)
+        icon_label = theme.set_style(QLabel(icon), 'card-icon', tone)
         icon_label.setAlignment(Qt.AlignCenter)
-        icon_label.setStyleSheet(f"""
-            font-size: 28px;
-            color: {color};
-        """)
 
         # Title
-        title_label = QLabel(title)
+        title_label = theme.set_style(QLabel(title), 'tile-title')
         title_label.setAlignment(Qt.AlignCenter)
-        title_label.setStyleSheet("""
-            font-size: 14px;
-            font-weight: bold;
-            color: #333;
-        """)
 
         # Shortcut
-        shortcut_label = QLabel(shortcut)
+        shortcut_label = theme.set_style(QLabel(shortcut), 'card-subtext')
         shortcut_label.setAlignment(Qt.AlignCenter)
-        shortcut_label.setStyleSheet("""
-            font-size: 11px;
-            color: #6c757d;
-        """)
 
         # Description
-        desc_label = QLabel(description)
+        desc_label = theme.set_style(QLabel(description), 'card-subtext')
         desc_label.setAlignment(Qt.AlignCenter)
         desc_label.setWordWrap(True)
-        desc_label.setStyleSheet("""
-            font-size: 10px;
-            color: #868e96;
-        """)
 
         layout.addWidget(icon_label)
         layout.addWidget(title_label)
@@ -861,38 +676,16 @@ class MainMenuWidget(QWidget):
 
     def create_quick_stats(self):
         """Create quick stats widget"""
-        stats_widget = QWidget()
-        stats_widget.setStyleSheet("""
-            QWidget {
-                background: white;
-                border: 1px solid #e9ecef;
-                border-radius: 8px;
-                padding: 15px;
-            }
-        """)
+        stats_widget = theme.set_style(QWidget(), 'panel')
 
         layout = QHBoxLayout()
         layout.setSpacing(15)
 
         # Get stats from database
-        cursor = self.parent.conn.cursor()
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        # Today's sales
-        cursor.execute("""
-            SELECT COUNT(*), COALESCE(SUM(total_price), 0) 
-            FROM tickets 
-            WHERE date LIKE %s
-        """, (f"{today}%",))
-        today_count, today_sales = cursor.fetchone() or (0, 0.0)
-
-        # Total products
-        cursor.execute("SELECT COUNT(*) FROM products")
-        total_products = cursor.fetchone()[0] or 0
-
-        # Low stock items
-        cursor.execute("SELECT COUNT(*) FROM products WHERE quantity < 10")
-        low_stock = cursor.fetchone()[0] or 0
+        kpis = fetch_kpis(day_range())
+        today_count, today_sales = kpis.transactions, kpis.revenue
+        total_products = kpis.total_products
+        low_stock = kpis.below_threshold
 
         # Create stat cards
         stats = [
@@ -900,74 +693,46 @@ class MainMenuWidget(QWidget):
                 "title": "SALES TODAY",
                 "value": f"{today_sales:,.2f} DA",
                 "icon": "💰",
-                "color": "#28a745",
+                "tone": "green",
                 "subtext": f"{today_count} transactions"
             },
             {
                 "title": "TOTAL PRODUCTS",
                 "value": total_products,
                 "icon": "📦",
-                "color": "#17a2b8",
+                "tone": "sky",
                 "subtext": "in inventory"
             },
             {
                 "title": "LOW STOCK",
                 "value": low_stock,
                 "icon": "⚠️" if low_stock > 0 else "✓",
-                "color": "#dc3545" if low_stock > 0 else "#28a745",
+                "tone": "red" if low_stock > 0 else "green",
                 "subtext": "needs reorder" if low_stock > 0 else "all stocked"
             }
         ]
 
         for stat in stats:
-            card = QWidget()
-            card.setStyleSheet(f"""
-                QWidget {{
-                    background: white;
-                    border-left: 3px solid {stat['color']};
-                    border-radius: 6px;
-                    padding: 12px;
-                }}
-            """)
+            card = theme.set_style(QWidget(), 'card', stat['tone'])
             card.setMinimumWidth(160)
 
             card_layout = QVBoxLayout()
             card_layout.setSpacing(5)
 
             # Title
-            title_label = QLabel(stat['title'])
-            title_label.setStyleSheet(f"""
-                font-size: 12px;
-                font-weight: bold;
-                color: {stat['color']};
-                text-transform: uppercase;
-            """)
+            title_label = theme.set_style(QLabel(stat['title']), 'card-title', stat['tone'])
 
             # Value row
             value_row = QHBoxLayout()
-            icon_label = QLabel(stat['icon'])
-            icon_label.setStyleSheet(f"""
-                font-size: 20px;
-                color: {stat['color']};
-            """)
-
-            value_label = QLabel(str(stat['value']))
-            value_label.setStyleSheet(f"""
-                font-size: 18px;
-                font-weight: bold;
-                color: {stat['color']};
-            """)
+            icon_label = theme.set_style(QLabel(stat['icon']), 'card-icon', stat['tone'])
+            value_label = theme.set_style(QLabel(str(stat['value'])), 'card-value', stat['tone'])
 
             value_row.addWidget(icon_label)
             value_row.addWidget(value_label)
             value_row.addStretch()
 
             # Subtext
-            subtext_label = QLabel(stat['subtext'])
-            subtext_label.setStyleSheet("""
-                font-size: 11px;
-                color: #6c757d;
-            """)
+            subtext_label = theme.set_style(QLabel(stat['subtext']), 'card-subtext')
 
             card_layout.addWidget(title_label)
             card_layout.addLayout(value_row)
@@ -1007,14 +772,14 @@ class MainMenuWidget(QWidget):
 
         # Menu items (filtered by role)
         all_items = [
-            ("Dashboard", "📊", "F1", "View analytics", self.parent.show_dashboard, "#4285f4"),
-            ("POS", "🛒", "F3", "Process sales", self.parent.show_pos_screen, "#28a745"),
-            ("Products", "📦", "P", "Manage stock", self.parent.show_product_management, "#17a2b8"),
-            ("Tickets", "🎫", "T", "Sales history", self.parent.show_ticket_management, "#ffc107"),
-            ("Settings", "⚙️", "F2", "System config", self.parent.show_settings, "#6c757d"),
-            ("Day State", "💰", "F4", "Daily summary", self.parent.show_day_state, "#fd7e14"),
-            ("Account", "👤", "F5", "User profile", self.parent.show_seller_account, "#6f42c1"),
-            ("Reports", "📈", "R", "Generate reports", self.parent.show_reports, "#dc3545"),
+            ("Dashboard", "📊", "F1", "View analytics", self.parent.show_dashboard, "blue"),
+            ("POS", "🛒", "F3", "Process sales", self.parent.show_pos_screen, "green"),
+            ("Products", "📦", "P", "Manage stock", self.parent.show_product_management, "sky"),
+            ("Tickets", "🎫", "T", "Sales history", self.parent.show_ticket_management, "yellow"),
+            ("Settings", "⚙️", "F2", "System config", self.parent.show_settings, "gray"),
+            ("Day State", "💰", "F4", "Daily summary", self.parent.show_day_state, "orange"),
+            ("Account", "👤", "F5", "User profile", self.parent.show_seller_account, "violet"),
+            ("Reports", "📈", "R", "Generate reports", self.parent.show_reports, "red"),
         ]
 
         user = getattr(self.parent, "current_user", None)
@@ -1039,7 +804,7 @@ class MainMenuWidget(QWidget):
             "Generate reports": "GENERATE_REPORTS",
         }
 
-        for i, (title, icon, shortcut, description, callback, color) in enumerate(menu_items):
+        for i, (title, icon, shortcut, description, callback, tone) in enumerate(menu_items):
             desc_key = desc_map[description]
             btn_widget = self.create_menu_button(
                 tr(title.upper()),
@@ -1047,7 +812,7 @@ class MainMenuWidget(QWidget):
                 shortcut,
                 tr(desc_key),  # map description text to a key variable named desc_key; see below
                 callback,
-                color,
+                tone,
             )
             row = i // columns
             col = i % columns
@@ -1141,7 +906,7 @@ class SettingsWidget(QWidget):
                 padding: 20px;
             }
             QTabBar::tab {
-                background: #极8f9fa;
+                background: #f8f9fa;
                 padding: 12px 24px;
                 margin-right: 2px;
                 border-top-left-radius: 8px;
@@ -1166,7 +931,7 @@ class SettingsWidget(QWidget):
 
         # User Management Tab
         user_tab = self.create_user_management_tab()
-        tab_widget.addTab(user极ab, "  User Management")
+        tab_widget.addTab(user_tab, "  User Management")
 
         main_layout.addLayout(header_layout)
         main_layout.addWidget(tab_widget)
@@ -1188,6 +953,11 @@ class SettingsWidget(QWidget):
         self.store_email_input = QLineEdit()
         self.currency_input = QLineEdit()
         self.tax_rate_input = QLineEdit()
+        self.store_code_input = QLineEdit()
+        self.ticket_format_input = QLineEdit()
+        self.ticket_format_input.setPlaceholderText(DEFAULT_FORMAT)
+        self.ticket_format_input.setToolTip("Fields: {number}, {store}, {lane}, {date:%Y%m%d}; "
+                                            "per-lane templates go in ticket_number_format.<lane>")
 
         form_layout.addRow("Store Name:", self.store_name_input)
         form_layout.addRow("Address:", self.store_address_input)
@@ -1195,6 +965,8 @@ class SettingsWidget(QWidget):
         form_layout.addRow("Email:", self.store_email_input)
         form_layout.addRow("Currency:", self.currency_input)
         form_layout.addRow("Tax Rate (%):", self.tax_rate_input)
+        form_layout.addRow("Store Code:", self.store_code_input)
+        form_layout.addRow("Ticket Number Format:", self.ticket_format_input)
 
         # Save button
         save_btn = QPushButton("Save Store Settings")
@@ -1204,7 +976,7 @@ class SettingsWidget(QWidget):
                 color: white;
                 padding: 12px 24px;
                 border-radius: 8px;
-                font-weight: 极00;
+                font-weight: 600;
                 margin-top: 20px;
             }
             QPushButton:hover {
@@ -1223,7 +995,7 @@ class SettingsWidget(QWidget):
     def create_system_settings_tab(self):
         """Create system settings tab"""
         widget = QWidget()
-        layout = Q极BoxLayout()
+        layout = QVBoxLayout()
 
         # System settings form
         form_layout = QFormLayout()
@@ -1240,7 +1012,7 @@ class SettingsWidget(QWidget):
         self.language_combo.addItems(["English", "Arabic"])
 
         form_layout.addRow("Low Stock Threshold:", self.low_stock_threshold_input)
-        form_layout.add极("Receipt Footer:", self.receipt_footer_input)
+        form_layout.addRow("Receipt Footer:", self.receipt_footer_input)
         form_layout.addRow("", self.backup_enabled_checkbox)
         form_layout.addRow("", self.print_receipt_checkbox)
         form_layout.addRow(self.dark_mode_checkbox)
@@ -1354,9 +1126,9 @@ class SettingsWidget(QWidget):
 
     def load_settings(self):
         """Load settings from database"""
-        cursor = self.parent.conn.cursor()
-        cursor.execute('SELECT `key`, value FROM settings')
-        settings = dict(cursor.fetchall())
+        with MySQLConnectionManager() as (cursor, conn):
+            cursor.execute('SELECT `key`, value FROM settings')
+            settings = dict(cursor.fetchall())
 
         # Load store settings
         self.store_name_input.setText(settings.get('store_name', ''))
@@ -1365,6 +1137,8 @@ class SettingsWidget(QWidget):
         self.store_email_input.setText(settings.get('store_email', ''))
         self.currency_input.setText(settings.get('currency', 'DA'))
         self.tax_rate_input.setText(settings.get('tax_rate', '19'))
+        self.store_code_input.setText(settings.get('store_code', ''))
+        self.ticket_format_input.setText(settings.get('ticket_number_format', ''))
 
         # Load system settings
         self.low_stock_threshold_input.setText(settings.get('low_stock_threshold', '10'))
@@ -1384,9 +1158,9 @@ class SettingsWidget(QWidget):
 
     def load_users(self):
         """Load users into table"""
-        cursor = self.parent极onn.cursor()
-        cursor.execute('SELECT * FROM users ORDER BY username')
-        users = cursor.fetchall()
+        with MySQLConnectionManager() as (cursor, conn):
+            cursor.execute('SELECT * FROM users ORDER BY username')
+            users = cursor.fetchall()
 
         self.users_table.setRowCount(len(users))
 
@@ -1454,22 +1228,31 @@ class SettingsWidget(QWidget):
 
     def save_store_settings(self):
         """Save store settings"""
+        ticket_format = self.ticket_format_input.text().strip()
         try:
-            cursor = self.parent.conn.cursor()
+            if ticket_format and format_ticket_number(ticket_format, 1) == format_ticket_number(ticket_format, 2):
+                raise ValueError("it must contain {number}")
+        except (KeyError, IndexError, ValueError) as e:
+            QMessageBox.warning(self, "Invalid Format", f"Ticket number format is not valid: {e}")
+            return
 
+        try:
             settings = [
                 ('store_name', self.store_name_input.text()),
                 ('store_address', self.store_address_input.toPlainText()),
                 ('store_phone', self.store_phone_input.text()),
                 ('store_email', self.store_email_input.text()),
                 ('currency', self.currency_input.text()),
-                ('tax_rate', self.tax_rate_input.text())
+                ('tax_rate', self.tax_rate_input.text()),
+                ('store_code', self.store_code_input.text().strip()),
+                ('ticket_number_format', ticket_format)
             ]
 
-            for key, value in settings:
-                self._upsert_setting(cursor, key, value)
-
-            self.parent.conn.commit()
+            with MySQLConnectionManager() as (cursor, conn):
+                for key, value in settings:
+                    self._upsert_setting(cursor, key, value)
+            # Tickets from this lane use the new format right away, other lanes with their next block
+            get_numberer().reload_format()
             QMessageBox.information(self, "Success", "Store settings saved successfully!")
 
         except Exception as e:
@@ -1478,8 +1261,6 @@ class SettingsWidget(QWidget):
     def save_system_settings(self):
         """Save system settings"""
         try:
-            cursor = self.parent.conn.cursor()
-
             settings = [
                 ('low_stock_threshold', self.low_stock_threshold_input.text()),
                 ('receipt_footer', self.receipt_footer_input.toPlainText()),
@@ -1487,10 +1268,9 @@ class SettingsWidget(QWidget):
                 ('language', 'ar' if self.language_combo.currentText() == 'Arabic' else 'en'),
             ]
 
-            for key, value in settings:
-                self._upsert_setting(cursor, key, value)
-
-            self.parent.conn.commit()
+            with MySQLConnectionManager() as (cursor, conn):
+                for key, value in settings:
+                    self._upsert_setting(cursor, key, value)
 
             # Apply immediately
             self.parent.apply_theme(self.dark_mode_checkbox.isChecked())
@@ -1520,7 +1300,7 @@ class SettingsWidget(QWidget):
             if reply == QMessageBox.Yes:
                 try:
                     import shutil
-                    self.parent.conn.close()
+                    get_connection_pool().close_all()
                     shutil.copy2(file_path, 'pos_database.db')
                     self.parent.init_database()
                     QMessageBox.information(self, "Restore Complete", "Database restored successfully!")
@@ -1539,6 +1319,7 @@ class DayStateWidget(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self.queries = QueryRunner(self)
         self.init_ui()
         self.load_data()
 
@@ -1585,7 +1366,7 @@ class DayStateWidget(QWidget):
         self.date_label = QLabel()
         self.date_label.setStyleSheet("""
             font-size: 14px;
-            color: #7f极c8d;
+            color: #7f8c8d;
         """)
 
         title_layout.addWidget(self.title_label)
@@ -1595,19 +1376,19 @@ class DayStateWidget(QWidget):
         refresh_btn = QPushButton("Refresh Data")
         refresh_btn.setIcon(QIcon.fromTheme("view-refresh"))
         refresh_btn.setStyleSheet("""
-            Q极ushButton {
+            QPushButton {
                 background: #3498db;
                 color: white;
                 padding: 8px 16px;
                 border-radius: 6px;
                 font-weight: 600;
-               极 min-width: 120px;
+                min-width: 120px;
             }
             QPushButton:hover {
                 background: #2980b9;
             }
         """)
-        refresh_极n.clicked.connect(self.load_data)
+        refresh_btn.clicked.connect(self.load_data)
 
         header_layout.addWidget(back_btn)
         header_layout.addWidget(title_container)
@@ -1656,11 +1437,11 @@ class DayStateWidget(QWidget):
         stats_layout.setContentsMargins(0, 5, 0, 5)
         stats_layout.setSpacing(15)
 
-        self.sales_card = self.create_stat_card("Total Sales", "0.00", "#2ecc71", "💰")
-        self.transactions_card = self.create_stat_card("Transactions", "0", "#3498db", "🧾")
-        self.items_card = self.create_stat_card("Items Sold", "0", "#f39c12", "📦")
-        self.customers_card = self.create_stat_card("Customers", "0", "#9b59b6", "👥")
-        self.avg_sale_card = self.create_stat_card("Avg. Sale", "0.00", "#e74c3c", "📊")
+        self.sales_card = self.create_stat_card("Total Sales", "0.00", "green", "💰")
+        self.transactions_card = self.create_stat_card("Transactions", "0", "blue", "🧾")
+        self.items_card = self.create_stat_card("Items Sold", "0", "amber", "📦")
+        self.customers_card = self.create_stat_card("Customers", "0", "purple", "👥")
+        self.avg_sale_card = self.create_stat_card("Avg. Sale", "0.00", "red", "📊")
 
         stats_layout.addWidget(self.sales_card)
         stats_layout.addWidget(self.transactions_card)
@@ -1712,7 +1493,7 @@ class DayStateWidget(QWidget):
         export_layout = QHBoxLayout(export_container)
         export_layout.setContentsMargins(0, 0, 0, 0)
 
-        pdf_btn = Q极ushButton("Export to PDF")
+        pdf_btn = QPushButton("Export to PDF")
         pdf_btn.setIcon(QIcon.fromTheme("application-pdf"))
         pdf_btn.setStyleSheet("""
             QPushButton {
@@ -1721,7 +1502,7 @@ class DayStateWidget(QWidget):
                 padding: 8px 16px;
                 border-radius: 6px;
                 font-weight: 600;
-                min-width: 极20px;
+                min-width: 120px;
             }
             QPushButton:hover {
                 background: #c0392b;
@@ -1797,47 +1578,26 @@ class DayStateWidget(QWidget):
 
         return table
 
-    def create_stat_card(self, title, value, color, icon):
-        """Create a modern stat card"""
+    def create_stat_card(self, title, value, tone, icon):
+        """Create a modern stat card (tone: one of theme.TONES)"""
         card = QFrame()
         card.setFrameShape(QFrame.StyledPanel)
-        card.setStyleSheet(f"""
-            QFrame {{
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                border-left: 4px solid {color};
-            }}
-        """)
+        theme.set_style(card, 'card', tone)
         card.setFixedHeight(100)
 
         layout = QHBoxLayout(card)
         layout.setContentsMargins(15, 10, 15, 10)
+        layout.setSpacing(15)
 
         # Icon
-        icon_label = QLabel(icon)
-        icon_label.setStyleSheet(f"""
-            font-size: 32px;
-            color: {color};
-            margin-right: 15px;
-        """)
+        icon_label = theme.set_style(QLabel(icon), 'card-icon', tone)
 
         # Content
         content = QVBoxLayout()
         content.setSpacing(2)
 
-        value_label = QLabel(value)
-        value_label.setStyleSheet(f"""
-            font-size: 24px;
-            font-weight: 700;
-           极 color: {color};
-        """)
-
-        title_label = QLabel(title)
-        title_label.setStyleSheet("""
-            font-size: 13px;
-            color: #7f8c8d;
-        """)
+        value_label = theme.set_style(QLabel(value), 'card-value', tone)
+        title_label = theme.set_style(QLabel(title), 'card-title')
 
         content.addWidget(value_label)
         content.addWidget(title_label)
@@ -1852,6 +1612,11 @@ class DayStateWidget(QWidget):
 
         return card
 
+    def screen_shown(self, hidden_for):
+        """Back on screen: the day's figures moved if sales were made meanwhile"""
+        if hidden_for >= 30:
+            self.load_data()
+
     def update_date_label(self):
         """Update the displayed date label"""
         date_str = self.date_edit.date().toString("dddd, MMMM d, yyyy")
@@ -1860,134 +1625,141 @@ class DayStateWidget(QWidget):
     def load_data(self):
         """Load all data for selected date"""
         self.update_date_label()
-        selected_date = self.date_edit.date().toString("yyyy-MM-dd")
+        day = day_range(self.date_edit.date().toString("yyyy-MM-dd"))
 
-        try:
-            cursor = self.parent.conn.cursor()
-
-            # Get daily stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as transactions,
-                    COALESCE(SUM(total_price), 0) as total_sales,
-                    COALESCE(AVG(total_price), 0) as avg_sale
-                FROM tickets 
-                WHERE date LIKE %s
-            """, (f"{selected_date}%",))
-            stats = cursor.fetchone()
-
-            # Get items sold
-            cursor.execute("""
-                SELECT COALESCE(SUM(
-                    json_extract(value, '$.quantity')
-                ), 0)
-                FROM tickets, json_each(tickets.items)
-                WHERE date LIKE %s
-            """, (f"{selected_date}%",))
-            items_sold = cursor.fetchone()[0] or 0
-
-            # Get unique customers
-            cursor.execute("""
-                SELECT COUNT(DISTINCT customer_name)
-                FROM tickets 
-                WHERE date LIKE %s AND customer_name != 'Walk-in Customer'
-            """, (f"{selected_date}%",))
-            unique_customers = cursor.fetchone()[0]
-
-            # Update stat cards
-            self.sales_card.value_label.setText(f"{stats[1]:.2f} DA")
-            self.transactions_card.value_label.setText(f"{stats[0]:,}")
-            self.items_card.value_label.setText(f"{items_sold:,}")
-            self.customers_card.value_label.setText(f"{unique_customers:,}")
-            self.avg极ale_card.value_label.setText(f"{stats[2]:.2f} DA")
-
-            # Load tables
-            self.load_top_products(selected_date)
-            self.load_recent_transactions(selected_date)
+        for card in (self.sales_card, self.transactions_card, self.items_card,
+                     self.customers_card, self.avg_sale_card):
+            card.value_label.setText("…")
+        self.queries.submit('stats', self.fetch_day_stats, self.show_day_stats, day,
+                            on_error=self.show_load_error)
+        self.load_top_products(day)
+        self.load_recent_transactions(day)
 
-        except Exception as e:
-            QMessageBox.warning(self, "Database Error", f"Failed to load data: {str(e)}")
+    def show_load_error(self, message):
+        QMessageBox.warning(self, "Database Error", f"Failed to load data: {message}")
 
-    def load_top_products(self, date):
-        """Load top selling products with better formatting"""
-        try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    json_extract(value, '$.name') as product_name,
-                    SUM(json_extract(value, '$.quantity')) as total_quantity,
-                    SUM(json_extract(value, '$.total')) as total_revenue
-                FROM tickets, json_each(tickets.items)
-                WHERE date LIKE %s
-                GROUP BY product_name
-                ORDER BY total_quantity DESC
-                LIMIT 15
-            """, (f"{date}%",))
-
-            self.products_table.setRowCount(0)
-
-            for row, (name, quantity, revenue) in enumerate(cursor.fetchall()):
-                self.products_table.insertRow(row)
-
-                name_item = QTableWidgetItem(name)
-                qty_item = QTableWidgetItem(f"{int(quantity):,}")
-                rev_item = QTableWidgetItem(f"{revenue:,.2f}")
-
-                # Right-align numeric columns
-                qty_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                rev_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-
-                self.products_table.setItem(row, 0, name_item)
-                self.products_table.setItem(row, 1, qty_item)
-                self.products_table.setItem(row, 2, rev_item)
+    @staticmethod
+    def fetch_day_stats(cursor, day):
+        # Hourly series for the day; the daily stats are summed from it
+        hourly = sales_series(cursor, day, 'hour')
 
-        except Exception as e:
-            print(f"Error loading products: {e}")
+        # Get items sold
+        cursor.execute("""
+            SELECT COALESCE(SUM(quantity), 0)
+            FROM sales
+            WHERE date >= %s AND date < %s
+        """, day.params())
+        items_sold = cursor.fetchone()[0] or 0
 
-    def load_recent_transactions(self, date):
+        # Get unique customers
+        cursor.execute("""
+            SELECT COUNT(DISTINCT customer_name)
+            FROM tickets 
+            WHERE date >= %s AND date < %s AND customer_name != 'Walk-in Customer'
+        """, day.params())
+        unique_customers = cursor.fetchone()[0]
+        return hourly, items_sold, unique_customers
+
+    def show_day_stats(self, stats):
+        hourly, items_sold, unique_customers = stats
+        transactions, total_sales = series_totals(hourly)
+        avg_sale = total_sales / transactions if transactions else 0
+        busiest = max(hourly, key=lambda p: p.total)
+
+        # Update stat cards
+        self.sales_card.value_label.setText(f"{total_sales:.2f} DA")
+        self.sales_card.setToolTip(f"Busiest hour: {busiest.start:%H}:00 ({busiest.total:.2f} DA)"
+                                   if busiest.total else "")
+        self.transactions_card.value_label.setText(f"{transactions:,}")
+        self.items_card.value_label.setText(f"{items_sold:,}")
+        self.customers_card.value_label.setText(f"{unique_customers:,}")
+        self.avg_sale_card.value_label.setText(f"{avg_sale:.2f} DA")
+
+    def load_top_products(self, day):
+        """Load top selling products with better formatting"""
+        self.products_table.setRowCount(0)
+        self.queries.submit('top_products', self.fetch_top_products, self.show_top_products, day)
+
+    @staticmethod
+    def fetch_top_products(cursor, day):
+        cursor.execute("""
+            SELECT 
+                product_name,
+                SUM(quantity) as total_quantity,
+                SUM(total_price) as total_revenue
+            FROM sales
+            WHERE date >= %s AND date < %s
+            GROUP BY product_name
+            ORDER BY total_quantity DESC
+            LIMIT 15
+        """, day.params())
+        return cursor.fetchall()
+
+    def show_top_products(self, products):
+        self.products_table.setRowCount(0)
+
+        for row, (name, quantity, revenue) in enumerate(products):
+            self.products_table.insertRow(row)
+
+            name_item = QTableWidgetItem(name)
+            qty_item = QTableWidgetItem(f"{int(quantity):,}")
+            rev_item = QTableWidgetItem(f"{revenue:,.2f}")
+
+            # Right-align numeric columns
+            qty_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            rev_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+            self.products_table.setItem(row, 0, name_item)
+            self.products_table.setItem(row, 1, qty_item)
+            self.products_table.setItem(row, 2, rev_item)
+
+    def load_recent_transactions(self, day):
         """Load recent transactions with better formatting"""
-        try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    datetime(date) as trans_time,
-                    ticket_number,
-                    CASE 
-                        WHEN customer_name = 'Walk-in Customer' THEN 'Walk-in'
-                        ELSE customer_name
-                    END as customer,
-                    total_price
-                FROM tickets 
-                WHERE date LIKE %s
-                ORDER BY date DESC
-                LIMIT 20
-            """, (f"{date}%",))
-
-            self.transactions_table.setRowCount(0)
-
-            for row, (date_time, ticket_num, customer, amount) in enumerate(cursor.fetchall()):
-                self.transactions_table.insertRow(row)
+        self.transactions_table.setRowCount(0)
+        self.queries.submit('transactions', self.fetch_recent_transactions,
+                            self.show_recent_transactions, day)
 
-                try:
-                    time_str = datetime.fromisoformat(date_time).strftime("%H:%M")
-                except Exception:
-                    time_str = date_time.split()[-1][:5] if ' ' in date_time else date_time
+    @staticmethod
+    def fetch_recent_transactions(cursor, day):
+        cursor.execute("""
+            SELECT 
+                date as trans_time,
+                ticket_number,
+                CASE 
+                    WHEN customer_name = 'Walk-in Customer' THEN 'Walk-in'
+                    ELSE customer_name
+                END as customer,
+                total_price
+            FROM tickets 
+            WHERE date >= %s AND date < %s
+            ORDER BY date DESC
+            LIMIT 20
+        """, day.params())
+        return cursor.fetchall()
 
-                time_item = QTableWidgetItem(time_str)
-                ticket_item = QTableWidgetItem(ticket_num)
-                cust_item = QTableWidgetItem(customer)
-                amt_item = QTableWidgetItem(f"{amount:,.2f}")
+    def show_recent_transactions(self, transactions):
+        self.transactions_table.setRowCount(0)
 
-                # Right-align numeric column
-                amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        for row, (date_time, ticket_num, customer, amount) in enumerate(transactions):
+            self.transactions_table.insertRow(row)
 
-                self.transactions_table.setItem(row, 0, time_item)
-                self.transactions_table.setItem(row, 1, ticket_item)
-                self.transactions_table.setItem(row, 极, cust_item)
-                self.transactions_table.setItem(row, 3, amt_item)
+            if isinstance(date_time, datetime):
+                time_str = date_time.strftime("%H:%M")
+            else:
+                time_str = str(date_time).split()[-1][:5]
 
-        except Exception as e:
-            print(f"Error loading transactions: {e}")
+            time_item = QTableWidgetItem(time_str)
+            ticket_item = QTableWidgetItem(ticket_num)
+            cust_item = QTableWidgetItem(customer)
+            amt_item = QTableWidgetItem(f"{amount:,.2f}")
+
+            # Right-align numeric column
+            amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+            self.transactions_table.setItem(row, 0, time_item)
+            self.transactions_table.setItem(row, 1, ticket_item)
+            self.transactions_table.setItem(row, 2, cust_item)
+            self.transactions_table.setItem(row, 3, amt_item)
 
     def export_pdf(self):
         """Export to PDF with progress dialog"""
@@ -2066,7 +1838,7 @@ class SellerAccountWidget(QWidget):
         back_btn.clicked.connect(self.parent.show_main_menu)
 
         title = QLabel("My Account")
-        title极etStyleSheet("""
+        title.setStyleSheet("""
             font-size: 24px;
             font-weight: 700;
             color: #2c3e50;
@@ -2083,14 +1855,7 @@ class SellerAccountWidget(QWidget):
         content_layout.setSpacing(20)
 
         # Left panel - Profile card
-        profile_card = QWidget()
-        profile_card.setStyleSheet("""
-            QWidget {
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 12px;
-            }
-        """)
+        profile_card = theme.set_style(QWidget(), 'panel')
         profile_layout = QVBoxLayout(profile_card)
         profile_layout.setContentsMargins(20, 20, 20, 20)
 
@@ -2100,7 +1865,7 @@ class SellerAccountWidget(QWidget):
         self.profile_pic.setStyleSheet("""
             QLabel {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:极 #3498db, stop:1 #2c3e50);
+                    stop:0 #3498db, stop:1 #2c3e50);
                 border-radius: 60px;
                 color: white;
                 font-size: 48px;
@@ -2133,9 +1898,9 @@ class SellerAccountWidget(QWidget):
         stats_layout.setContentsMargins(0, 0, 0, 0)
         stats_layout.setSpacing(10)
 
-        self.sales_today_card = self.create_stat_card("💰", "Today's Sales", "0.00 DA", "#2ecc71")
-        self.sales_month_card = self.create_stat_card("📅", "Monthly Sales", "0.00 DA", "#3498db")
-        self.transactions_card = self.create_stat_card("🧾", "Transactions", "0", "#f39c12")
+        self.sales_today_card = self.create_stat_card("💰", "Today's Sales", "0.00 DA", "green")
+        self.sales_month_card = self.create_stat_card("📅", "Monthly Sales", "0.00 DA", "blue")
+        self.transactions_card = self.create_stat_card("🧾", "Transactions", "0", "amber")
 
         stats_layout.addWidget(self.sales_today_card)
         stats_layout.addWidget(self.sales_month_card)
@@ -2204,7 +1969,7 @@ class SellerAccountWidget(QWidget):
 
         self.confirm_password_input = QLineEdit()
         self.confirm_password_input.setPlaceholderText("Confirm new password")
-        self.confirm_password极ut.setEchoMode(QLineEdit.Password)
+        self.confirm_password_input.setEchoMode(QLineEdit.Password)
 
         # Show password checkbox
         show_password = QCheckBox("Show passwords")
@@ -2249,7 +2014,7 @@ class SellerAccountWidget(QWidget):
             QPushButton {
                 background: #f39c12;
                 color: white;
-                padding: 10极 20px;
+                padding: 10px 20px;
                 border-radius: 6px;
                 font-weight: 600;
             }
@@ -2261,7 +2026,7 @@ class SellerAccountWidget(QWidget):
 
         logout_btn = QPushButton("Logout")
         logout_btn.setIcon(QIcon.fromTheme("system-log-out"))
-        logout_btn极etStyleSheet("""
+        logout_btn.setStyleSheet("""
             QPushButton {
                 background: #e74c3c;
                 color: white;
@@ -2292,46 +2057,23 @@ class SellerAccountWidget(QWidget):
 
         self.setLayout(main_layout)
 
-    def create_stat_card(self, icon, title, value, color):
-        """Create a statistics card widget"""
-        card = QWidget()
-        card.setStyleSheet(f"""
-            QWidget {{
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                border-left: 4px solid {color};
-                padding: 12px;
-            }}
-        """)
+    def create_stat_card(self, icon, title, value, tone):
+        """Create a statistics card widget (tone: one of theme.TONES)"""
+        card = theme.set_style(QWidget(), 'card', tone)
 
         layout = QHBoxLayout(card)
-        layout.setContentsMargins(5, 5, 5, 5)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(10)
 
         # Icon
-        icon_label = QLabel(icon)
-        icon_label.setStyleSheet(f"""
-            font-size: 24px;
-            color: {color};
-            margin-right: 10px;
-        """)
+        icon_label = theme.set_style(QLabel(icon), 'card-icon', tone)
 
         # Content
         content = QVBoxLayout()
         content.setSpacing(2)
 
-        value_label = QLabel(value)
-        value_label.setStyleSheet(f"""
-            font-size: 18px;
-            font-weight: 700;
-            color: {color};
-        """)
-
-        title_label = QLabel(title)
-        title_label.setStyleSheet("""
-            font-size: 12px;
-            color: #7f8c8d;
-        """)
+        value_label = theme.set_style(QLabel(value), 'card-value', tone)
+        title_label = theme.set_style(QLabel(title), 'card-title')
 
         content.addWidget(value_label)
         content.addWidget(title_label)
@@ -2363,34 +2105,37 @@ class SellerAccountWidget(QWidget):
         # Load statistics
         self.load_user_statistics()
 
+    def screen_shown(self, hidden_for):
+        """Back on screen: refresh the seller's own sales figures"""
+        self.load_user_statistics()
+
     def load_user_statistics(self):
         """Load and display user statistics"""
         if not self.parent.current_user:
             return
 
-        cursor = self.parent.conn.cursor()
         user_id = self.parent.current_user['id']
 
         try:
-            # Today's date
-            today = datetime.now().strftime("%Y-%m-%d")
-
-            # Get today's stats
-            cursor.execute("""
-                SELECT COUNT(*), COALESCE(SUM(total_price), 0)
-                FROM tickets 
-                WHERE cashier_id = %s AND date LIKE %s
-            """, (user_id, f"{today}%"))
-            today_count, today_sales = cursor.fetchone()
-
-            # This month's stats
-            this_month = datetime.now().strftime("%Y-%m")
-            cursor.execute("""
-                SELECT COALESCE(SUM(total_price), 0)
-                FROM tickets 
-                WHERE cashier_id = %s AND date LIKE %s
-            """, (user极, f"{this_month}%"))
-            month_sales = cursor.fetchone()[0] or 0
+            today = day_range()
+            this_month = month_range()
+
+            with MySQLConnectionManager() as (cursor, conn):
+                # Get today's stats
+                cursor.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(total_price), 0)
+                    FROM tickets 
+                    WHERE cashier_id = %s AND date >= %s AND date < %s
+                """, (user_id, *today.params()))
+                today_count, today_sales = cursor.fetchone()
+
+                # This month's stats
+                cursor.execute("""
+                    SELECT COALESCE(SUM(total_price), 0)
+                    FROM tickets 
+                    WHERE cashier_id = %s AND date >= %s AND date < %s
+                """, (user_id, *this_month.params()))
+                month_sales = cursor.fetchone()[0] or 0
 
             # Update cards
             self.sales_today_card.value_label.setText(f"{today_sales:,.2f} DA")
@@ -2417,14 +2162,12 @@ class SellerAccountWidget(QWidget):
             return
 
         try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute("""
-                UPDATE users 
-                SET full_name = %s, email = %s
-                WHERE id = %s
-            """, (full_name, email, self.parent.current_user['id']))
-
-            self.parent.conn.commit()
+            with MySQLConnectionManager() as (cursor, conn):
+                cursor.execute("""
+                    UPDATE users 
+                    SET full_name = %s, email = %s
+                    WHERE id = %s
+                """, (full_name, email, self.parent.current_user['id']))
 
             # Update current user data
             self.parent.current_user['full_name'] = full_name
@@ -2456,21 +2199,19 @@ class SellerAccountWidget(QWidget):
             return
 
         try:
-            cursor = self.parent.conn.cursor()
+            with MySQLConnectionManager() as (cursor, conn):
+                # Verify current password
+                cursor.execute("SELECT password FROM users WHERE id = %s",
+                               (self.parent.current_user['id'],))
+                stored_password = cursor.fetchone()[0]
 
-            # Verify current password
-            cursor.execute("SELECT password FROM users WHERE id = %s",
-                           (self.parent.current_user['id'],))
-            stored_password = cursor.fetchone()[0]
+                if stored_password != current:
+                    QMessageBox.warning(self, "Error", "Current password is incorrect")
+                    return
 
-            if stored_password != current:
-                QMessageBox.warning(self, "Error", "Current password is incorrect")
-                return
-
-            # Update password
-            cursor.execute("UPDATE users SET password = %s WHERE id = %s",
-                           (new, self.parent.current_user['id']))
-            self.parent.conn.commit()
+                # Update password
+                cursor.execute("UPDATE users SET password = %s WHERE id = %s",
+                               (new, self.parent.current_user['id']))
 
             # Clear fields
             self.current_password_input.clear()
@@ -2516,7 +2257,7 @@ class AddUserDialog(QDialog):
         self.username_input = QLineEdit()
         self.username_input.setPlaceholderText("Username")
 
-        self.full_name_input = Q极ineEdit()
+        self.full_name_input = QLineEdit()
         self.full_name_input.setPlaceholderText("Full Name")
 
         self.email_input = QLineEdit()
@@ -2577,12 +2318,15 @@ class AddUserDialog(QDialog):
         
 
 
-if __name__ == '__main__':
+def main(argv=None):
+    """Run the application; returns its exit code"""
+    argv = sys.argv if argv is None else argv
+
     # Set high DPI scaling before creating QApplication
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
-    app = QApplication(sys.argv)
+    app = QApplication(argv)
     app.setStyle('Fusion')
 
     # Set application properties
@@ -2594,4 +2338,20 @@ if __name__ == '__main__':
     window = POSApplication()
     window.show()
 
-    sys.exit(app.exec_())
\ No newline at end of file
+    profiler = startup_profile.profiler
+    if profiler is not None:
+        # The login screen is on screen once the first event loop pass has painted it
+        def finish_profile():
+            profiler.mark("login screen shown")
+            profiler.report()
+            app.quit()
+        QTimer.singleShot(0, finish_profile)
+
+    exit_code = app.exec_()
+    # Unknown scans still in memory go to the database before the process ends
+    stop_collector()
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
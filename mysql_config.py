@@ -1,60 +1,94 @@
 import mysql.connector
 from mysql.connector import Error
 import os
+import threading
+
+from connection_pool import ConnectionPool
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_mysql_config():
+    """Get MySQL connection settings from the environment"""
+    return {
+        'host': os.getenv('MYSQL_HOST', 'localhost'),
+        'port': int(os.getenv('MYSQL_PORT', 3306)),
+        'user': os.getenv('MYSQL_USER', 'root'),
+        'password': os.getenv('MYSQL_PASSWORD', 'HRMMSSL1234'),
+        'database': os.getenv('MYSQL_DATABASE', 'pos_database'),
+        'charset': 'utf8mb4',
+        'collation': 'utf8mb4_unicode_ci',
+        'connection_timeout': int(os.getenv('MYSQL_CONNECT_TIMEOUT', 5)),
+        'autocommit': False
+    }
+
+def create_mysql_connection():
+    """Open a new, unpooled MySQL connection (raises Error on failure)"""
+    connection = mysql.connector.connect(**get_mysql_config())
+    if not connection.is_connected():
+        raise Error("Failed to connect to MySQL database")
+    return connection
+
+def get_connection_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    create_mysql_connection,
+                    size=int(os.getenv('MYSQL_POOL_SIZE', 5)),
+                    timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', 10)),
+                    idle_recycle=float(os.getenv('MYSQL_POOL_RECYCLE', 300)),
+                    health_check_after=float(os.getenv('MYSQL_POOL_PING_AFTER', 30)),
+                )
+    return _pool
 
 def get_mysql_connection():
-    """Get MySQL database connection"""
+    """Borrow a MySQL connection from the pool; close() returns it"""
     try:
-        config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'port': int(os.getenv('MYSQL_PORT', 3306)),
-            'user': os.getenv('MYSQL_USER', 'root'),
-            'password': os.getenv('MYSQL_PASSWORD', 'HRMMSSL1234'),
-            'database': os.getenv('MYSQL_DATABASE', 'pos_database'),
-            'charset': 'utf8mb4',
-            'collation': 'utf8mb4_unicode_ci',
-            'autocommit': False
-        }
-        
-        connection = mysql.connector.connect(**config)
-        if connection.is_connected():
-            return connection
-        else:
-            raise Error("Failed to connect to MySQL database")
-            
+        return get_connection_pool().acquire()
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
 def close_connection(connection):
-    """Close MySQL database connection"""
-    if connection and connection.is_connected():
+    """Return a MySQL connection to the pool"""
+    if connection:
         connection.close()
 
 class MySQLConnectionManager:
-    """Context manager for MySQL connections"""
-    
-    def __init__(self):
+    """Context manager borrowing a pooled connection and committing on success
+
+    Nested inside another manager on the same thread, it shares the outer
+    connection and leaves commit/rollback to the outer manager.
+    """
+
+    def __init__(self, dictionary=False):
         self.connection = None
         self.cursor = None
-    
+        self.dictionary = dictionary
+
     def __enter__(self):
-        self.connection = get_mysql_connection()
-        if self.connection:
-            self.cursor = self.connection.cursor()
-            return self.cursor, self.connection
-        else:
-            raise Error("Failed to establish MySQL connection")
-    
+        self.connection = get_connection_pool().acquire()
+        try:
+            self.cursor = self.connection.cursor(buffered=True, dictionary=self.dictionary)
+        except Exception:
+            self.connection.close()
+            raise
+        return self.cursor, self.connection
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type is not None:
-            if self.connection:
-                self.connection.rollback()
-        else:
-            if self.connection:
-                self.connection.commit()
-        
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
+        try:
+            # A nested manager leaves the transaction to the outer one
+            if not self.connection.nested:
+                if exc_type is not None:
+                    self.connection.rollback()
+                else:
+                    self.connection.commit()
+        finally:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
             self.connection.close()
@@ -0,0 +1,370 @@
+"""
+Offline-first checkout: a local sale journal replicated to MySQL.
+
+Checkout appends the sale to a SQLite journal on the lane (WAL mode, one
+fsync'd commit) and returns; the GUI thread never waits for MySQL. A
+JournalReplicator thread, woken by each sale, drains pending sales to MySQL
+in batches, each batch in one transaction through checkout_service.checkout.
+Every sale carries an idempotency key stored in tickets.idempotency_key
+(unique), so a sale that committed on the server but was not acknowledged
+locally is recognized and skipped on the next pass instead of being
+recorded twice.
+
+The replicator reports the lane online only after a round trip to the
+server on each pass, and tops up the lane's block of ticket numbers there,
+so checkout numbers sales from the block without a round trip of its own.
+
+The goods left the store when the sale was journaled, so replication
+records it even if the server's stock would go below zero, but keeps the
+shortage against the journaled sale; oversold() lists them for the POS.
+
+The same file keeps salted hashes of the credentials of users who logged
+in online on this lane, so they can log in while MySQL is unreachable (the
+catalog then comes from catalog_snapshot).
+
+    POS_JOURNAL    journal path (default pos_journal.db in the working directory)
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from checkout_service import InsufficientStock, checkout
+from mysql_config import create_mysql_connection
+from ticket_sequence import get_numberer, provisional_ticket_number
+
+JOURNAL_PATH = os.getenv('POS_JOURNAL', 'pos_journal.db')
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5            # sales failing this often wait for a person to look at them
+RETRY_SECONDS = 5           # between passes while MySQL is unreachable or idle
+KEEP_REPLICATED_DAYS = 30
+
+JOURNAL_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS sales (
+           seq INTEGER PRIMARY KEY AUTOINCREMENT,
+           idempotency_key TEXT NOT NULL UNIQUE,
+           created_at TEXT NOT NULL,
+           payload TEXT NOT NULL,
+           replicated_at TEXT,
+           ticket_id INTEGER,
+           attempts INTEGER NOT NULL DEFAULT 0,
+           last_error TEXT,
+           shortage TEXT
+       )''',
+    'CREATE INDEX IF NOT EXISTS idx_sales_pending ON sales (seq) WHERE replicated_at IS NULL',
+    '''CREATE TABLE IF NOT EXISTS users (
+           username TEXT PRIMARY KEY, salt BLOB NOT NULL, hash BLOB NOT NULL, profile TEXT NOT NULL
+       )''',
+]
+
+
+def ensure_idempotency_key(cursor):
+    """tickets.idempotency_key, unique, for replaying journaled sales safely"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'tickets' AND column_name = 'idempotency_key'
+    ''')
+    if not cursor.fetchone()[0]:
+        cursor.execute('ALTER TABLE tickets ADD COLUMN idempotency_key CHAR(36) NULL')
+        cursor.execute('CREATE UNIQUE INDEX uq_tickets_idempotency_key ON tickets (idempotency_key)')
+
+
+def _password_hash(password, salt):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
+
+
+class SaleJournal:
+    """The lane's SQLite journal; safe to use from several threads"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            for statement in JOURNAL_SCHEMA:
+                db.execute(statement)
+            # Journals written before shortages were kept
+            if 'shortage' not in [row[1] for row in db.execute('PRAGMA table_info(sales)')]:
+                db.execute('ALTER TABLE sales ADD COLUMN shortage TEXT')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=FULL')
+            self._local.db = db
+        return db
+
+    # ---------------- Sales ----------------
+
+    def append(self, sale):
+        """Durably record a sale (dict of checkout() arguments); returns its idempotency key
+
+        A sale without a ticket number is given a provisional one, numbered
+        by its journal sequence, and sale['ticket_number'] is set to it.
+        """
+        key = str(uuid.uuid4())
+        with self._connection() as db:
+            seq = db.execute('INSERT INTO sales (idempotency_key, created_at, payload) VALUES (?, ?, ?)',
+                             (key, datetime.now().isoformat(), '{}')).lastrowid
+            if sale.get('ticket_number') is None:
+                sale['ticket_number'] = provisional_ticket_number(seq, sale['sale_date'])
+            payload = dict(sale, sale_date=sale['sale_date'].isoformat())
+            db.execute('UPDATE sales SET payload = ? WHERE seq = ?', (json.dumps(payload), seq))
+        return key
+
+    def pending(self, limit=BATCH_SIZE):
+        """Oldest sales not yet on the server: [(seq, key, sale)]"""
+        rows = self._connection().execute('''
+            SELECT seq, idempotency_key, payload FROM sales
+            WHERE replicated_at IS NULL AND attempts < ?
+            ORDER BY seq LIMIT ?
+        ''', (MAX_ATTEMPTS, limit)).fetchall()
+        sales = []
+        for seq, key, payload in rows:
+            sale = json.loads(payload)
+            sale['sale_date'] = datetime.fromisoformat(sale['sale_date'])
+            sales.append((seq, key, sale))
+        return sales
+
+    def pending_demand(self):
+        """{product id: quantity} sold on this lane and not yet on the server"""
+        demand = {}
+        for (payload,) in self._connection().execute('SELECT payload FROM sales WHERE replicated_at IS NULL'):
+            for item in json.loads(payload)['cart_items']:
+                demand[item['id']] = demand.get(item['id'], 0) + item['quantity']
+        return demand
+
+    def counts(self):
+        """(pending, stuck) sale counts"""
+        return self._connection().execute('''
+            SELECT COALESCE(SUM(attempts < ?), 0), COALESCE(SUM(attempts >= ?), 0)
+            FROM sales WHERE replicated_at IS NULL
+        ''', (MAX_ATTEMPTS, MAX_ATTEMPTS)).fetchone()
+
+    def oversold(self, since):
+        """[(created_at, shortage)] of sales replicated since then that the server's stock fell short of"""
+        return self._connection().execute('''
+            SELECT created_at, shortage FROM sales
+            WHERE shortage IS NOT NULL AND replicated_at >= ?
+            ORDER BY seq
+        ''', (since.isoformat(),)).fetchall()
+
+    def mark_replicated(self, acks):
+        """acks: [(seq, ticket_id, shortage or None)] now committed on the server"""
+        now = datetime.now().isoformat()
+        with self._connection() as db:
+            db.executemany('UPDATE sales SET replicated_at = ?, ticket_id = ?, shortage = ? WHERE seq = ?',
+                           [(now, ticket_id, shortage, seq) for seq, ticket_id, shortage in acks])
+
+    def mark_failed(self, seq, error):
+        with self._connection() as db:
+            db.execute('UPDATE sales SET attempts = attempts + 1, last_error = ? WHERE seq = ?',
+                       (str(error)[:1000], seq))
+
+    def prune(self, days=KEEP_REPLICATED_DAYS):
+        """Forget sales replicated more than days ago"""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._connection() as db:
+            db.execute('DELETE FROM sales WHERE replicated_at IS NOT NULL AND replicated_at < ?', (cutoff,))
+
+    # ---------------- Offline logins ----------------
+
+    def remember_user(self, username, password, profile):
+        """Keep a salted hash so this user can log in on this lane while offline"""
+        salt = os.urandom(16)
+        with self._connection() as db:
+            db.execute('INSERT OR REPLACE INTO users (username, salt, hash, profile) VALUES (?, ?, ?, ?)',
+                       (username, salt, _password_hash(password, salt), json.dumps(profile)))
+
+    def check_user(self, username, password):
+        """Profile of a remembered user whose password matches, or None"""
+        row = self._connection().execute('SELECT salt, hash, profile FROM users WHERE username = ?',
+                                         (username,)).fetchone()
+        if row is None or not hmac.compare_digest(_password_hash(password, row[0]), row[1]):
+            return None
+        return json.loads(row[2])
+
+
+def replicate_batch(cursor, sales, numberer):
+    """Record journaled sales on cursor's transaction, skipping ones already there.
+
+    Each sale goes through the stock guard first. A sale the server's stock
+    falls short of is recorded anyway, as the goods are gone, and comes back
+    with its shortage. Returns [(seq, ticket_id, shortage or None)] for the
+    caller to acknowledge after commit.
+    """
+    keys = [key for _, key, _ in sales]
+    cursor.execute(f'SELECT idempotency_key, id FROM tickets WHERE idempotency_key IN ({", ".join(["%s"] * len(keys))})',
+                   keys)
+    done = dict(cursor.fetchall())
+    acks = []
+    for seq, key, sale in sales:
+        shortage = None
+        if key not in done:
+            if sale.get('ticket_number') is None:
+                sale['ticket_number'] = numberer.next_number(sale['sale_date'])
+            cursor.execute('SAVEPOINT journaled_sale')
+            try:
+                done[key] = checkout(cursor, idempotency_key=key, **sale)[0]
+            except InsufficientStock as e:
+                # The guarded UPDATE may have decremented part of the cart
+                cursor.execute('ROLLBACK TO SAVEPOINT journaled_sale')
+                shortage = str(e)
+                print(f"Journaled sale {key} oversold: {shortage}")
+                done[key] = checkout(cursor, idempotency_key=key, allow_oversell=True, **sale)[0]
+        acks.append((seq, done[key], shortage))
+    return acks
+
+
+class JournalReplicator(threading.Thread):
+    """Background thread draining the journal to MySQL on a dedicated connection"""
+
+    def __init__(self, journal, batch_size=BATCH_SIZE):
+        super().__init__(name='journal-replicator', daemon=True)
+        self.journal = journal
+        self.batch_size = batch_size
+        self.numberer = get_numberer()
+        self.online = False
+        self.last_error = None
+        self.replicated = 0          # sales recorded on the server since start
+        self.oversold = 0            # of which the server's stock fell short
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._conn = None
+
+    def wake(self):
+        """Replicate now rather than at the next retry"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        self.journal.prune()
+        while not self._stopping.is_set():
+            try:
+                self._check_server()
+                self.online = True
+                self.last_error = None
+                self._top_up_numbers()
+                while self._drain_batch():
+                    pass
+            except Exception as e:
+                self.online = False
+                self.last_error = str(e)
+                self._close()
+            self._wake.wait(RETRY_SECONDS)
+            self._wake.clear()
+        self._close()
+
+    def _connection(self):
+        if self._conn is None or not self._conn.is_connected():
+            self._close()
+            self._conn = create_mysql_connection()
+        return self._conn
+
+    def _check_server(self):
+        """Round trip on the replication connection; raises when MySQL is unreachable"""
+        cursor = self._connection().cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def _top_up_numbers(self):
+        try:
+            self.numberer.top_up()
+        except Exception as e:
+            print(f"Ticket sequence unavailable: {e}")
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _drain_batch(self):
+        """Replicate one batch; returns True if there may be more"""
+        sales = self.journal.pending(self.batch_size)
+        if not sales:
+            return False
+        conn = self._connection()
+        try:
+            acks = self._commit(conn, sales)
+        except Exception as e:
+            if not conn.is_connected():
+                raise
+            # One bad sale must not hold back the rest: retry the batch a sale at a time
+            print(f"Journal batch failed ({e}); replicating sales one by one")
+            acks = []
+            for sale in sales:
+                try:
+                    acks += self._commit(conn, [sale])
+                except Exception as e:
+                    if not conn.is_connected():
+                        raise
+                    print(f"Journaled sale {sale[1]} not replicated: {e}")
+                    print(traceback.format_exc())
+                    self.journal.mark_failed(sale[0], e)
+        self.journal.mark_replicated(acks)
+        self.replicated += len(acks)
+        self.oversold += sum(1 for ack in acks if ack[2])
+        self.online = True
+        return len(sales) == self.batch_size
+
+    def _commit(self, conn, sales):
+        cursor = conn.cursor(buffered=True)
+        try:
+            acks = replicate_batch(cursor, sales, self.numberer)
+            conn.commit()
+            return acks
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cursor.close()
+
+
+_journal = None
+_replicator = None
+
+
+def get_journal():
+    global _journal
+    if _journal is None:
+        _journal = SaleJournal()
+    return _journal
+
+
+def start_replication():
+    """The process-wide replicator, started on first use"""
+    global _replicator
+    if _replicator is None:
+        _replicator = JournalReplicator(get_journal())
+        _replicator.start()
+    return _replicator
+
+
+def journal_checkout(cart_items, total, **kwargs):
+    """Journal a sale for replication; returns the ticket tuple (id None until replicated)"""
+    sale = dict(kwargs, cart_items=cart_items, total=total)
+    sale.setdefault('sale_date', datetime.now())
+    get_journal().append(sale)
+    if _replicator is not None:
+        _replicator.wake()
+    return (None, sale.get('ticket_number'), sale['sale_date'], total, sale.get('discount', 0.0),
+            sale.get('payment_method', 'Cash'), sale.get('customer'), None, 'Pending', sale.get('cashier_id', 1))
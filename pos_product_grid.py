@@ -0,0 +1,158 @@
+"""
+POS product grid.
+
+A QListView in icon mode over ProductTileModel, with tiles painted by
+ProductTileDelegate. The view only paints the tiles on screen, so the grid
+costs the same for 50 or 50k products. set_products() diffs the new list
+against the current one by product id: rows outside a common prefix/suffix
+are removed and inserted, and rows whose data changed (price, stock after a
+sale) get a dataChanged, so only those tiles repaint.
+"""
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSize, Qt
+from PyQt5.QtGui import QColor, QFont, QPainter
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QStyle, QStyledItemDelegate
+
+from kpi_service import LOW_STOCK_THRESHOLD
+
+GRID_COLUMNS = 3
+TILE_HEIGHT = 120
+TILE_MARGIN = 5
+
+ProductRole = Qt.UserRole + 1
+
+
+def stock_color(quantity):
+    if quantity <= 0:
+        return QColor("#ef4444")
+    if quantity < LOW_STOCK_THRESHOLD:
+        return QColor("#f59e0b")
+    return QColor("#22c55e")
+
+
+class ProductTileModel(QAbstractListModel):
+    """Product tuples (products-table column order) shown as tiles"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._products = []
+
+    def product(self, row):
+        return self._products[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._products)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self._products[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{product[1]}\n{float(product[4]):.2f} DA\nStock: {product[5]}"
+        if role == ProductRole:
+            return product
+        return None
+
+    def set_products(self, products):
+        """Show products, touching only the rows that differ from what is shown"""
+        products = list(products)
+        old_ids = [product[0] for product in self._products]
+        new_ids = [product[0] for product in products]
+        old_count, new_count = len(old_ids), len(new_ids)
+
+        shared = min(old_count, new_count)
+        prefix = 0
+        while prefix < shared and old_ids[prefix] == new_ids[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < shared - prefix and old_ids[old_count - 1 - suffix] == new_ids[new_count - 1 - suffix]:
+            suffix += 1
+
+        if old_count - suffix > prefix:
+            self.beginRemoveRows(QModelIndex(), prefix, old_count - suffix - 1)
+            del self._products[prefix:old_count - suffix]
+            self.endRemoveRows()
+        if new_count - suffix > prefix:
+            self.beginInsertRows(QModelIndex(), prefix, new_count - suffix - 1)
+            self._products[prefix:prefix] = products[prefix:new_count - suffix]
+            self.endInsertRows()
+
+        # Same ids in the same order now; repaint only the tiles whose data moved
+        changed = [row for row in range(new_count) if self._products[row] != products[row]]
+        self._products = products
+        start = None
+        for i, row in enumerate(changed):
+            if start is None:
+                start = row
+            if i + 1 == len(changed) or changed[i + 1] != row + 1:
+                self.dataChanged.emit(self.index(start), self.index(row))
+                start = None
+
+
+class ProductTileDelegate(QStyledItemDelegate):
+    """Rounded tile coloured by stock level with name, price and stock"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tile_size = QSize(160, TILE_HEIGHT)
+
+    def sizeHint(self, option, index):
+        return self.tile_size
+
+    def paint(self, painter, option, index):
+        product = index.data(ProductRole)
+        if product is None:
+            return
+        rect = option.rect.adjusted(TILE_MARGIN, TILE_MARGIN, -TILE_MARGIN, -TILE_MARGIN)
+        color = stock_color(product[5])
+        if option.state & QStyle.State_MouseOver:
+            color = color.lighter(110)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(rect, 10, 10)
+
+        font = QFont(option.font)
+        font.setPointSize(9)
+        font.setWeight(QFont.DemiBold)
+        painter.setFont(font)
+        painter.setPen(Qt.white)
+        painter.drawText(rect.adjusted(10, 10, -10, -10), Qt.AlignCenter | Qt.TextWordWrap, index.data())
+        painter.restore()
+
+
+class ProductGridView(QListView):
+    """Icon-mode list laid out as a fixed number of columns that stretch with the panel"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tile_delegate = ProductTileDelegate(self)
+        self.setItemDelegate(self.tile_delegate)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setWrapping(True)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMouseTracking(True)
+        self.setStyleSheet("""
+            QListView { border: none; background: transparent; padding: 0; }
+            QListView QWidget { border: none; padding: 0; }
+            QScrollBar:vertical { background: #f8f9fa; width: 12px; border-radius: 6px; }
+            QScrollBar::handle:vertical { background: #dee2e6; border-radius: 6px; min-height: 20px; }
+            QScrollBar::handle:vertical:hover { background: #adb5bd; }
+        """)
+
+    def resizeEvent(self, event):
+        # Leave room for the scroll bar so it appearing never wraps a column away
+        available = self.width() - 2 * self.frameWidth() - self.verticalScrollBar().sizeHint().width()
+        width = max(1, (available - 1) // GRID_COLUMNS)
+        size = QSize(width, TILE_HEIGHT + 2 * TILE_MARGIN)
+        if size != self.gridSize():
+            self.tile_delegate.tile_size = size
+            self.setGridSize(size)
+        super().resizeEvent(event)
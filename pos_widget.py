@@ -4,29 +4,27 @@ from PyQt5.QtWidgets import (
     QAbstractItemView, QMessageBox, QTableWidgetItem, QDialog, QFormLayout, QSpinBox,
     QProgressDialog, QCheckBox, QApplication
 )
-from PyQt5.QtCore import Qt, QTimer, QThread, QObject, pyqtSignal, pyqtSlot, QMetaObject, QDateTime
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QColor, QPixmap, QImage
 from datetime import datetime
-import json
 import traceback
-import time
 import mysql.connector
 from mysql.connector import Error
-from mysql_config import get_mysql_connection
+from mysql_config import MySQLConnectionManager
+from offline_journal import get_journal, journal_checkout, start_replication
+from ticket_sequence import get_numberer
+from barcode_index import PRODUCT_COLUMNS, BarcodeIndex
+from catalog_snapshot import CatalogSnapshot, sync_snapshot
+from product_search import SEARCH_LIMIT, ProductSearchIndex, load_search_index
+from pos_product_grid import ProductGridView, ProductTileModel
+from query_worker import QueryRunner
+from camera_pipeline import CameraPipeline, load_camera_stack
+from unknown_barcodes import get_collector
+from scanner_wedge import get_wedge
+from theme import set_style, set_tone
 
 from i18n import tr
 
-# Optional camera/decoder imports with graceful fallback
-try:
-    import cv2
-except Exception:
-    cv2 = None
-try:
-    from pyzbar.pyzbar import decode as zbar_decode
-except Exception:
-    zbar_decode = None
-
-
 class POSWidget(QWidget):
     def __init__(self, parent):
         super().__init__()
@@ -37,19 +35,41 @@ class POSWidget(QWidget):
         self.remise = 0.0
         self.payment_received = 0.0
 
-        # Scan debouncing
-        self._last_scanned: str = ""
-        self._last_scan_at: float = 0.0
-        self._scan_interval = 0.6  # seconds
+        # Sales go to the local journal first; the replicator carries them to MySQL and keeps
+        # the lane's block of ticket numbers topped up, so checkout never waits on the server
+        self.ticket_numbers = get_numberer()
+        self.journal = get_journal()
+        self.replicator = start_replication()
+        self._replicated_seen = self.replicator.replicated
+
+        # Scans resolve from memory; the index follows catalog changes in the background
+        self.queries = QueryRunner(self)
+        self.barcodes = BarcodeIndex()
+        self.catalog = None
+        self.products = []
+        self.products_by_id = {}
+        self.pending_demand = {}     # product id -> quantity journaled on this lane, not yet on the server
+        self.search_index = None
+        self._lookups = 0            # background lookups of index misses, for their query keys
+        self.barcode_timer = QTimer(self)
+        self.barcode_timer.timeout.connect(self.refresh_barcodes)
+        self.barcode_timer.start(5000)
 
         self.init_ui()
         self.load_products()
 
+        # USB scanners are read app-wide while this screen is shown (see scanner_wedge)
+        self.wedge = get_wedge()
+        self.wedge.scanned.connect(self.on_wedge_scanned)
+        self.wedge.quantity_changed.connect(self.show_pending_quantity)
+
         # Timer for clock
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_clock)
+        self.timer.timeout.connect(self.update_sync_status)
         self.timer.start(1000)
         self.update_clock()
+        self.update_sync_status()
 
     # ---------------- UI ----------------
 
@@ -89,16 +109,8 @@ class POSWidget(QWidget):
 
     def create_top_bar(self):
         """Top bar with Scan and Control Panel (removed Printer, Alerts, Store Info, Receipt)."""
-        top_widget = QWidget()
+        top_widget = set_style(QWidget(), 'panel')
         top_widget.setFixedHeight(80)
-        top_widget.setStyleSheet("""
-            QWidget {
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                padding: 0;
-            }
-        """)
 
         layout = QHBoxLayout()
         layout.setContentsMargins(10, 5, 10, 5)
@@ -110,20 +122,12 @@ class POSWidget(QWidget):
         buttons_layout.setSpacing(8)
         buttons_layout.setContentsMargins(0, 0, 0, 0)
 
-        scan_btn = QPushButton(f"🔍 {tr('SCAN')}")
+        scan_btn = set_style(QPushButton(f"🔍 {tr('SCAN')}"), 'nav', 'teal')
         scan_btn.setMinimumSize(100, 40)
-        scan_btn.setStyleSheet("""
-            QPushButton { background: #10b981; color: #0b1021; border: none; border-radius: 6px; padding: 8px 12px; font-weight: 600; font-size: 13px; }
-            QPushButton:hover { background: #34d399; }
-        """)
         scan_btn.clicked.connect(self.show_scan_panel)
 
-        control_panel_btn = QPushButton(f"⚙️ {tr('CONTROL_PANEL')}")
+        control_panel_btn = set_style(QPushButton(f"⚙️ {tr('CONTROL_PANEL')}"), 'nav', 'gray')
         control_panel_btn.setMinimumSize(120, 40)
-        control_panel_btn.setStyleSheet("""
-            QPushButton { background: #52525b; color: white; border: none; border-radius: 6px; padding: 8px 12px; font-weight: 600; font-size: 13px; }
-            QPushButton:hover { background: #3f3f46; }
-        """)
         control_panel_btn.clicked.connect(self.show_control_panel)
 
         buttons_layout.addWidget(scan_btn)
@@ -131,20 +135,14 @@ class POSWidget(QWidget):
 
         # Keep essential nav buttons
         nav_buttons = [
-            (f"➕ {tr('QUICK_ADD')}", "#22c55e", self.quick_add_product),
-            (f"📋 {tr('PRODUCTS_BTN')}", "#f59e0b", self._go_products),
-            (f"📄 {tr('TICKETS_BTN')}", "#ef4444", self._go_tickets),
-            (f"👤 {tr('MAIN_MENU')}", "#6b7280", self._go_main_menu),
+            (f"➕ {tr('QUICK_ADD')}", "green", self.quick_add_product),
+            (f"📋 {tr('PRODUCTS_BTN')}", "amber", self._go_products),
+            (f"📄 {tr('TICKETS_BTN')}", "red", self._go_tickets),
+            (f"👤 {tr('MAIN_MENU')}", "gray", self._go_main_menu),
         ]
-        for text, color, cb in nav_buttons:
-            btn = QPushButton(text)
+        for text, tone, cb in nav_buttons:
+            btn = set_style(QPushButton(text), 'nav', tone)
             btn.setMinimumSize(100, 40)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background: {color}; color: white; border: none; border-radius: 6px; padding: 8px 12px; font-weight: 600; font-size: 13px;
-                }}
-                QPushButton:hover {{ background: {QColor(color).darker(115).name()}; }}
-            """)
             btn.clicked.connect(cb)
             buttons_layout.addWidget(btn)
 
@@ -178,7 +176,13 @@ class POSWidget(QWidget):
         datetime_layout.addWidget(self.time_label, 0, Qt.AlignHCenter)
         self.datetime_widget.setLayout(datetime_layout)
 
+        # Journal replication state
+        self.sync_label = set_style(QLabel(), 'status')
+        self.sync_label.setFixedWidth(150)
+        self.sync_label.setAlignment(Qt.AlignCenter)
+
         layout.addWidget(scroll_area, 1)
+        layout.addWidget(self.sync_label, 0, Qt.AlignRight)
         layout.addWidget(self.datetime_widget, 0, Qt.AlignRight)
         top_widget.setLayout(layout)
         return top_widget
@@ -211,39 +215,25 @@ class POSWidget(QWidget):
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(clear_search_btn)
 
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setStyleSheet("""
-            QScrollArea { border: none; background: transparent; }
-            QScrollBar:vertical { background: #f8f9fa; width: 12px; border-radius: 6px; }
-            QScrollBar::handle:vertical { background: #dee2e6; border-radius: 6px; min-height: 20px; }
-            QScrollBar::handle:vertical:hover { background: #adb5bd; }
-        """)
-        self.product_container = QWidget()
-        self.product_layout = QGridLayout()
-        self.product_layout.setSpacing(10)
-        self.product_container.setLayout(self.product_layout)
-        scroll_area.setWidget(self.product_container)
+        self.product_model = ProductTileModel(self)
+        self.product_grid = ProductGridView()
+        self.product_grid.setModel(self.product_model)
+        self.product_grid.clicked.connect(self.add_shown_product)
 
         layout.addLayout(search_layout)
-        layout.addWidget(scroll_area)
+        layout.addWidget(self.product_grid)
         widget.setLayout(layout)
         return widget
 
     def create_transaction_panel(self):
-        widget = QWidget()
-        widget.setStyleSheet("""
-            QWidget { background: white; border: 1px solid #e9ecef; border-radius: 8px; padding: 15px; }
-        """)
+        widget = set_style(QWidget(), 'panel')
         layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(15)
 
-        display_widget = QWidget()
-        display_widget.setStyleSheet("""
-            QWidget { background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #f8f9fa, stop:1 #e9ecef); border: 2px solid #dee2e6; border-radius: 12px; padding: 20px; }
-        """)
+        display_widget = set_style(QWidget(), 'display')
         display_layout = QHBoxLayout()
+        display_layout.setContentsMargins(20, 20, 20, 20)
 
         total_container = QVBoxLayout()
         total_label = QLabel(tr("TOTAL"))
@@ -276,11 +266,7 @@ class POSWidget(QWidget):
         change_label.setStyleSheet("font-size: 12px; font-weight: 600; color: #6c757d; margin-top: 10px;")
         change_label.setAlignment(Qt.AlignCenter)
 
-        self.change_display = QLabel("0.00 DA")
-        self.change_display.setStyleSheet("""
-            QLabel { font-size: 20px; font-weight: 600; color: #ef4444; font-family: 'Courier New', monospace; background: white;
-                     padding: 8px 12px; border-radius: 6px; border: 2px solid #ef4444; }
-        """)
+        self.change_display = set_style(QLabel("0.00 DA"), 'amount', 'red')
         self.change_display.setAlignment(Qt.AlignCenter)
 
         payment_container.addWidget(payment_label)
@@ -341,37 +327,29 @@ class POSWidget(QWidget):
         return widget
 
     def create_control_panel(self):
-        widget = QWidget()
-        widget.setStyleSheet("QWidget { background: white; border: 1px solid #e9ecef; border-radius: 8px; padding: 15px; }")
+        widget = set_style(QWidget(), 'panel')
         layout = QGridLayout()
+        layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(8)
         buttons = [
-            (f"📦\n{tr('MULTIPLE')}", "#f59e0b", 0, 0, self.handle_multiple),
-            (f"⬆️\n{tr('UP')}", "#6d28d9", 0, 1, self.move_up),
-            (f"🔙\n{tr('BACK')}", "#0ea5e9", 0, 2, self.go_back),
-            (f"⬅️\n{tr('LEFT')}", "#6d28d9", 1, 0, self.move_left),
-            (f"✅\n{tr('CONFIRM')}", "#22c55e", 1, 1, self.handle_confirm),
-            (f"➡️\n{tr('RIGHT')}", "#6d28d9", 1, 2, self.move_right),
-            (f"⌨️\n{tr('KEYBOARD')}", "#f59e0b", 2, 0, self.show_keyboard),
-            (f"⬇️\n{tr('DOWN')}", "#6d28d9", 2, 1, self.move_down),
-            (f"👤\n{tr('CUSTOMER_BTN')}", "#f59e0b", 2, 2, self.manage_customer),
-            (f"🛒\n{tr('REMOVE')}", "#fbbf24", 3, 0, self.remove_selected),
-            (f"🧹\n{tr('CLEAR_ALL')}", "#ef4444", 3, 1, self.clear_all),
-            (f"🧮\n{tr('CALCULATOR')}", "#0ea5e9", 3, 2, self.show_calculator),
-            (f"🔄\n{tr('REFRESH')}", "#22c55e", 4, 0, self.refresh_display),
-            (f"🎫\n{tr('NEW_SALE')}", "#3b82f6", 4, 1, self.process_sale),
-            (f"💰\n{tr('CASH')}", "#22c55e", 4, 2, self.quick_cash_payment),
+            (f"📦\n{tr('MULTIPLE')}", "amber", 0, 0, self.handle_multiple),
+            (f"⬆️\n{tr('UP')}", "violet", 0, 1, self.move_up),
+            (f"🔙\n{tr('BACK')}", "sky", 0, 2, self.go_back),
+            (f"⬅️\n{tr('LEFT')}", "violet", 1, 0, self.move_left),
+            (f"✅\n{tr('CONFIRM')}", "green", 1, 1, self.handle_confirm),
+            (f"➡️\n{tr('RIGHT')}", "violet", 1, 2, self.move_right),
+            (f"⌨️\n{tr('KEYBOARD')}", "amber", 2, 0, self.show_keyboard),
+            (f"⬇️\n{tr('DOWN')}", "violet", 2, 1, self.move_down),
+            (f"👤\n{tr('CUSTOMER_BTN')}", "amber", 2, 2, self.manage_customer),
+            (f"🛒\n{tr('REMOVE')}", "yellow", 3, 0, self.remove_selected),
+            (f"🧹\n{tr('CLEAR_ALL')}", "red", 3, 1, self.clear_all),
+            (f"🧮\n{tr('CALCULATOR')}", "sky", 3, 2, self.show_calculator),
+            (f"🔄\n{tr('REFRESH')}", "green", 4, 0, self.refresh_display),
+            (f"🎫\n{tr('NEW_SALE')}", "blue", 4, 1, self.process_sale),
+            (f"💰\n{tr('CASH')}", "green", 4, 2, self.quick_cash_payment),
         ]
-        for text, color, row, col, cb in buttons:
-            btn = QPushButton(text)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background: {color}; color: white; border: none; border-radius: 8px; padding: 12px 8px;
-                    font-weight: 600; font-size: 11px; text-align: center; min-height: 60px;
-                }}
-                QPushButton:hover {{ opacity: 0.9; }}
-                QPushButton:pressed {{ opacity: 0.8; }}
-            """)
+        for text, tone, row, col, cb in buttons:
+            btn = set_style(QPushButton(text), 'pad', tone)
             btn.clicked.connect(cb)
             layout.addWidget(btn, row, col)
         widget.setLayout(layout)
@@ -379,10 +357,9 @@ class POSWidget(QWidget):
 
     def create_barcode_panel(self):
         """Right-side barcode scanning panel with USB + Camera support and auto-scan."""
-        widget = QWidget()
-        widget.setStyleSheet("QWidget { background: white; border: 1px solid #e9ecef; border-radius: 8px; padding: 15px; }")
+        widget = set_style(QWidget(), 'panel')
         layout = QVBoxLayout()
-        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(10)
 
         title = QLabel(tr("BARCODE_SCANNER"))
@@ -420,9 +397,8 @@ class POSWidget(QWidget):
         manual_entry_btn.setStyleSheet("QPushButton { background: #6b7280; color: white; border: none; border-radius: 8px; padding: 12px; font-size: 14px; font-weight: 600; }")
         manual_entry_btn.clicked.connect(lambda: ManualProductEntryDialog(self).exec_())
 
-        self.barcode_status = QLabel(tr("READY_TO_SCAN"))
+        self.barcode_status = set_style(QLabel(tr("READY_TO_SCAN")), 'status', 'gray')
         self.barcode_status.setAlignment(Qt.AlignCenter)
-        self.barcode_status.setStyleSheet("QLabel { font-size: 14px; color: #6c757d; }")
 
         layout.addWidget(title)
         layout.addLayout(controls)
@@ -457,38 +433,29 @@ class POSWidget(QWidget):
         self.parent.show_main_menu()
 
     def update_camera_frame(self, image: QImage):
-        pix = QPixmap.fromImage(image)
-        self.camera_view.setPixmap(pix.scaled(self.camera_view.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        # The pipeline already sized the frame to the view; fromImage copies it out of the pipeline's buffer
+        self.camera_view.setPixmap(QPixmap.fromImage(image))
+        area = self.camera_view.contentsRect()
+        self.barcode_scanner.set_preview_size(area.width(), area.height())
 
-    def update_barcode_status(self, message: str, color: str):
+    def update_barcode_status(self, message: str, tone: str):
         self.barcode_status.setText(message)
-        self.barcode_status.setStyleSheet(f"color: {color};")
-
-    def log_unknown_barcode(self, barcode: str):
-        try:
-            with open("unknown_barcodes.log", "a", encoding="utf-8") as f:
-                f.write(f"{datetime.now().isoformat()} {barcode}\n")
-        except Exception:
-            pass
-        QMessageBox.information(self, tr("UNKNOWN_BARCODE_TITLE"), tr("UNKNOWN_BARCODE_MSG", code=barcode))
+        set_tone(self.barcode_status, tone)
 
     def init_barcode_scanner(self):
         """Create worker and thread for camera scanning."""
         try:
-            if cv2 is None or zbar_decode is None:
+            if not load_camera_stack():
                 QMessageBox.warning(self, "Scanner", "Camera scanning requires OpenCV (cv2) and pyzbar.")
                 return
-            self.barcode_scanner = BarcodeScanner()
-            self.scanner_thread = QThread(self)
-            self.barcode_scanner.moveToThread(self.scanner_thread)
+            # Capture and decoding run on the pipeline's own threads
+            self.barcode_scanner = CameraPipeline(self)
 
             # Wire signals
             self.barcode_scanner.barcode_scanned.connect(self.on_scanned)
             self.barcode_scanner.scan_status.connect(self.update_barcode_status)
             self.barcode_scanner.unknown_barcode.connect(self.log_unknown_barcode)
             self.barcode_scanner.frame_ready.connect(self.update_camera_frame)
-
-            self.scanner_thread.start()
         except Exception as e:
             QMessageBox.critical(self, "Scanner Error", f"Failed to initialize barcode scanner: {str(e)}")
 
@@ -499,136 +466,214 @@ class POSWidget(QWidget):
             return
 
         if self.barcode_scanner.scanning:
-            QMetaObject.invokeMethod(self.barcode_scanner, "stop_scanning", Qt.QueuedConnection)
+            self.barcode_scanner.stop_scanning()
             self.camera_scan_btn.setText(tr("START_CAMERA"))
         else:
-            QMetaObject.invokeMethod(self.barcode_scanner, "start_scanning", Qt.QueuedConnection)
+            area = self.camera_view.contentsRect()
+            self.barcode_scanner.set_preview_size(area.width(), area.height())
+            self.barcode_scanner.start_scanning()
             self.camera_scan_btn.setText(tr("STOP_CAMERA"))
 
     def on_scanned(self, code: str):
         if not self.auto_scan_checkbox.isChecked():
-            self.update_barcode_status(f"{tr('ADDED', name=code)}", "#0ea5e9")
+            self.update_barcode_status(f"{tr('ADDED', name=code)}", "sky")
             return
         self.process_barcode(code)
 
+    def on_wedge_scanned(self, code: str):
+        if self.isVisible():
+            self.process_barcode(code)
+
+    def show_pending_quantity(self, quantity: int):
+        if quantity > 1:
+            self.update_barcode_status(tr("QUANTITY_PENDING", quantity=quantity), "amber")
+        else:
+            self.update_barcode_status(tr("READY_TO_SCAN"), "gray")
+
     def process_barcode(self, barcode: str | None):
-        """Unified handler for USB (input) and Camera scans."""
+        """Unified handler for USB (wedge or input) and Camera scans.
+
+        Scanning the same item twice adds it twice: the camera pipeline
+        already drops repeated sightings of one scan, and USB scanners send
+        each scan once.
+        """
         code = (barcode or "").strip() if barcode else self.barcode_input.text().strip()
         if not code:
-            self.update_barcode_status(tr("PLEASE_ENTER_BARCODE"), "#ef4444")
-            return
-
-        # Debounce
-        now = QDateTime.currentDateTime().toMSecsSinceEpoch() / 1000.0
-        if code == self._last_scanned and (now - self._last_scan_at) < self._scan_interval:
+            self.update_barcode_status(tr("PLEASE_ENTER_BARCODE"), "red")
             return
-        self._last_scanned = code
-        self._last_scan_at = now
 
         try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute('SELECT * FROM products WHERE code_bar = ?', (code,))
-            product = cursor.fetchone()
-
-            if product:
-                self.add_to_cart(product, 1)
-                self.update_barcode_status(tr("ADDED", name=product[1]), "#22c55e")
-                QApplication.beep()
+            quantity = self.wedge.take_quantity()
+            product = self.find_product_by_barcode(code)
+            if product is None and self.replicator.online:
+                # The product may have been created since the last index refresh
+                self.lookup_barcode(code, quantity)
             else:
-                self.update_barcode_status(tr("PRODUCT_NOT_FOUND"), "#ef4444")
-                QApplication.beep()
-                self.log_unknown_barcode(code)
+                self.show_scan_result(code, product, quantity)
 
             if not barcode:
                 self.barcode_input.clear()
         except Exception as e:
-            self.update_barcode_status(f"Error: {str(e)}", "#ef4444")
+            self.update_barcode_status(f"Error: {str(e)}", "red")
             print(f"Error processing barcode: {e}")
 
+    def show_scan_result(self, code: str, product, quantity: int):
+        """Add a scanned product to the cart, or report the code as unknown"""
+        if product:
+            self.add_to_cart(product, quantity)
+            name = product[1] if quantity == 1 else f"{product[1]} × {quantity}"
+            self.update_barcode_status(tr("ADDED", name=name), "green")
+        else:
+            self.update_barcode_status(tr("PRODUCT_NOT_FOUND"), "red")
+            self.log_unknown_barcode(code)
+        QApplication.beep()
+
+    def find_product_by_barcode(self, code: str):
+        """Product for a barcode from the in-memory index, None on a miss or before it has loaded"""
+        if not self.barcodes.loaded:
+            return None
+        product = self.barcodes.lookup(code)
+        self.barcode_status.setToolTip(
+            "Barcode index: {products} products, {hits} hits, {misses} misses, "
+            "{stale} refreshes, {avg_lookup_us:.1f} µs/scan".format(**self.barcodes.stats()))
+        return product
+
+    def lookup_barcode(self, code: str, quantity: int):
+        """Check an index miss against the database in the background"""
+        self._lookups += 1
+        self.queries.submit(('barcode', self._lookups), self.fetch_product_by_barcode,
+                            lambda product: self.barcode_looked_up(code, product, quantity), code,
+                            on_error=lambda message: self.update_barcode_status(f"Error: {message}", "red"))
+
+    @staticmethod
+    def fetch_product_by_barcode(cursor, code):
+        cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products WHERE code_bar = %s', (code,))
+        return cursor.fetchone()
+
+    def barcode_looked_up(self, code: str, product, quantity: int):
+        self.show_scan_result(code, product, quantity)
+        if product is not None and self.barcodes.loaded:
+            self.refresh_barcodes()
+
+    def refresh_barcodes(self):
+        """Load the barcode index, or pull catalog changes into it, in the background"""
+        if self.replicator.online and not self.queries.is_busy('barcodes'):
+            self.queries.submit('barcodes', self.barcodes.pending_changes, self.barcodes.apply)
+
     def _stop_camera_if_running(self):
         if hasattr(self, 'barcode_scanner') and self.barcode_scanner and self.barcode_scanner.scanning:
-            QMetaObject.invokeMethod(self.barcode_scanner, "stop_scanning", Qt.QueuedConnection)
-        if hasattr(self, 'scanner_thread') and self.scanner_thread:
-            self.scanner_thread.quit()
-            self.scanner_thread.wait(1000)
+            self.barcode_scanner.stop_scanning()
+            self.camera_scan_btn.setText(tr("START_CAMERA"))
 
     def closeEvent(self, event):
         self._stop_camera_if_running()
         super().closeEvent(event)
 
+    def screen_shown(self, hidden_for):
+        """Back on screen with the cart intact: pull catalog changes and refocus the scanner input"""
+        self.load_products()
+        self.update_sync_status()
+        self.barcode_input.setFocus()
+
+    def showEvent(self, event):
+        self.wedge.enabled = True
+        super().showEvent(event)
+
     def hideEvent(self, event):
         # Stop scanning if the POS widget gets hidden or replaced
+        self.wedge.enabled = False
         self._stop_camera_if_running()
         super().hideEvent(event)
 
     # ------------- Catalog, cart & totals -------------
 
     def load_products(self):
+        """Show the on-disk catalog snapshot, then pull what changed since it in the background"""
+        # Without a new snapshot, the stock shown still moves with the sales journaled
+        self.set_catalog(CatalogSnapshot.load() if self.catalog is None else None)
+        if self.replicator.online:
+            self.queries.submit('catalog', sync_snapshot, self.set_catalog, self.catalog)
+
+    def set_catalog(self, snapshot):
+        """Show a catalog snapshot; None keeps the one shown and only updates the stock left to sell"""
+        demand = self.journal.pending_demand()
+        if snapshot is None:
+            if demand != self.pending_demand:
+                self.pending_demand = demand
+                self.filter_products()
+            return
+        self.pending_demand = demand
         try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute('SELECT * FROM products ORDER BY name')
-            products = cursor.fetchall()
-
-            self.clear_product_buttons()
-            row, col = 0, 0
-            max_cols = 3
-            for product in products:
-                try:
-                    btn = self.create_product_button(product)
-                    self.product_layout.addWidget(btn, row, col)
-                    col += 1
-                    if col >= max_cols:
-                        col = 0
-                        row += 1
-                except Exception as e:
-                    print(f"Error creating button for product {product}: {e}")
-                    continue
+            self.catalog = snapshot
+            products = snapshot.products
+            self.products = products
+            self.products_by_id = {product[0]: product for product in products}
+            if not self.barcodes.loaded:
+                self.barcodes.apply({'full': True, 'version': snapshot.version, 'versioned': snapshot.versioned,
+                                     'rows': products, 'deleted': []})
+            if self.search_index is not None:
+                self.search_index.update(products)
+            elif not self.replicator.online:
+                self.search_index = ProductSearchIndex(products)
+            elif not self.queries.is_busy('search_index'):
+                self.queries.submit('search_index', load_search_index, self.set_search_index)
+
+            if self.search_input.text().strip():
+                self.filter_products()
+            else:
+                self.show_products(products)
         except Exception as e:
             print(f"Error loading products: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
 
-    def clear_product_buttons(self):
-        try:
-            while self.product_layout.count():
-                child = self.product_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-        except Exception as e:
-            print(f"Error clearing product buttons: {e}")
+        # Stock and catalog edits made the index stale
+        self.refresh_barcodes()
 
-    def create_product_button(self, product):
-        try:
-            btn = QPushButton()
-            btn.setFixedSize(160, 120)
+    def update_sync_status(self):
+        """Online/offline badge with the number of sales waiting for the server"""
+        pending, stuck = self.journal.counts()
+        if self.replicator.online:
+            text, tone = ("✓ Online" if not pending else f"⟳ Syncing {pending}"), "green"
+        else:
+            text, tone = f"⚠ Offline · {pending} queued", "amber"
+        tooltip = [self.replicator.last_error] if self.replicator.last_error else []
+        # Journaled sales the server's stock fell short of when they were replayed
+        oversold = self.journal.oversold(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+        if oversold:
+            text, tone = f"{text} · {len(oversold)} oversold", "amber" if tone == "green" else tone
+            tooltip += [f"{created_at[:16].replace('T', ' ')}  {shortage}" for created_at, shortage in oversold[-10:]]
+        if stuck:
+            text, tone = f"{text} · {stuck} failed", "red"
+        self.sync_label.setText(text)
+        self.sync_label.setToolTip("\n".join(tooltip))
+        set_tone(self.sync_label, tone)
+
+        # Stock on the server moved with the replicated sales
+        if self.replicator.replicated != self._replicated_seen:
+            self._replicated_seen = self.replicator.replicated
+            self.load_products()
 
-            product_name = product[1] if len(product) > 1 else "Unknown"
-            product_sell_price = product[4] if len(product) > 4 else 0.0
-            product_quantity = product[5] if len(product) > 5 else 0
+    def set_search_index(self, index):
+        """Take the index built in the background, catching up with products loaded since"""
+        index.update(self.products)
+        self.search_index = index
 
-            if product_quantity <= 0:
-                color = "#ef4444"
-            elif product_quantity < 10:
-                color = "#f59e0b"
-            else:
-                color = "#22c55e"
-
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background: {color}; color: white; border: none; border-radius: 10px;
-                    padding: 10px; font-weight: 600; font-size: 12px; text-align: center;
-                }}
-                QPushButton:hover {{ opacity: 0.9; }}
-                QPushButton:pressed {{ opacity: 0.8; }}
-            """)
-            btn.setText(f"{product_name}\n{product_sell_price:.2f} DA\nStock: {product_quantity}")
-            btn.clicked.connect(lambda checked, p=product: self.add_to_cart(p, 1))
-            return btn
-        except Exception as e:
-            print(f"Error creating product button: {e}")
-            btn = QPushButton("Error\nLoading\nProduct")
-            btn.setFixedSize(160, 120)
-            btn.setStyleSheet("QPushButton { background: #6b7280; color: white; border: none; border-radius: 10px; padding: 10px; }")
-            return btn
+    def sellable(self, product):
+        """Product tuple with the stock left once the sales journaled here reach the server"""
+        sold = self.pending_demand.get(product[0])
+        if not sold:
+            return product
+        return product[:5] + (int(product[5]) - sold,) + product[6:]
+
+    def show_products(self, products):
+        """Update the product grid; unchanged tiles are left alone"""
+        if self.pending_demand:
+            products = [self.sellable(product) for product in products]
+        self.product_model.set_products(products)
+
+    def add_shown_product(self, index):
+        shown = self.product_model.product(index.row())
+        self.add_to_cart(self.products_by_id.get(shown[0], shown), 1)
 
     def add_to_cart(self, product, quantity=1):
         """Add a product with a given quantity, with stock checks."""
@@ -640,7 +685,8 @@ class POSWidget(QWidget):
             product_id = product[0]
             product_name = product[1]
             product_sell_price = float(product[4])
-            product_stock = int(product[5])
+            # Sales journaled here and not yet on the server are not in the catalog stock
+            product_stock = int(self.sellable(product)[5])
 
             if quantity <= 0:
                 QMessageBox.warning(self, "Invalid Quantity", "Quantity must be positive")
@@ -677,45 +723,45 @@ class POSWidget(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to add product to cart: {str(e)}")
 
     def load_customers(self):
-        try:
-            self.client_combo.clear()
+        """Walk-in right away, named customers once the background query returns"""
+        if self.client_combo.count() == 0:
             self.client_combo.addItem("Walk-in Customer")
-            cursor = self.parent.conn.cursor()
-            cursor.execute('SELECT name FROM customers ORDER BY name')
-            for (name,) in cursor.fetchall():
-                if name:
-                    self.client_combo.addItem(name)
-        except Exception as e:
-            print(f"Error loading customers: {e}")
-            if self.client_combo.count() == 0:
-                self.client_combo.addItem("Walk-in Customer")
+        if self.replicator.online:
+            self.queries.submit('customers', self.fetch_customers, self.show_customers)
+
+    @staticmethod
+    def fetch_customers(cursor):
+        cursor.execute('SELECT name FROM customers ORDER BY name')
+        return [name for (name,) in cursor.fetchall() if name]
+
+    def show_customers(self, customers):
+        current = self.client_combo.currentText()
+        self.client_combo.clear()
+        self.client_combo.addItem("Walk-in Customer")
+        self.client_combo.addItems(customers)
+        self.client_combo.setCurrentText(current)
 
     def filter_products(self):
+        """Show the products matching the search box, best matches first"""
         try:
-            search_term = self.search_input.text().lower()
-            cursor = self.parent.conn.cursor()
-            if search_term:
-                cursor.execute('''
-                    SELECT * FROM products 
-                    WHERE LOWER(name) LIKE %s OR code_bar LIKE %s
-                    ORDER BY name
-                ''', (f'%{search_term}%', f'%{search_term}%'))
+            search_term = self.search_input.text().strip()
+            if not search_term:
+                products = self.products
+            elif self.search_index is not None:
+                products = [self.products_by_id[product_id]
+                            for product_id in self.search_index.search(search_term)
+                            if product_id in self.products_by_id]
             else:
-                cursor.execute('SELECT * FROM products ORDER BY name')
-            products = cursor.fetchall()
-            self.clear_product_buttons()
-            row, col = 0, 0
-            max_cols = 3
-            for product in products:
-                try:
-                    btn = self.create_product_button(product)
-                    self.product_layout.addWidget(btn, row, col)
-                    col += 1
-                    if col >= max_cols:
-                        col = 0
-                        row += 1
-                except Exception as e:
-                    print(f"Error creating filtered product button: {e}")
+                # The index is still being built
+                with MySQLConnectionManager() as (cursor, conn):
+                    cursor.execute('''
+                        SELECT * FROM products 
+                        WHERE LOWER(name) LIKE %s OR code_bar LIKE %s
+                        ORDER BY name
+                        LIMIT %s
+                    ''', (f'%{search_term.lower()}%', f'%{search_term}%', SEARCH_LIMIT))
+                    products = cursor.fetchall()
+            self.show_products(products)
         except Exception as e:
             print(f"Error filtering products: {e}")
             QMessageBox.warning(self, "Error", f"Failed to filter products: {str(e)}")
@@ -765,11 +811,7 @@ class POSWidget(QWidget):
                 total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                 self.transaction_table.setItem(row, 4, total_item)
 
-                remove_btn = QPushButton("✕")
-                remove_btn.setStyleSheet("""
-                    QPushButton { background: #ef4444; color: white; border: none; border-radius: 4px; padding: 4px 8px; font-weight: bold; }
-                    QPushButton:hover { background: #dc2626; }
-                """)
+                remove_btn = set_style(QPushButton("✕"), 'row-action', 'red')
                 remove_btn.clicked.connect(lambda checked, r=row: self.remove_from_cart(r))
                 self.transaction_table.setCellWidget(row, 5, remove_btn)
 
@@ -823,14 +865,10 @@ class POSWidget(QWidget):
             change = payment - total_with_discount
             if change >= 0:
                 self.change_display.setText(f"{change:.2f} DA")
-                self.change_display.setStyleSheet("""
-                    QLabel { font-size: 20px; font-weight: 600; color: #22c55e; font-family: 'Courier New', monospace; background: white; padding: 8px 12px; border-radius: 6px; border: 2px solid #22c55e; }
-                """)
+                set_tone(self.change_display, 'green')
             else:
                 self.change_display.setText(f"{abs(change):.2f} DA")
-                self.change_display.setStyleSheet("""
-                    QLabel { font-size: 20px; font-weight: 600; color: #ef4444; font-family: 'Courier New', monospace; background: white; padding: 8px 12px; border-radius: 6px; border: 2px solid #ef4444; }
-                """)
+                set_tone(self.change_display, 'red')
         except ValueError:
             self.change_display.setText("0.00 DA")
         except Exception as e:
@@ -992,40 +1030,13 @@ class POSWidget(QWidget):
                     QMessageBox.warning(self, tr("INSUFFICIENT_PAYMENT"), tr("INSUFFICIENT_PAYMENT"))
                     return
 
-                cursor = self.parent.conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM tickets')
-                ticket_count = cursor.fetchone()[0]
-                ticket_number = f"TKT{ticket_count + 1:06d}"
-
-                items_data = []
-                for item in self.cart_items:
-                    items_data.append({
-                        'name': item['name'],
-                        'quantity': item['quantity'],
-                        'price': item['price'],
-                        'total': item['price'] * item['quantity']
-                    })
-
-                cursor.execute('''
-                    INSERT INTO tickets (ticket_number, date, total_price, remis, payment_method, customer_name, items, status, cashier_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    ticket_number,
-                    datetime.now().isoformat(),
-                    total_with_discount,
-                    self.remise,
-                    'Cash',
-                    self.client_combo.currentText(),
-                    json.dumps(items_data),
-                    'Completed',
-                    self.parent.current_user['id'] if self.parent.current_user else 1
-                ))
-
-                for item in self.cart_items:
-                    cursor.execute('UPDATE products SET quantity = quantity - ? WHERE id = ?',
-                                   (item['quantity'], item['id']))
-
-                self.parent.conn.commit()
+                ticket = journal_checkout(
+                    self.cart_items, total_with_discount,
+                    discount=self.remise,
+                    customer=self.client_combo.currentText(),
+                    cashier_id=self.parent.current_user['id'] if self.parent.current_user else 1,
+                    ticket_number=self.ticket_numbers.next_number(reserve=False))
+                ticket_number = ticket[1]
 
                 change = payment - total_with_discount
                 success_msg = f"{tr('SALE_COMPLETED')}\n\nTicket: {ticket_number}\nTotal: {total_with_discount:.2f} DA\nPayment: {payment:.2f} DA\nChange: {change:.2f} DA"
@@ -1060,49 +1071,9 @@ class POSWidget(QWidget):
         except Exception as e:
             print(f"Error setting quick cash payment: {e}")
 
-    def process_barcode(self, code, barcode=None):
-        """Process scanned barcode"""
-        if not code:
-            return
-
-        now = time.time()
-        if code == self._last_scanned and (now - self._last_scan_at) < self._scan_interval:
-            return
-        self._last_scanned = code
-        self._last_scan_at = now
-
-        try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute('SELECT * FROM products WHERE code_bar = %s', (code,))
-            product = cursor.fetchone()
-
-            if product:
-                self.add_to_cart(product, 1)
-                self.update_barcode_status(tr("ADDED", name=product[1]), "#22c55e")
-                QApplication.beep()
-            else:
-                self.update_barcode_status(tr("PRODUCT_NOT_FOUND"), "#ef4444")
-                QApplication.beep()
-                self.log_unknown_barcode(code)
-
-            if not barcode:
-                self.barcode_input.clear()
-
-        except Exception as e:
-            print(f"Error processing barcode: {e}")
-            self.update_barcode_status(tr("ERROR_PROCESSING"), "#ef4444")
-
     def log_unknown_barcode(self, code):
-        """Log unknown barcode to database"""
-        try:
-            cursor = self.parent.conn.cursor()
-            cursor.execute('''
-                INSERT INTO unknown_barcodes (barcode, scan_date)
-                VALUES (%s, %s)
-            ''', (code, datetime.now()))
-            self.parent.conn.commit()
-        except Exception as e:
-            print(f"Error logging unknown barcode: {e}")
+        """Queue an unknown barcode for review; the collector writes it in the background"""
+        get_collector().record(code)
 
     def complete_sale(self):
         """Complete the sale transaction"""
@@ -1127,40 +1098,13 @@ class POSWidget(QWidget):
                     QMessageBox.warning(self, tr("INSUFFICIENT_PAYMENT"), tr("INSUFFICIENT_PAYMENT"))
                     return
 
-                cursor = self.parent.conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM tickets')
-                ticket_count = cursor.fetchone()[0]
-                ticket_number = f"TKT{ticket_count + 1:06d}"
-
-                items_data = []
-                for item in self.cart_items:
-                    items_data.append({
-                        'name': item['name'],
-                        'quantity': item['quantity'],
-                        'price': item['price'],
-                        'total': item['price'] * item['quantity']
-                    })
-
-                cursor.execute('''
-                    INSERT INTO tickets (ticket_number, date, total_price, remis, payment_method, customer_name, items, status, cashier_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    ticket_number,
-                    datetime.now(),
-                    total_with_discount,
-                    self.remise,
-                    'Cash',
-                    self.client_combo.currentText(),
-                    json.dumps(items_data),
-                    'Completed',
-                    self.parent.current_user['id'] if self.parent.current_user else 1
-                ))
-
-                for item in self.cart_items:
-                    cursor.execute('UPDATE products SET quantity = quantity - %s WHERE id = %s',
-                                   (item['quantity'], item['id']))
-
-                self.parent.conn.commit()
+                ticket = journal_checkout(
+                    self.cart_items, total_with_discount,
+                    discount=self.remise,
+                    customer=self.client_combo.currentText(),
+                    cashier_id=self.parent.current_user['id'] if self.parent.current_user else 1,
+                    ticket_number=self.ticket_numbers.next_number(reserve=False))
+                ticket_number = ticket[1]
 
                 change = payment - total_with_discount
                 success_msg = f"{tr('SALE_COMPLETED')}\n\nTicket: {ticket_number}\nTotal: {total_with_discount:.2f} DA\nPayment: {payment:.2f} DA\nChange: {change:.2f} DA"
@@ -1186,119 +1130,6 @@ class POSWidget(QWidget):
         """Calculate the total amount of items in the cart"""
         return sum(item['price'] * item['quantity'] for item in self.cart_items)
 
-# ---------------- BarcodeScanner worker (camera) ----------------
-
-class BarcodeScanner(QObject):
-    barcode_scanned = pyqtSignal(str)
-    scan_status = pyqtSignal(str, str)   # message, color
-    unknown_barcode = pyqtSignal(str)
-    frame_ready = pyqtSignal(QImage)
-
-    def __init__(self):
-        super().__init__()
-        self.scanning = False
-        self._cap = None
-        self._timer = None
-        self._last_code = ""
-        self._last_time = 0.0
-        self._interval = 0.5  # seconds
-        self._frame_counter = 0
-
-    @pyqtSlot()
-    def start_scanning(self):
-        if self.scanning:
-            return
-        if cv2 is None or zbar_decode is None:
-            self.scan_status.emit("Camera scanning requires cv2 + pyzbar", "#ef4444")
-            return
-        try:
-            self._cap = cv2.VideoCapture(0)
-            if not self._cap or not self._cap.isOpened():
-                self.scan_status.emit("Cannot open camera", "#ef4444")
-                return
-            self.scanning = True
-            self.scan_status.emit("Camera scanning started", "#22c55e")
-            self._timer = QTimer(self)
-            self._timer.timeout.connect(self._scan_step)
-            self._timer.start(100)
-        except Exception as e:
-            self.scan_status.emit(f"Camera error: {str(e)}", "#ef4444")
-            self.scanning = False
-
-    @pyqtSlot()
-    def stop_scanning(self):
-        if self._timer:
-            self._timer.stop()
-            self._timer = None
-        if self._cap:
-            try:
-                self._cap.release()
-            except Exception:
-                pass
-            self._cap = None
-        if self.scanning:
-            self.scan_status.emit("Camera scanning stopped", "#6b7280")
-        self.scanning = False
-
-    def _scan_step(self):
-        if not self.scanning or self._cap is None:
-            return
-        ok, frame = self._cap.read()
-        if not ok or frame is None:
-            self.scan_status.emit("Camera read failed", "#ef4444")
-            return
-        # Downscale to 640px width to reduce CPU
-        try:
-            h, w = frame.shape[:2]
-            if w > 640:
-                scale = 640.0 / w
-                frame = cv2.resize(frame, (640, int(h * scale)))
-        except Exception:
-            pass
-
-        gray = None
-        try:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        except Exception:
-            pass
-
-        codes = []
-        try:
-            if gray is not None:
-                codes = zbar_decode(gray)
-            else:
-                codes = zbar_decode(frame)
-        except Exception:
-            codes = []
-
-        now = time.time()
-        for obj in codes:
-            try:
-                data = obj.data.decode("utf-8").strip()
-            except Exception:
-                continue
-            if not data:
-                continue
-            if data == self._last_code and (now - self._last_time) < self._interval:
-                continue
-            self._last_code = data
-            self._last_time = now
-            self.barcode_scanned.emit(data)
-            self.scan_status.emit(f"Detected: {data}", "#0ea5e9")
-
-        # Emit preview every 3rd frame only
-        self._frame_counter = (self._frame_counter + 1) % 3
-        if self._frame_counter == 0:
-            try:
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h2, w2, ch = rgb.shape
-                bytes_per_line = ch * w2
-                image = QImage(rgb.data, w2, h2, bytes_per_line, QImage.Format_RGB888)
-                self.frame_ready.emit(image.copy())
-            except Exception:
-                pass
-
-
 # ---------------- Dialogs ----------------
 
 class QuickAddProductDialog(QDialog):
@@ -1349,12 +1180,11 @@ class QuickAddProductDialog(QDialog):
             buy_price = float(self.buy_price_input.text() or 0)
             sell_price = float(self.sell_price_input.text() or 0)
             quantity = int(self.quantity_input.text() or 0)
-            cursor = self.parent.parent.conn.cursor()
-            cursor.execute('''
-                INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category, created_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (name, self.code_input.text().strip(), buy_price, sell_price, quantity, 'General', datetime.now().isoformat()))
-            self.parent.parent.conn.commit()
+            with MySQLConnectionManager() as (cursor, conn):
+                cursor.execute('''
+                    INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category, created_date)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ''', (name, self.code_input.text().strip() or None, buy_price, sell_price, quantity, 'General', datetime.now()))
             QMessageBox.information(self, "Success", "Product added successfully!")
             self.accept()
         except ValueError:
@@ -1412,12 +1242,11 @@ class AddProductDialog(QDialog):
             buy_price = float(self.buy_price_input.text() or 0)
             sell_price = float(self.sell_price_input.text() or 0)
             quantity = int(self.quantity_input.text() or 0)
-            cursor = self.parent.parent.conn.cursor()
-            cursor.execute('''
-                INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category, created_date)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', (name, self.code_input.text().strip(), buy_price, sell_price, quantity, 'General', datetime.now()))
-            self.parent.parent.conn.commit()
+            with MySQLConnectionManager() as (cursor, conn):
+                cursor.execute('''
+                    INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category, created_date)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ''', (name, self.code_input.text().strip() or None, buy_price, sell_price, quantity, 'General', datetime.now()))
             QMessageBox.information(self, "Success", "Product added successfully!")
             self.accept()
         except ValueError:
@@ -1472,21 +1301,20 @@ class AddCustomerDialog(QDialog):
             QMessageBox.warning(self, "Error", "Customer name is required")
             return
         try:
-            cursor = self.parent.parent.conn.cursor()
-            cursor.execute(
-                '''
-                INSERT INTO customers (name, phone, email, address, created_date)
-                VALUES (%s, %s, %s, %s, %s)
-                ''',
-                (
-                    name,
-                    self.phone_input.text().strip(),
-                    self.email_input.text().strip(),
-                    self.address_input.toPlainText().strip(),
-                    datetime.now()
+            with MySQLConnectionManager() as (cursor, conn):
+                cursor.execute(
+                    '''
+                    INSERT INTO customers (name, phone, email, address, created_date)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ''',
+                    (
+                        name,
+                        self.phone_input.text().strip(),
+                        self.email_input.text().strip(),
+                        self.address_input.toPlainText().strip(),
+                        datetime.now()
+                    )
                 )
-            )
-            self.parent.parent.conn.commit()
             QMessageBox.information(self, "Success", "Customer added successfully!")
             self.accept()
         except Exception as e:
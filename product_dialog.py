@@ -2,7 +2,7 @@ from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 import mysql.connector
-from mysql_config import get_mysql_connection
+from mysql_config import MySQLConnectionManager
 
 class ProductDialog(QDialog):
     def __init__(self, parent, title, product=None):
@@ -115,7 +115,7 @@ class ProductDialog(QDialog):
     def save_product(self):
         try:
             name = self.name_input.text().strip()
-            code_bar = self.code_bar_input.text().strip()
+            code_bar = self.code_bar_input.text().strip() or None
             price_buy = float(self.price_buy_input.text() or 0)
             price_sell = float(self.price_sell_input.text() or 0)
             quantity = int(self.quantity_input.text() or 0)
@@ -125,24 +125,19 @@ class ProductDialog(QDialog):
                 QMessageBox.warning(self, "Erreur", "Le nom du produit est requis!")
                 return
             
-            conn = get_mysql_connection()
-            cursor = conn.cursor()
+            with MySQLConnectionManager() as (cursor, conn):
+                if self.product:  # Edit existing product
+                    cursor.execute('''
+                        UPDATE products 
+                        SET name=%s, code_bar=%s, price_buy=%s, price_sell=%s, quantity=%s, category=%s
+                        WHERE id=%s
+                    ''', (name, code_bar, price_buy, price_sell, quantity, category, self.product[0]))
+                else:  # Add new product
+                    cursor.execute('''
+                        INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    ''', (name, code_bar, price_buy, price_sell, quantity, category))
             
-            if self.product:  # Edit existing product
-                cursor.execute('''
-                    UPDATE products 
-                    SET name=%s, code_bar=%s, price_buy=%s, price_sell=%s, quantity=%s, category=%s
-                    WHERE id=%s
-                ''', (name, code_bar, price_buy, price_sell, quantity, category, self.product[0]))
-            else:  # Add new product
-                cursor.execute('''
-                    INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (name, code_bar, price_buy, price_sell, quantity, category))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
             self.accept()
             
         except ValueError:
@@ -2,17 +2,29 @@ import sys
 from datetime import datetime
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QPushButton, QTableView, QHeaderView,
                              QComboBox, QDialog, QFormLayout, QMessageBox, QAbstractItemView)
-from PyQt5.QtGui import QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QTimer
 import mysql.connector
-from mysql_config import get_mysql_connection
+from mysql_config import MySQLConnectionManager
+from product_table_model import ProductTableModel, ACTIONS_COLUMN, ACTION_BUTTONS, fetch_categories
+from query_worker import QueryRunner
+from action_delegate import ActionButtonsDelegate
+from sales_ledger import detach_product
+from theme import set_style
 
 class ProductManagementWidget(QWidget):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        self.queries = QueryRunner(self)
+        
+        # Debounce search keystrokes into one query
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(200)
+        self._filter_timer.timeout.connect(self.apply_filter)
+        
         self.init_ui()
         self.load_products()
     
@@ -81,9 +93,14 @@ class ProductManagementWidget(QWidget):
         """)
         refresh_btn.clicked.connect(self.load_products)
         
+        unknown_btn = set_style(QPushButton("⚠ Unknown Barcodes"), 'nav', 'amber')
+        unknown_btn.setToolTip("Scanned codes that matched no product")
+        unknown_btn.clicked.connect(self.parent.show_unknown_barcodes)
+        
         header_layout.addWidget(back_btn)
         header_layout.addWidget(title_label)
         header_layout.addStretch()
+        header_layout.addWidget(unknown_btn)
         header_layout.addWidget(add_btn)
         header_layout.addWidget(refresh_btn)
         
@@ -126,51 +143,63 @@ class ProductManagementWidget(QWidget):
                 border-color: #4285f4;
             }
         """)
-        self.category_combo.currentTextChanged.connect(self.filter_products)
+        self.category_combo.currentTextChanged.connect(self.apply_filter)
         
         filter_layout.addWidget(search_label)
         filter_layout.addWidget(self.search_input)
         filter_layout.addWidget(category_label)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size: 14px; color: #6c757d;")
+        
         filter_layout.addWidget(self.category_combo)
         filter_layout.addStretch()
+        filter_layout.addWidget(self.status_label)
         
         # Products table
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(8)
-        self.products_table.setHorizontalHeaderLabels([
-            "Name", "Barcode", "Category", "Buy Price", "Sell Price", "Stock", "Status", "Actions"
-        ])
-        
-        # Set column widths
+        self.products_model = ProductTableModel(self.queries, self)
+        self.products_model.status_changed.connect(self.update_status)
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_model)
+
+        self.actions_delegate = ActionButtonsDelegate(ACTION_BUTTONS, self.products_table)
+        self.actions_delegate.clicked.connect(self.on_action_clicked)
+        self.products_table.setItemDelegateForColumn(ACTIONS_COLUMN, self.actions_delegate)
+        self.products_table.setMouseTracking(True)
+        self.products_table.doubleClicked.connect(
+            lambda index: self.edit_product(self.products_model.product(index.row())))
+
+        # Fixed column and row sizes: the view never measures rows it has not shown
         header = self.products_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setSectionResizeMode(0, QHeaderView.Stretch)
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(5, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(6, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(7, QHeaderView.ResizeToContents)
-        
+        for column, width in enumerate((0, 140, 120, 100, 100, 80, 110, 150)):
+            if width:
+                self.products_table.setColumnWidth(column, width)
+        rows = self.products_table.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(44)
+        rows.hide()
+
         self.products_table.setAlternatingRowColors(True)
         self.products_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.products_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.products_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: white;
                 border: 1px solid #dee2e6;
                 border-radius: 8px;
                 gridline-color: #f1f3f4;
                 font-size: 13px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px 8px;
                 border-bottom: 1px solid #f8f9fa;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background: #e3f2fd;
                 color: #1976d2;
             }
-            QTableWidget::item:alternate {
+            QTableView::item:alternate {
                 background: #f8f9fa;
             }
             QHeaderView::section {
@@ -189,271 +218,62 @@ class ProductManagementWidget(QWidget):
         self.setLayout(main_layout)
     
     def load_categories(self):
-        """Load categories into combo box"""
+        """Load categories into the combo box in the background"""
+        self.queries.submit('categories', fetch_categories, self.set_categories,
+                            on_error=lambda message: print(f"Error loading categories: {message}"))
+    
+    def set_categories(self, categories):
+        """Fill the combo box, keeping the current selection"""
+        selected = self.category_combo.currentText()
+        self.category_combo.blockSignals(True)
         self.category_combo.clear()
         self.category_combo.addItem("All Categories")
-        
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT category FROM products WHERE category IS NOT NULL ORDER BY category')
-        categories = cursor.fetchall()
-        
-        for category in categories:
-            if category[0]:
-                self.category_combo.addItem(category[0])
-        
-        cursor.close()
-        conn.close()
+        self.category_combo.addItems(categories)
+        index = self.category_combo.findText(selected)
+        self.category_combo.setCurrentIndex(max(index, 0))
+        self.category_combo.blockSignals(False)
+        # The selected category is gone: show every category again
+        if index < 0 and selected not in ("", "All Categories"):
+            self.apply_filter()
+    
+    def update_status(self):
+        """Loaded product counter next to the filter"""
+        model = self.products_model
+        self.status_label.setToolTip(model.error or "")
+        if model.error:
+            self.status_label.setText("Failed to load products")
+        elif model.loading:
+            self.status_label.setText("Loading…")
+        else:
+            self.status_label.setText(f"Showing {model.rowCount():,} products")
     
     def load_products(self):
-        """Load products into table"""
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM products ORDER BY name')
-        products = cursor.fetchall()
-        
-        self.products_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            # Name
-            name_item = QTableWidgetItem(product[1])
-            self.products_table.setItem(row, 0, name_item)
-            
-            # Barcode
-            barcode_item = QTableWidgetItem(product[2] or "")
-            self.products_table.setItem(row, 1, barcode_item)
-            
-            # Category
-            category_item = QTableWidgetItem(product[6] or "General")
-            self.products_table.setItem(row, 2, category_item)
-            
-            # Buy Price
-            buy_price_item = QTableWidgetItem(f"{product[3]:.2f}")
-            buy_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.products_table.setItem(row, 3, buy_price_item)
-            
-            # Sell Price
-            sell_price_item = QTableWidgetItem(f"{product[4]:.2f}")
-            sell_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.products_table.setItem(row, 4, sell_price_item)
-            
-            # Stock
-            stock_item = QTableWidgetItem(str(product[5]))
-            stock_item.setTextAlignment(Qt.AlignCenter)
-            
-            # Color code stock levels
-            if product[5] <= 0:
-                stock_item.setBackground(QColor(248, 215, 218))
-                stock_item.setForeground(QColor(220, 53, 69))
-            elif product[5] < 10:
-                stock_item.setBackground(QColor(255, 243, 205))
-                stock_item.setForeground(QColor(255, 193, 7))
-            else:
-                stock_item.setBackground(QColor(212, 237, 218))
-                stock_item.setForeground(QColor(40, 167, 69))
-            
-            self.products_table.setItem(row, 5, stock_item)
-            
-            # Status
-            if product[5] <= 0:
-                status = "Out of Stock"
-                status_color = QColor(220, 53, 69)
-            elif product[5] < 10:
-                status = "Low Stock"
-                status_color = QColor(255, 193, 7)
-            else:
-                status = "In Stock"
-                status_color = QColor(40, 167, 69)
-            
-            status_item = QTableWidgetItem(status)
-            status_item.setTextAlignment(Qt.AlignCenter)
-            status_item.setForeground(status_color)
-            self.products_table.setItem(row, 6, status_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout()
-            actions_layout.setContentsMargins(5, 5, 5, 5)
-            
-            edit_btn = QPushButton("Edit")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background: #17a2b8;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #138496;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, p=product: self.edit_product(p))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #dc3545;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #c82333;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, p=product: self.delete_product(p))
-            
-            actions_layout.addWidget(edit_btn)
-            actions_layout.addWidget(delete_btn)
-            actions_widget.setLayout(actions_layout)
-            
-            self.products_table.setCellWidget(row, 7, actions_widget)
-        
-        cursor.close()
-        conn.close()
-        
-        # Load categories after loading products
+        """Reload categories and the product table"""
         self.load_categories()
+        self.apply_filter()
+    
+    def screen_shown(self, hidden_for):
+        """Back on screen: stock moved with every sale, so refresh the rows shown"""
+        self.products_model.reload()
     
     def filter_products(self):
-        """Filter products based on search and category"""
-        search_term = self.search_input.text().lower()
+        """Filter products based on search and category, once typing pauses"""
+        self._filter_timer.start()
+    
+    def apply_filter(self):
+        """Point the product model at the current search and category"""
+        self._filter_timer.stop()
         selected_category = self.category_combo.currentText()
-        
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        
-        if selected_category == "All Categories":
-            if search_term:
-                cursor.execute('''
-                    SELECT * FROM products 
-                    WHERE LOWER(name) LIKE %s OR LOWER(code_bar) LIKE %s OR LOWER(category) LIKE %s
-                    ORDER BY name
-                ''', (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            else:
-                cursor.execute('SELECT * FROM products ORDER BY name')
+        category = None if selected_category in ("", "All Categories") else selected_category
+        self.products_model.set_filter(self.search_input.text(), category)
+    
+    def on_action_clicked(self, row, button):
+        """Edit (0) or Delete (1) button of a product row"""
+        product = self.products_model.product(row)
+        if button == 0:
+            self.edit_product(product)
         else:
-            if search_term:
-                cursor.execute('''
-                    SELECT * FROM products 
-                    WHERE category = %s AND (LOWER(name) LIKE %s OR LOWER(code_bar) LIKE %s)
-                    ORDER BY name
-                ''', (selected_category, f'%{search_term}%', f'%{search_term}%'))
-            else:
-                cursor.execute('SELECT * FROM products WHERE category = %s ORDER BY name', (selected_category,))
-        
-        products = cursor.fetchall()
-        self.products_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            # Name
-            name_item = QTableWidgetItem(product[1])
-            self.products_table.setItem(row, 0, name_item)
-            
-            # Barcode
-            barcode_item = QTableWidgetItem(product[2] or "")
-            self.products_table.setItem(row, 1, barcode_item)
-            
-            # Category
-            category_item = QTableWidgetItem(product[6] or "General")
-            self.products_table.setItem(row, 2, category_item)
-            
-            # Buy Price
-            buy_price_item = QTableWidgetItem(f"{product[3]:.2f}")
-            buy_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.products_table.setItem(row, 3, buy_price_item)
-            
-            # Sell Price
-            sell_price_item = QTableWidgetItem(f"{product[4]:.2f}")
-            sell_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.products_table.setItem(row, 4, sell_price_item)
-            
-            # Stock
-            stock_item = QTableWidgetItem(str(product[5]))
-            stock_item.setTextAlignment(Qt.AlignCenter)
-            
-            # Color code stock levels
-            if product[5] <= 0:
-                stock_item.setBackground(QColor(248, 215, 218))
-                stock_item.setForeground(QColor(220, 53, 69))
-            elif product[5] < 10:
-                stock_item.setBackground(QColor(255, 243, 205))
-                stock_item.setForeground(QColor(255, 193, 7))
-            else:
-                stock_item.setBackground(QColor(212, 237, 218))
-                stock_item.setForeground(QColor(40, 167, 69))
-            
-            self.products_table.setItem(row, 5, stock_item)
-            
-            # Status
-            if product[5] <= 0:
-                status = "Out of Stock"
-                status_color = QColor(220, 53, 69)
-            elif product[5] < 10:
-                status = "Low Stock"
-                status_color = QColor(255, 193, 7)
-            else:
-                status = "In Stock"
-                status_color = QColor(40, 167, 69)
-            
-            status_item = QTableWidgetItem(status)
-            status_item.setTextAlignment(Qt.AlignCenter)
-            status_item.setForeground(status_color)
-            self.products_table.setItem(row, 6, status_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout()
-            actions_layout.setContentsMargins(5, 5, 5, 5)
-            
-            edit_btn = QPushButton("Edit")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background: #17a2b8;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #138496;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, p=product: self.edit_product(p))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #dc3545;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #c82333;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, p=product: self.delete_product(p))
-            
-            actions_layout.addWidget(edit_btn)
-            actions_layout.addWidget(delete_btn)
-            actions_widget.setLayout(actions_layout)
-            
-            self.products_table.setCellWidget(row, 7, actions_widget)
-        
-        cursor.close()
-        conn.close()
+            self.delete_product(product)
     
     def add_product(self):
         """Add new product"""
@@ -474,12 +294,9 @@ class ProductManagementWidget(QWidget):
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                conn = get_mysql_connection()
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM products WHERE id = %s', (product[0],))
-                conn.commit()
-                cursor.close()
-                conn.close()
+                with MySQLConnectionManager() as (cursor, conn):
+                    detach_product(cursor, product[0])
+                    cursor.execute('DELETE FROM products WHERE id = %s', (product[0],))
                 QMessageBox.information(self, "Success", "Product deleted successfully!")
                 self.load_products()
             except Exception as e:
@@ -587,29 +404,24 @@ class ProductDialog(QDialog):
             sell_price = float(sell_price_text)
             quantity = int(self.quantity_input.text() or 0)
             
-            conn = get_mysql_connection()
-            cursor = conn.cursor()
-            
-            if self.product:  # Edit existing product
-                cursor.execute('''
-                    UPDATE products 
-                    SET name = %s, code_bar = %s, price_buy = %s, price_sell = %s, 
-                        quantity = %s, category = %s
-                    WHERE id = %s
-                ''', (name, self.barcode_input.text().strip(), buy_price, sell_price, 
-                      quantity, self.category_input.text().strip(), self.product[0]))
-                message = "Product updated successfully!"
-            else:  # Add new product
-                cursor.execute('''
-                    INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (name, self.barcode_input.text().strip(), buy_price, sell_price, 
-                      quantity, self.category_input.text().strip()))
-                message = "Product added successfully!"
+            with MySQLConnectionManager() as (cursor, conn):
+                if self.product:  # Edit existing product
+                    cursor.execute('''
+                        UPDATE products 
+                        SET name = %s, code_bar = %s, price_buy = %s, price_sell = %s, 
+                            quantity = %s, category = %s
+                        WHERE id = %s
+                    ''', (name, self.barcode_input.text().strip() or None, buy_price, sell_price, 
+                          quantity, self.category_input.text().strip(), self.product[0]))
+                    message = "Product updated successfully!"
+                else:  # Add new product
+                    cursor.execute('''
+                        INSERT INTO products (name, code_bar, price_buy, price_sell, quantity, category)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    ''', (name, self.barcode_input.text().strip() or None, buy_price, sell_price, 
+                          quantity, self.category_input.text().strip()))
+                    message = "Product added successfully!"
             
-            conn.commit()
-            cursor.close()
-            conn.close()
             QMessageBox.information(self, "Success", message)
             self.accept()
             
@@ -0,0 +1,262 @@
+"""
+In-process product search for the POS product panel.
+
+Name, barcode and category are normalized (case, Latin accents, Arabic
+diacritics, tatweel and letter variants, Arabic-Indic digits) and indexed
+two ways:
+
+- a prefix index: the sorted table of distinct tokens, where every token
+  starting with a prefix is one bisect range (a flattened trie);
+- a trigram index over the distinct tokens for matches inside a word or
+  barcode (3+ characters).
+
+Results come in ranked tiers -- exact barcode, name starting with the query,
+every term starting a word, every term anywhere -- and later tiers are only
+computed when the earlier ones did not fill the limit. Substring matches
+are narrowed from the cached result of a shorter term while the user types.
+"""
+
+import bisect
+import functools
+import heapq
+import itertools
+import re
+import unicodedata
+
+SEARCH_LIMIT = 60
+DENSE_PREFIX_TOKENS = 2000   # wider prefix ranges are searched by scanning names in order
+
+_ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي',
+    'ـ': None,   # tatweel
+    **{chr(0x0660 + d): str(d) for d in range(10)},   # Arabic-Indic digits
+    **{chr(0x06F0 + d): str(d) for d in range(10)},   # Eastern Arabic-Indic digits
+})
+_TOKEN = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_word(word):
+    if word.isascii():
+        return word.casefold()
+    word = unicodedata.normalize('NFKD', word.translate(_ARABIC_LETTERS))
+    word = ''.join(ch for ch in word if not unicodedata.combining(ch))
+    return word.translate(_ARABIC_LETTERS).casefold()
+
+
+def normalize_text(text):
+    """Search form of a string: casefolded, without accents or Arabic diacritics"""
+    if not text:
+        return ''
+    # Catalog names reuse a small vocabulary, so words are normalized once each
+    return ' '.join(map(_normalize_word, str(text).split()))
+
+
+def tokenize(text):
+    return _TOKEN.findall(text)
+
+
+def trigrams(tokens):
+    """Trigrams inside each token (terms never span words)"""
+    return {token[i:i + 3] for token in tokens for i in range(len(token) - 2)}
+
+
+class ProductSearchIndex:
+    """Ranked product search over (id, name, code_bar, category) rows; results are product ids"""
+
+    def __init__(self, products=()):
+        self._docs = {}           # id -> (name, code, category, normalized name, tokens)
+        self._postings = {}       # token -> ids
+        self._grams = {}          # trigram -> distinct tokens containing it
+        self._by_code = {}        # normalized barcode -> ids
+        self._tokens = []         # sorted distinct tokens (the prefix index)
+        self._names = []          # sorted (normalized name, id)
+        self._order = {}          # id -> position in name order
+        self._dirty = False
+        self._substring_cache = {}
+        if products:
+            self.update(products)
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------------- Building ----------------
+
+    def update(self, products):
+        """Sync with the full product list; only new, renamed or deleted products are reindexed.
+
+        products are tuples in products-table order (id, name, code_bar, ...,
+        category at index 6) or (id, name, code_bar, category) rows.
+        """
+        seen = set()
+        for product in products:
+            product_id = product[0]
+            category = product[6] if len(product) > 6 else product[3] if len(product) > 3 else None
+            key = (product[1] or '', product[2] or '', category or '')
+            seen.add(product_id)
+            current = self._docs.get(product_id)
+            if current is not None and current[:3] == key:
+                continue
+            if current is not None:
+                self._remove(product_id)
+            self._add(product_id, key)
+        for product_id in [i for i in self._docs if i not in seen]:
+            self._remove(product_id)
+        if self._dirty:
+            self._rebuild_sorted()
+
+    def _add(self, product_id, key):
+        name, code, category = key
+        norm_name, norm_code, norm_category = (normalize_text(part) for part in key)
+        tokens = set(tokenize(f"{norm_name} {norm_code} {norm_category}"))
+        self._docs[product_id] = (name, code, category, norm_name, tokens)
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                for gram in trigrams([token]):
+                    self._grams.setdefault(gram, set()).add(token)
+            ids.add(product_id)
+        if norm_code:
+            self._by_code.setdefault(norm_code, set()).add(product_id)
+        self._dirty = True
+
+    def _remove(self, product_id):
+        name, code, category, norm_name, tokens = self._docs.pop(product_id)
+        for token in tokens:
+            self._discard(self._postings, token, product_id)
+            if token not in self._postings:
+                for gram in trigrams([token]):
+                    self._discard(self._grams, gram, token)
+        norm_code = normalize_text(code)
+        if norm_code:
+            self._discard(self._by_code, norm_code, product_id)
+        self._dirty = True
+
+    @staticmethod
+    def _discard(index, key, value):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    def _rebuild_sorted(self):
+        self._tokens = sorted(self._postings)
+        self._names = sorted((doc[3], product_id) for product_id, doc in self._docs.items())
+        self._order = {product_id: position for position, (_, product_id) in enumerate(self._names)}
+        self._substring_cache = {}
+        self._dirty = False
+
+    # ---------------- Matching ----------------
+
+    def _prefix_range(self, prefix):
+        start = bisect.bisect_left(self._tokens, prefix)
+        return start, bisect.bisect_left(self._tokens, prefix + '\U0010ffff', start)
+
+    def _prefix_ids(self, prefix):
+        """Products with a token starting with prefix"""
+        start, end = self._prefix_range(prefix)
+        if end - start == 1:
+            return self._postings[self._tokens[start]]
+        ids = set()
+        for token in self._tokens[start:end]:
+            ids |= self._postings[token]
+        return ids
+
+    def _substring_tokens(self, term):
+        """Distinct tokens containing term (3+ characters), narrowed from a cached shorter term"""
+        cached = self._substring_cache.get(term)
+        if cached is not None:
+            return cached
+        base = None
+        for previous, tokens in self._substring_cache.items():
+            if previous in term and (base is None or len(tokens) < len(base)):
+                base = tokens
+        if base is None:
+            postings = sorted((self._grams.get(gram, ()) for gram in trigrams([term])), key=len)
+            base = set(postings[0]).intersection(*postings[1:]) if postings[0] else set()
+        tokens = {token for token in base if term in token}
+        if len(self._substring_cache) >= 64:
+            self._substring_cache.pop(next(iter(self._substring_cache)))
+        self._substring_cache[term] = tokens
+        return tokens
+
+    def _substring_ids(self, term):
+        """Products with a word containing term"""
+        ids = set()
+        for token in self._substring_tokens(term):
+            ids |= self._postings[token]
+        return ids
+
+    def _scan_word_matches(self, terms, taken, wanted):
+        """First products in name order where every term starts one of their words"""
+        found = []
+        docs = self._docs
+        for _, product_id in self._names:
+            if product_id in taken:
+                continue
+            tokens = docs[product_id][4]
+            if all(any(token.startswith(term) for token in tokens) for term in terms):
+                found.append(product_id)
+                if len(found) >= wanted:
+                    break
+        return found
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Ids of the best matches for query, at most limit, best first"""
+        query = normalize_text(query).strip()
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        results, taken = [], set()
+
+        def take(ids, ranked=False):
+            wanted = limit - len(results)
+            fresh = [product_id for product_id in ids if product_id not in taken]
+            if not ranked:
+                fresh = heapq.nsmallest(wanted, fresh, key=self._order.__getitem__)
+            for product_id in fresh[:wanted]:
+                results.append(product_id)
+                taken.add(product_id)
+            return len(results) >= limit
+
+        # 1. Exact barcode
+        if take(sorted(self._by_code.get(query, ()), key=self._order.__getitem__), ranked=True):
+            return results
+
+        # 2. Name starts with the whole query, already in name order
+        start = bisect.bisect_left(self._names, (query,))
+        prefixed = []
+        for name, product_id in itertools.islice(self._names, start, None):
+            if not name.startswith(query) or len(prefixed) >= limit:
+                break
+            prefixed.append(product_id)
+        if take(prefixed, ranked=True):
+            return results
+
+        # 3. Every term starts a word of name, barcode or category
+        narrowest = min(terms, key=lambda term: len(range(*self._prefix_range(term))))
+        if len(range(*self._prefix_range(narrowest))) > DENSE_PREFIX_TOKENS:
+            # Matches are dense: walking names in order fills the page sooner than a union
+            if take(self._scan_word_matches(terms, taken, limit - len(results)), ranked=True):
+                return results
+        else:
+            word_sets = sorted((self._prefix_ids(term) for term in terms), key=len)
+            word_matches = set(word_sets[0]).intersection(*word_sets[1:]) if word_sets[0] else set()
+            if take(word_matches):
+                return results
+
+        # 4. Every term appears anywhere (inside words, middle of barcodes)
+        substring_sets = sorted((self._substring_ids(term) for term in terms if len(term) >= 3), key=len)
+        if substring_sets:
+            take(set(substring_sets[0]).intersection(*substring_sets[1:]))
+        return results
+
+
+def load_search_index(cursor):
+    """Build an index of the whole catalog (runs on a query worker)"""
+    cursor.execute('SELECT id, name, code_bar, category FROM products')
+    return ProductSearchIndex(cursor.fetchall())
@@ -0,0 +1,187 @@
+"""
+Product grid model.
+
+ProductTableModel pages products in (name, id) order with keyset queries:
+the view asks for more rows through canFetchMore/fetchMore as it scrolls,
+so a 20k-SKU catalog only materializes the pages that have been shown.
+Pages are fetched on the view's QueryRunner, one at a time, so scrolling
+never waits on MySQL.
+
+Rows are plain tuples in the column order of PRODUCT_COLUMNS, the same
+layout ProductDialog and delete_product expect.
+
+The Edit/Delete buttons of the last column are painted by an
+ActionButtonsDelegate instead of a QWidget with two QPushButtons per row.
+"""
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+
+from kpi_service import LOW_STOCK_THRESHOLD
+
+PRODUCT_COLUMNS = 'id, name, code_bar, price_buy, price_sell, quantity, category'
+HEADERS = ["Name", "Barcode", "Category", "Buy Price", "Sell Price", "Stock", "Status", "Actions"]
+ACTIONS_COLUMN = 7
+ACTION_BUTTONS = (("Edit", "#17a2b8", "#138496"), ("Delete", "#dc3545", "#c82333"))
+FETCH_BATCH = 200
+
+# (background, foreground) per stock level
+STOCK_COLORS = {
+    "Out of Stock": (QColor(248, 215, 218), QColor(220, 53, 69)),
+    "Low Stock": (QColor(255, 243, 205), QColor(255, 193, 7)),
+    "In Stock": (QColor(212, 237, 218), QColor(40, 167, 69)),
+}
+
+
+def stock_status(quantity):
+    if quantity <= 0:
+        return "Out of Stock"
+    if quantity < LOW_STOCK_THRESHOLD:
+        return "Low Stock"
+    return "In Stock"
+
+
+def fetch_categories(cursor):
+    """Category names for the filter, in order"""
+    cursor.execute('SELECT DISTINCT category FROM products WHERE category IS NOT NULL ORDER BY category')
+    return [row[0] for row in cursor.fetchall() if row[0]]
+
+
+def fetch_product_page(cursor, search='', category=None, after=None, limit=FETCH_BATCH):
+    """Next page of products after the (name, id) key, filtered like the search bar"""
+    conditions, params = [], []
+    if category:
+        conditions.append('category = %s')
+        params.append(category)
+    if search:
+        pattern = f'%{search.lower()}%'
+        if category:
+            conditions.append('(LOWER(name) LIKE %s OR LOWER(code_bar) LIKE %s)')
+            params += [pattern, pattern]
+        else:
+            conditions.append('(LOWER(name) LIKE %s OR LOWER(code_bar) LIKE %s OR LOWER(category) LIKE %s)')
+            params += [pattern, pattern, pattern]
+    if after:
+        conditions.append('(name > %s OR (name = %s AND id > %s))')
+        params += [after[0], after[0], after[1]]
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor.execute(f'''
+        SELECT {PRODUCT_COLUMNS} FROM products
+        {where}
+        ORDER BY name, id
+        LIMIT %s
+    ''', params + [limit])
+    return cursor.fetchall()
+
+
+class ProductTableModel(QAbstractTableModel):
+    """Products matching the current filter, fetched a page at a time in the background"""
+
+    # Emitted when the loaded row count or the loading state changes
+    status_changed = pyqtSignal()
+
+    def __init__(self, queries, parent=None):
+        super().__init__(parent)
+        self.queries = queries
+        self._rows = []
+        self._search = ''
+        self._category = None
+        self._exhausted = True
+        self._pending = False
+        self.error = None
+
+    def set_filter(self, search='', category=None):
+        """Drop the loaded rows and start over with a new filter"""
+        self.beginResetModel()
+        self._rows = []
+        self._search = search.strip()
+        self._category = category or None
+        self._exhausted = False
+        self._pending = False
+        self.error = None
+        self.endResetModel()
+        self.status_changed.emit()
+        # Load the first page eagerly so an empty result is visible at once
+        self.fetchMore(QModelIndex())
+
+    def reload(self):
+        self.set_filter(self._search, self._category)
+
+    def product(self, row):
+        return self._rows[row]
+
+    @property
+    def loading(self):
+        return self._pending
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._pending
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        after = (self._rows[-1][1], self._rows[-1][0]) if self._rows else None
+        self._pending = True
+        self.queries.submit('product_page', fetch_product_page, self._append_page,
+                            self._search, self._category, after, on_error=self._page_failed)
+        self.status_changed.emit()
+
+    def _append_page(self, page):
+        self._pending = False
+        if len(page) < FETCH_BATCH:
+            self._exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+        self.status_changed.emit()
+
+    def _page_failed(self, message):
+        self._pending = False
+        self._exhausted = True
+        self.error = message
+        self.status_changed.emit()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product_id, name, code_bar, price_buy, price_sell, quantity, category = self._rows[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return name
+            if column == 1:
+                return code_bar or ""
+            if column == 2:
+                return category or "General"
+            if column == 3:
+                return f"{price_buy:.2f}"
+            if column == 4:
+                return f"{price_sell:.2f}"
+            if column == 5:
+                return str(quantity)
+            if column == 6:
+                return stock_status(quantity)
+        elif role == Qt.TextAlignmentRole:
+            if column in (3, 4):
+                return Qt.AlignRight | Qt.AlignVCenter
+            if column in (5, 6):
+                return Qt.AlignCenter
+        elif role == Qt.BackgroundRole and column == 5:
+            return QBrush(STOCK_COLORS[stock_status(quantity)][0])
+        elif role == Qt.ForegroundRole and column in (5, 6):
+            return QBrush(STOCK_COLORS[stock_status(quantity)][1])
+        return None
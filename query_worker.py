@@ -0,0 +1,131 @@
+"""
+Background query execution.
+
+A view hands a function `fn(cursor, *args)` to its QueryRunner. The function
+runs on a QThreadPool worker with a pooled connection of its own and the
+result is delivered to a callback on the GUI thread through a queued
+signal. Submitting again under the same key (or calling cancel()) retires
+the older request: it is skipped if it has not started yet and its result
+is dropped if it has, so a stale query never overwrites a newer view.
+"""
+
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from mysql_config import MySQLConnectionManager, get_connection_pool
+
+_thread_pool = None
+
+
+def query_thread_pool():
+    """Thread pool for query workers, sized to leave one connection for the GUI thread"""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(max(1, get_connection_pool().size - 1))
+    return _thread_pool
+
+
+class WorkerSignals(QObject):
+    result = pyqtSignal(int, object)
+    error = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+
+class QueryWorker(QRunnable):
+    """Runs fn(cursor, *args, **kwargs) on a pooled connection"""
+
+    def __init__(self, ticket, fn, args, kwargs):
+        super().__init__()
+        self.ticket = ticket
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            with MySQLConnectionManager() as (cursor, conn):
+                result = self.fn(cursor, *self.args, **self.kwargs)
+            if not self.cancelled:
+                self.signals.result.emit(self.ticket, result)
+        except Exception as e:
+            if not self.cancelled:
+                print(f"Background query failed: {e}")
+                print(traceback.format_exc())
+                self.signals.error.emit(self.ticket, str(e))
+        finally:
+            self.signals.finished.emit(self.ticket)
+
+
+class QueryRunner(QObject):
+    """Per-view dispatcher of background queries keyed by what they load"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._next_ticket = 0
+        self._workers = {}   # ticket -> (key, worker, on_result, on_error)
+        self._latest = {}    # key -> ticket of the request still wanted
+
+    def submit(self, key, fn, on_result, *args, on_error=None, **kwargs):
+        """Run fn(cursor, *args, **kwargs) in the background; on_result(result) on the GUI thread"""
+        self.cancel(key)
+        self._next_ticket += 1
+        ticket = self._next_ticket
+
+        worker = QueryWorker(ticket, fn, args, kwargs)
+        worker.signals.result.connect(self._deliver_result)
+        worker.signals.error.connect(self._deliver_error)
+        worker.signals.finished.connect(self._forget)
+        self._workers[ticket] = (key, worker, on_result, on_error)
+        self._latest[key] = ticket
+        query_thread_pool().start(worker)
+        return ticket
+
+    def cancel(self, key=None):
+        """Retire the pending request for key, or every pending request"""
+        keys = list(self._latest) if key is None else [key]
+        for k in keys:
+            ticket = self._latest.pop(k, None)
+            entry = self._workers.get(ticket)
+            if entry is not None:
+                entry[1].cancel()
+
+    def is_busy(self, key=None):
+        return bool(self._latest) if key is None else key in self._latest
+
+    def _take(self, ticket):
+        """Entry for a ticket if it is still the wanted request for its key"""
+        entry = self._workers.get(ticket)
+        if entry is None or self._latest.get(entry[0]) != ticket:
+            return None
+        del self._latest[entry[0]]
+        return entry
+
+    @pyqtSlot(int, object)
+    def _deliver_result(self, ticket, result):
+        entry = self._take(ticket)
+        if entry is not None:
+            entry[2](result)
+
+    @pyqtSlot(int, str)
+    def _deliver_error(self, ticket, message):
+        entry = self._take(ticket)
+        if entry is not None and entry[3] is not None:
+            entry[3](message)
+
+    @pyqtSlot(int)
+    def _forget(self, ticket):
+        self._workers.pop(ticket, None)
@@ -4,14 +4,44 @@ from PyQt5.QtGui import *
 from datetime import datetime, timedelta
 import json
 import sqlite3
+from date_ranges import custom_range
+from sales_series import sales_series, series_totals
+from query_worker import QueryRunner
+from theme import set_style
 import csv
 import os
+import time
+
+# Tab order of the report sections
+REPORT_SECTIONS = ['sales_summary', 'product_performance', 'customer_analysis', 'financial_report']
+
+SECTION_CARDS = {
+    'sales_summary': ['total_sales_card', 'total_transactions_card', 'avg_transaction_card',
+                      'items_sold_card'],
+    'product_performance': ['top_product_card', 'total_products_card', 'avg_profit_card',
+                            'low_stock_card'],
+    'customer_analysis': ['total_customers_card', 'new_customers_card', 'avg_customer_value_card',
+                          'repeat_customers_card'],
+    'financial_report': ['gross_revenue_card', 'total_cost_card', 'gross_profit_card',
+                         'profit_margin_card'],
+}
 
 
 class ReportsWidget(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self.queries = QueryRunner(self)
+        self._period = None
+        self._opened = set()      # sections the user has looked at
+        self._loaded = set()      # sections filled for the current range
+        self._load_started = {}
+        self._after_load = None   # (sections, callback, on_error) waiting on loads
+        self.last_load_ms = {}
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(150)
+        self._reload_timer.timeout.connect(self.load_data)
         self.init_ui()
         self.load_data()
     
@@ -30,6 +60,7 @@ class ReportsWidget(QWidget):
         
         # Main content with tabs
         tab_widget = QTabWidget()
+        self.tab_widget = tab_widget
         tab_widget.setStyleSheet("""
         QTabWidget::pane {
             border: 1px solid #e0e0e0;
@@ -58,6 +89,7 @@ class ReportsWidget(QWidget):
         tab_widget.addTab(self.create_product_performance_tab(), "📦 Product Performance")
         tab_widget.addTab(self.create_customer_analysis_tab(), "👥 Customer Analysis")
         tab_widget.addTab(self.create_financial_report_tab(), "💰 Financial Report")
+        tab_widget.currentChanged.connect(self.on_tab_changed)
         
         main_layout.addWidget(tab_widget)
         
@@ -122,17 +154,10 @@ class ReportsWidget(QWidget):
     
     def create_date_range_selector(self):
         """Create date range selection widget"""
-        widget = QWidget()
-        widget.setStyleSheet("""
-            QWidget {
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                padding: 15px;
-            }
-        """)
+        widget = set_style(QWidget(), 'panel')
         
         layout = QHBoxLayout()
+        layout.setContentsMargins(15, 15, 15, 15)
         
         # Date range label
         range_label = QLabel("Report Period:")
@@ -153,7 +178,7 @@ class ReportsWidget(QWidget):
                 min-width: 120px;
             }
         """)
-        self.from_date.dateChanged.connect(self.load_data)
+        self.from_date.dateChanged.connect(self.schedule_reload)
         
         # To date
         to_label = QLabel("To:")
@@ -163,7 +188,7 @@ class ReportsWidget(QWidget):
         self.to_date.setCalendarPopup(True)
         self.to_date.setDate(QDate.currentDate())
         self.to_date.setStyleSheet(self.from_date.styleSheet())
-        self.to_date.dateChanged.connect(self.load_data)
+        self.to_date.dateChanged.connect(self.schedule_reload)
         
         # Quick select buttons
         quick_btns_layout = QHBoxLayout()
@@ -175,21 +200,7 @@ class ReportsWidget(QWidget):
         ]
         
         for btn_text, days in quick_buttons:
-            btn = QPushButton(btn_text)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background: #f8f9fa;
-                    color: #495057;
-                    border: 1px solid #dee2e6;
-                    border-radius: 4px;
-                    padding: 6px 12px;
-                    font-size: 12px;
-                    margin-left: 5px;
-                }
-                QPushButton:hover {
-                    background: #e9ecef;
-                }
-            """)
+            btn = set_style(QPushButton(btn_text), 'chip')
             btn.clicked.connect(lambda checked, d=days: self.set_quick_date_range(d))
             quick_btns_layout.addWidget(btn)
         
@@ -227,10 +238,10 @@ class ReportsWidget(QWidget):
         # KPI Cards
         kpi_layout = QHBoxLayout()
         
-        self.total_sales_card = self.create_kpi_card("Total Sales", "0.00 DA", "#28a745", "💰")
-        self.total_transactions_card = self.create_kpi_card("Transactions", "0", "#17a2b8", "🧾")
-        self.avg_transaction_card = self.create_kpi_card("Avg Transaction", "0.00 DA", "#ffc107", "📊")
-        self.items_sold_card = self.create_kpi_card("Items Sold", "0", "#6f42c1", "📦")
+        self.total_sales_card = self.create_kpi_card("Total Sales", "0.00 DA", "green", "💰")
+        self.total_transactions_card = self.create_kpi_card("Transactions", "0", "sky", "🧾")
+        self.avg_transaction_card = self.create_kpi_card("Avg Transaction", "0.00 DA", "yellow", "📊")
+        self.items_sold_card = self.create_kpi_card("Items Sold", "0", "violet", "📦")
         
         kpi_layout.addWidget(self.total_sales_card)
         kpi_layout.addWidget(self.total_transactions_card)
@@ -303,10 +314,10 @@ class ReportsWidget(QWidget):
         # Product KPIs
         product_kpi_layout = QHBoxLayout()
         
-        self.top_product_card = self.create_kpi_card("Top Product", "Loading...", "#e74c3c", "🏆")
-        self.total_products_card = self.create_kpi_card("Products Sold", "0", "#fd7e14", "📦")
-        self.avg_profit_card = self.create_kpi_card("Avg Profit", "0.00 DA", "#20c997", "💹")
-        self.low_stock_card = self.create_kpi_card("Low Stock Items", "0", "#dc3545", "⚠️")
+        self.top_product_card = self.create_kpi_card("Top Product", "Loading...", "red", "🏆")
+        self.total_products_card = self.create_kpi_card("Products Sold", "0", "orange", "📦")
+        self.avg_profit_card = self.create_kpi_card("Avg Profit", "0.00 DA", "teal", "💹")
+        self.low_stock_card = self.create_kpi_card("Low Stock Items", "0", "red", "⚠️")
         
         product_kpi_layout.addWidget(self.top_product_card)
         product_kpi_layout.addWidget(self.total_products_card)
@@ -376,10 +387,10 @@ class ReportsWidget(QWidget):
         # Customer KPIs
         customer_kpi_layout = QHBoxLayout()
         
-        self.total_customers_card = self.create_kpi_card("Total Customers", "0", "#6f42c1", "👥")
-        self.new_customers_card = self.create_kpi_card("New Customers", "0", "#28a745", "🆕")
-        self.avg_customer_value_card = self.create_kpi_card("Avg Customer Value", "0.00 DA", "#fd7e14", "💎")
-        self.repeat_customers_card = self.create_kpi_card("Repeat Customers", "0%", "#17a2b8", "🔄")
+        self.total_customers_card = self.create_kpi_card("Total Customers", "0", "violet", "👥")
+        self.new_customers_card = self.create_kpi_card("New Customers", "0", "green", "🆕")
+        self.avg_customer_value_card = self.create_kpi_card("Avg Customer Value", "0.00 DA", "orange", "💎")
+        self.repeat_customers_card = self.create_kpi_card("Repeat Customers", "0%", "sky", "🔄")
         
         customer_kpi_layout.addWidget(self.total_customers_card)
         customer_kpi_layout.addWidget(self.new_customers_card)
@@ -449,10 +460,10 @@ class ReportsWidget(QWidget):
         # Financial KPIs
         financial_kpi_layout = QHBoxLayout()
         
-        self.gross_revenue_card = self.create_kpi_card("Gross Revenue", "0.00 DA", "#28a745", "💰")
-        self.total_cost_card = self.create_kpi_card("Total Cost", "0.00 DA", "#dc3545", "💸")
-        self.gross_profit_card = self.create_kpi_card("Gross Profit", "0.00 DA", "#20c997", "📈")
-        self.profit_margin_card = self.create_kpi_card("Profit Margin", "0%", "#6f42c1", "📊")
+        self.gross_revenue_card = self.create_kpi_card("Gross Revenue", "0.00 DA", "green", "💰")
+        self.total_cost_card = self.create_kpi_card("Total Cost", "0.00 DA", "red", "💸")
+        self.gross_profit_card = self.create_kpi_card("Gross Profit", "0.00 DA", "teal", "📈")
+        self.profit_margin_card = self.create_kpi_card("Profit Margin", "0%", "violet", "📊")
         
         financial_kpi_layout.addWidget(self.gross_revenue_card)
         financial_kpi_layout.addWidget(self.total_cost_card)
@@ -519,54 +530,29 @@ class ReportsWidget(QWidget):
         widget.setLayout(layout)
         return widget
     
-    def create_kpi_card(self, title, value, color, icon):
-        """Create a KPI card widget"""
+    def create_kpi_card(self, title, value, tone, icon):
+        """Create a KPI card widget (tone: one of theme.TONES)"""
         card = QFrame()
         card.setFrameShape(QFrame.StyledPanel)
-        card.setStyleSheet(f"""
-            QFrame {{
-                background: white;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-                border-left: 4px solid {color};
-                padding: 15px;
-            }}
-        """)
+        set_style(card, 'card', tone)
         card.setFixedHeight(120)
         
         layout = QVBoxLayout(card)
-        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(5)
         
         # Header with icon and title
         header_layout = QHBoxLayout()
         
-        icon_label = QLabel(icon)
-        icon_label.setStyleSheet(f"""
-            font-size: 24px;
-            color: {color};
-        """)
-        
-        title_label = QLabel(title)
-        title_label.setStyleSheet("""
-            font-size: 12px;
-            font-weight: 600;
-            color: #6c757d;
-            text-transform: uppercase;
-        """)
+        icon_label = set_style(QLabel(icon), 'card-icon', tone)
+        title_label = set_style(QLabel(title.upper()), 'card-title')
         
         header_layout.addWidget(icon_label)
         header_layout.addWidget(title_label)
         header_layout.addStretch()
         
         # Value
-        value_label = QLabel(value)
-        value_label.setStyleSheet(f"""
-            font-size: 24px;
-            font-weight: 700;
-            color: {color};
-            margin: 10px 0;
-        """)
+        value_label = set_style(QLabel(value), 'card-value', tone)
         value_label.setAlignment(Qt.AlignCenter)
         
         layout.addLayout(header_layout)
@@ -676,369 +662,422 @@ class ReportsWidget(QWidget):
         
         return layout
     
+    def screen_shown(self, hidden_for):
+        """Back on screen: sales recorded meanwhile make a range ending today stale"""
+        if hidden_for >= 60:
+            self.load_data()
+
+    def schedule_reload(self):
+        """Coalesce bursts of date changes (quick ranges set both ends) into one reload"""
+        self._reload_timer.start()
+
     def load_data(self):
-        """Load all report data"""
-        try:
-            from_date = self.from_date.date().toString("yyyy-MM-dd")
-            to_date = self.to_date.date().toString("yyyy-MM-dd")
-            
-            self.load_sales_summary_data(from_date, to_date)
-            self.load_product_performance_data(from_date, to_date)
-            self.load_customer_analysis_data(from_date, to_date)
-            self.load_financial_report_data(from_date, to_date)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load report data: {str(e)}")
-    
-    def load_sales_summary_data(self, from_date, to_date):
-        """Load sales summary data"""
+        """Reload the opened report tabs for the selected range; the others load when opened"""
+        self._period = custom_range(self.from_date.date().toString("yyyy-MM-dd"),
+                                    self.to_date.date().toString("yyyy-MM-dd"))
+        self._loaded.clear()
+        self.queries.cancel()
+        self._opened.add(REPORT_SECTIONS[self.tab_widget.currentIndex()])
+        self.load_sections(self._opened)
+
+    def on_tab_changed(self, index):
+        section = REPORT_SECTIONS[index]
+        self._opened.add(section)
+        if section not in self._loaded and not self.queries.is_busy(section):
+            self.load_sections([section])
+
+    def load_sections(self, sections):
+        """Query the given sections concurrently, each on its own connection"""
+        for section in sections:
+            self.show_loading(section)
+            self._load_started[section] = time.perf_counter()
+            self.queries.submit(section, getattr(self, f"fetch_{section}"),
+                                lambda data, section=section: self.section_loaded(section, data),
+                                self._period,
+                                on_error=lambda message, section=section: self.section_failed(section, message))
+
+    def section_loaded(self, section, data):
+        getattr(self, f"show_{section}")(data)
+        self._loaded.add(section)
+        self.last_load_ms[section] = (time.perf_counter() - self._load_started[section]) * 1000
+
+        if self._after_load and self._after_load[0] <= self._loaded:
+            callback = self._after_load[1]
+            self._after_load = None
+            callback()
+
+    def section_failed(self, section, message):
+        # An action waiting on this section will not run; it reports the failure instead
+        if self._after_load and section in self._after_load[0]:
+            on_error = self._after_load[2]
+            self._after_load = None
+            if on_error:
+                on_error(message)
+                return
+        self.show_load_error(message)
+
+    def when_loaded(self, sections, callback, on_error=None):
+        """Run callback once the sections are loaded for the current range, on_error(message) if one fails"""
+        missing = set(sections) - self._loaded
+        if not missing:
+            callback()
+            return
+        self._after_load = (set(sections), callback, on_error)
+        self.load_sections(missing - {s for s in missing if self.queries.is_busy(s)})
+
+    def show_loading(self, section):
+        """Blank a section's KPI cards until its data arrives"""
+        for name in SECTION_CARDS[section]:
+            getattr(self, name).value_label.setText("…")
+
+    def show_load_error(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to load report data: {message}")
+
+    @staticmethod
+    def fetch_sales_summary(cursor, period):
+        # Daily series; the overall stats are summed from it
+        series = sales_series(cursor, period, 'day')
+
+        # Get total items sold
+        cursor.execute("""
+            SELECT COALESCE(SUM(quantity), 0)
+            FROM sales
+            WHERE date >= %s AND date < %s
+        """, period.params())
+        items_sold = cursor.fetchone()[0] or 0
+        return {'series': series, 'items_sold': items_sold}
+
+    def show_sales_summary(self, data):
+        """Fill the sales summary tab"""
         try:
-            cursor = self.parent.conn.cursor()
-            
-            # Get overall stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as transactions,
-                    COALESCE(SUM(total_price), 0) as total_sales,
-                    COALESCE(AVG(total_price), 0) as avg_transaction
-                FROM tickets 
-                WHERE date BETWEEN ? AND ?
-            """, (from_date, to_date + " 23:59:59"))
-            
-            stats = cursor.fetchone()
-            
-            # Get total items sold
-            cursor.execute("""
-                SELECT COALESCE(SUM(
-                    json_extract(value, '$.quantity')
-                ), 0)
-                FROM tickets, json_each(tickets.items)
-                WHERE date BETWEEN ? AND ?
-            """, (from_date, to_date + " 23:59:59"))
-            
-            items_sold = cursor.fetchone()[0] or 0
-            
+            series = data['series']
+            transactions, total_sales = series_totals(series)
+            avg_transaction = total_sales / transactions if transactions else 0
+
             # Update KPI cards
-            self.total_sales_card.value_label.setText(f"{stats[1]:,.2f} DA")
-            self.total_transactions_card.value_label.setText(f"{stats[0]:,}")
-            self.avg_transaction_card.value_label.setText(f"{stats[2]:,.2f} DA")
-            self.items_sold_card.value_label.setText(f"{items_sold:,}")
-            
-            # Load daily breakdown
-            cursor.execute("""
-                SELECT 
-                    DATE(date) as sale_date,
-                    COUNT(*) as transactions,
-                    COALESCE(SUM(total_price), 0) as total_sales,
-                    COALESCE(AVG(total_price), 0) as avg_sale
-                FROM tickets 
-                WHERE date BETWEEN ? AND ?
-                GROUP BY DATE(date)
-                ORDER BY sale_date DESC
-            """, (from_date, to_date + " 23:59:59"))
-            
-            daily_data = cursor.fetchall()
-            
+            self.total_sales_card.value_label.setText(f"{total_sales:,.2f} DA")
+            self.total_transactions_card.value_label.setText(f"{transactions:,}")
+            self.avg_transaction_card.value_label.setText(f"{avg_transaction:,.2f} DA")
+            self.items_sold_card.value_label.setText(f"{data['items_sold']:,}")
+
+            # Daily breakdown, most recent day first
+            daily_data = [(p.start.strftime("%Y-%m-%d"), p.transactions, p.total, p.average)
+                          for p in reversed(series)]
+
             # Update transaction table
             self.transaction_table.setRowCount(len(daily_data))
-            
+
             # Generate sales trend text
             trend_text = "Daily Sales Trend:\n" + "="*50 + "\n"
             max_sales = max([row[2] for row in daily_data]) if daily_data else 1
-            
+
             for row, (date, transactions, sales, avg_sale) in enumerate(daily_data):
                 # Add to table
-                self.transaction_table.setItem(row, 0, QTableWidgetItem(date))
+                self.transaction_table.setItem(row, 0, QTableWidgetItem(str(date)))
                 self.transaction_table.setItem(row, 1, QTableWidgetItem(f"{transactions:,}"))
                 self.transaction_table.setItem(row, 2, QTableWidgetItem(f"{sales:,.2f}"))
                 self.transaction_table.setItem(row, 3, QTableWidgetItem(f"{avg_sale:,.2f}"))
-                
+
                 # Add to trend chart (text-based)
                 bar_length = int((sales / max_sales) * 30) if max_sales > 0 else 0
                 bar = "█" * bar_length
                 trend_text += f"{date}: {bar} {sales:,.0f} DA\n"
-            
+
             self.sales_trend_text.setPlainText(trend_text)
-            
+
         except Exception as e:
             print(f"Error loading sales summary: {e}")
-    
-    def load_product_performance_data(self, from_date, to_date):
-        """Load product performance data"""
+
+    @staticmethod
+    def fetch_product_performance(cursor, period):
+        # Get top selling products
+        cursor.execute("""
+            SELECT
+                s.product_name,
+                SUM(s.quantity) as total_quantity,
+                SUM(s.total_price) as total_revenue,
+                MAX(p.price_buy) as price_buy,
+                MAX(p.quantity) as stock_level
+            FROM sales s
+            LEFT JOIN products p ON p.id = s.product_id
+            WHERE s.date >= %s AND s.date < %s
+            GROUP BY s.product_name
+            ORDER BY total_quantity DESC
+            LIMIT 20
+        """, period.params())
+        products_data = cursor.fetchall()
+
+        # Get low stock count
+        cursor.execute("SELECT COUNT(*) FROM products WHERE quantity < 10")
+        low_stock_count = cursor.fetchone()[0]
+
+        # Load category performance
+        cursor.execute("""
+            SELECT
+                COALESCE(p.category, 'Uncategorized') as category,
+                COUNT(DISTINCT s.product_name) as product_count,
+                COALESCE(SUM(s.total_price), 0) as total_sales,
+                COALESCE(AVG(s.unit_price), 0) as avg_price
+            FROM sales s
+            LEFT JOIN products p ON p.id = s.product_id
+            WHERE s.date >= %s AND s.date < %s
+            GROUP BY category
+            ORDER BY total_sales DESC
+        """, period.params())
+        categories_data = cursor.fetchall()
+        return {'products': products_data, 'low_stock_count': low_stock_count,
+                'categories': categories_data}
+
+    def show_product_performance(self, data):
+        """Fill the product performance tab"""
         try:
-            cursor = self.parent.conn.cursor()
-            
-            # Get top selling products
-            cursor.execute("""
-                SELECT 
-                    json_extract(value, '$.name') as product_name,
-                    SUM(json_extract(value, '$.quantity')) as total_quantity,
-                    SUM(json_extract(value, '$.total')) as total_revenue,
-                    p.price_buy,
-                    p.quantity as stock_level
-                FROM tickets t, json_each(t.items) 
-                LEFT JOIN products p ON json_extract(value, '$.name') = p.name
-                WHERE t.date BETWEEN ? AND ?
-                GROUP BY product_name
-                ORDER BY total_quantity DESC
-                LIMIT 20
-            """, (from_date, to_date + " 23:59:59"))
-            
-            products_data = cursor.fetchall()
-            
+            products_data = data['products']
+
             # Update top products table
             self.top_products_table.setRowCount(len(products_data))
-            
+
             total_profit = 0
             products_sold = len(products_data)
             top_product = "N/A"
-            
+
             for row, (name, qty, revenue, buy_price, stock) in enumerate(products_data):
                 if row == 0:
                     top_product = name
-                
+
                 profit = revenue - (buy_price * qty) if buy_price else 0
                 total_profit += profit
-                
+
                 self.top_products_table.setItem(row, 0, QTableWidgetItem(name))
                 self.top_products_table.setItem(row, 1, QTableWidgetItem(f"{int(qty):,}"))
                 self.top_products_table.setItem(row, 2, QTableWidgetItem(f"{revenue:,.2f}"))
                 self.top_products_table.setItem(row, 3, QTableWidgetItem(f"{profit:,.2f}"))
                 self.top_products_table.setItem(row, 4, QTableWidgetItem(f"{stock or 0}"))
-            
-            # Get low stock count
-            cursor.execute("SELECT COUNT(*) FROM products WHERE quantity < 10")
-            low_stock_count = cursor.fetchone()[0]
-            
+
             # Update product KPIs
             self.top_product_card.value_label.setText(top_product)
             self.total_products_card.value_label.setText(f"{products_sold}")
             avg_profit = total_profit / products_sold if products_sold > 0 else 0
             self.avg_profit_card.value_label.setText(f"{avg_profit:,.2f} DA")
-            self.low_stock_card.value_label.setText(f"{low_stock_count}")
-            
-            # Load category performance
-            cursor.execute("""
-                SELECT 
-                    COALESCE(p.category, 'Uncategorized') as category,
-                    COUNT(DISTINCT p.name) as product_count,
-                    COALESCE(SUM(json_extract(value, '$.total')), 0) as total_sales,
-                    COALESCE(AVG(json_extract(value, '$.price')), 0) as avg_price
-                FROM tickets t, json_each(t.items)
-                LEFT JOIN products p ON json_extract(value, '$.name') = p.name
-                WHERE t.date BETWEEN ? AND ?
-                GROUP BY category
-                ORDER BY total_sales DESC
-            """, (from_date, to_date + " 23:59:59"))
-            
-            categories_data = cursor.fetchall()
-            
+            self.low_stock_card.value_label.setText(f"{data['low_stock_count']}")
+
+            categories_data = data['categories']
+
             # Update categories table
             self.categories_table.setRowCount(len(categories_data))
-            
+
             for row, (category, count, sales, avg_price) in enumerate(categories_data):
                 self.categories_table.setItem(row, 0, QTableWidgetItem(category))
                 self.categories_table.setItem(row, 1, QTableWidgetItem(f"{count}"))
                 self.categories_table.setItem(row, 2, QTableWidgetItem(f"{sales:,.2f}"))
                 self.categories_table.setItem(row, 3, QTableWidgetItem(f"{avg_price:,.2f}"))
-            
+
         except Exception as e:
             print(f"Error loading product performance: {e}")
-    
-    def load_customer_analysis_data(self, from_date, to_date):
-        """Load customer analysis data"""
-        try:
-            cursor = self.parent.conn.cursor()
-            
-            # Get customer stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(DISTINCT customer_name) as total_customers,
-                    COUNT(*) as total_transactions,
-                    COALESCE(SUM(total_price), 0) as total_sales
-                FROM tickets 
-                WHERE date BETWEEN ? AND ? AND customer_name != 'Walk-in Customer'
-            """, (from_date, to_date + " 23:59:59"))
-            
-            customer_stats = cursor.fetchone()
-            total_customers = customer_stats[0]
-            total_transactions = customer_stats[1]
-            total_sales = customer_stats[2]
-            
-            # Calculate average customer value
-            avg_customer_value = total_sales / total_customers if total_customers > 0 else 0
-            
-            # Get new customers (first purchase in date range)
+
+    @staticmethod
+    def fetch_customer_analysis(cursor, period):
+        # Get customer stats
+        cursor.execute("""
+            SELECT
+                COUNT(DISTINCT customer_name) as total_customers,
+                COUNT(*) as total_transactions,
+                COALESCE(SUM(total_price), 0) as total_sales
+            FROM tickets
+            WHERE date >= %s AND date < %s AND customer_name != 'Walk-in Customer'
+        """, period.params())
+        total_customers, total_transactions, total_sales = cursor.fetchone()
+
+        # Get new customers (first purchase in date range)
+        cursor.execute("""
+            SELECT COUNT(DISTINCT customer_name)
+            FROM tickets t1
+            WHERE t1.date >= %s AND t1.date < %s
+            AND t1.customer_name != 'Walk-in Customer'
+            AND NOT EXISTS (
+                SELECT 1 FROM tickets t2
+                WHERE t2.customer_name = t1.customer_name
+                AND t2.date < %s
+            )
+        """, (*period.params(), period.start))
+        new_customers = cursor.fetchone()[0]
+
+        # Repeat customers (more than one ticket ever)
+        repeat_customers = 0
+        if total_customers > 0:
             cursor.execute("""
                 SELECT COUNT(DISTINCT customer_name)
-                FROM tickets t1
-                WHERE t1.date BETWEEN ? AND ?
-                AND t1.customer_name != 'Walk-in Customer'
-                AND NOT EXISTS (
-                    SELECT 1 FROM tickets t2 
-                    WHERE t2.customer_name = t1.customer_name 
-                    AND t2.date < ?
+                FROM tickets
+                WHERE date >= %s AND date < %s
+                AND customer_name != 'Walk-in Customer'
+                AND customer_name IN (
+                    SELECT customer_name
+                    FROM tickets
+                    WHERE customer_name != 'Walk-in Customer'
+                    GROUP BY customer_name
+                    HAVING COUNT(*) > 1
                 )
-            """, (from_date, to_date + " 23:59:59", from_date))
-            
-            new_customers = cursor.fetchone()[0]
-            
+            """, period.params())
+            repeat_customers = cursor.fetchone()[0]
+
+        # Get top customers
+        cursor.execute("""
+            SELECT
+                customer_name,
+                COALESCE(SUM(total_price), 0) as total_purchases,
+                COUNT(*) as transaction_count,
+                MAX(date) as last_purchase
+            FROM tickets
+            WHERE date >= %s AND date < %s AND customer_name != 'Walk-in Customer'
+            GROUP BY customer_name
+            ORDER BY total_purchases DESC
+            LIMIT 15
+        """, period.params())
+        top_customers_data = cursor.fetchall()
+
+        # Get recent customer activity
+        cursor.execute("""
+            SELECT
+                DATE(date) as purchase_date,
+                customer_name,
+                JSON_LENGTH(items) as item_count,
+                total_price
+            FROM tickets
+            WHERE date >= %s AND date < %s AND customer_name != 'Walk-in Customer'
+            ORDER BY date DESC
+            LIMIT 20
+        """, period.params())
+        activity_data = cursor.fetchall()
+
+        return {'total_customers': total_customers, 'total_sales': total_sales,
+                'new_customers': new_customers, 'repeat_customers': repeat_customers,
+                'top_customers': top_customers_data, 'activity': activity_data}
+
+    def show_customer_analysis(self, data):
+        """Fill the customer analysis tab"""
+        try:
+            total_customers = data['total_customers']
+
+            # Calculate average customer value
+            avg_customer_value = data['total_sales'] / total_customers if total_customers > 0 else 0
+
             # Calculate repeat customer percentage
-            repeat_percentage = 0
-            if total_customers > 0:
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT customer_name)
-                    FROM tickets 
-                    WHERE date BETWEEN ? AND ? 
-                    AND customer_name != 'Walk-in Customer'
-                    AND customer_name IN (
-                        SELECT customer_name 
-                        FROM tickets 
-                        WHERE customer_name != 'Walk-in Customer'
-                        GROUP BY customer_name 
-                        HAVING COUNT(*) > 1
-                    )
-                """, (from_date, to_date + " 23:59:59"))
-                
-                repeat_customers = cursor.fetchone()[0]
-                repeat_percentage = (repeat_customers / total_customers) * 100
-            
+            repeat_percentage = (data['repeat_customers'] / total_customers) * 100 if total_customers > 0 else 0
+
             # Update customer KPIs
             self.total_customers_card.value_label.setText(f"{total_customers}")
-            self.new_customers_card.value_label.setText(f"{new_customers}")
+            self.new_customers_card.value_label.setText(f"{data['new_customers']}")
             self.avg_customer_value_card.value_label.setText(f"{avg_customer_value:,.2f} DA")
             self.repeat_customers_card.value_label.setText(f"{repeat_percentage:.1f}%")
-            
-            # Get top customers
-            cursor.execute("""
-                SELECT 
-                    customer_name,
-                    COALESCE(SUM(total_price), 0) as total_purchases,
-                    COUNT(*) as transaction_count,
-                    MAX(date) as last_purchase
-                FROM tickets 
-                WHERE date BETWEEN ? AND ? AND customer_name != 'Walk-in Customer'
-                GROUP BY customer_name
-                ORDER BY total_purchases DESC
-                LIMIT 15
-            """, (from_date, to_date + " 23:59:59"))
-            
-            top_customers_data = cursor.fetchall()
-            
+
+            top_customers_data = data['top_customers']
+
             # Update top customers table
             self.top_customers_table.setRowCount(len(top_customers_data))
-            
+
             for row, (name, purchases, transactions, last_purchase) in enumerate(top_customers_data):
                 try:
-                    last_date = datetime.fromisoformat(last_purchase).strftime("%Y-%m-%d")
+                    last_date = last_purchase.strftime("%Y-%m-%d")
                 except:
-                    last_date = last_purchase[:10] if last_purchase else "N/A"
-                
+                    last_date = str(last_purchase)[:10] if last_purchase else "N/A"
+
                 self.top_customers_table.setItem(row, 0, QTableWidgetItem(name))
                 self.top_customers_table.setItem(row, 1, QTableWidgetItem(f"{purchases:,.2f}"))
                 self.top_customers_table.setItem(row, 2, QTableWidgetItem(f"{transactions}"))
                 self.top_customers_table.setItem(row, 3, QTableWidgetItem(last_date))
-            
-            # Get recent customer activity
-            cursor.execute("""
-                SELECT 
-                    DATE(date) as purchase_date,
-                    customer_name,
-                    json_array_length(items) as item_count,
-                    total_price
-                FROM tickets 
-                WHERE date BETWEEN ? AND ? AND customer_name != 'Walk-in Customer'
-                ORDER BY date DESC
-                LIMIT 20
-            """, (from_date, to_date + " 23:59:59"))
-            
-            activity_data = cursor.fetchall()
-            
+
+            activity_data = data['activity']
+
             # Update customer history table
             self.customer_history_table.setRowCount(len(activity_data))
-            
+
             for row, (date, customer, items, amount) in enumerate(activity_data):
-                self.customer_history_table.setItem(row, 0, QTableWidgetItem(date))
+                self.customer_history_table.setItem(row, 0, QTableWidgetItem(str(date)))
                 self.customer_history_table.setItem(row, 1, QTableWidgetItem(customer))
                 self.customer_history_table.setItem(row, 2, QTableWidgetItem(f"{items}"))
                 self.customer_history_table.setItem(row, 3, QTableWidgetItem(f"{amount:,.2f}"))
-            
+
         except Exception as e:
             print(f"Error loading customer analysis: {e}")
-    
-    def load_financial_report_data(self, from_date, to_date):
-        """Load financial report data"""
+
+    @staticmethod
+    def fetch_financial_report(cursor, period):
+        # Get financial overview
+        cursor.execute("""
+            SELECT
+                COALESCE(SUM(total_price), 0) as gross_revenue
+            FROM tickets
+            WHERE date >= %s AND date < %s
+        """, period.params())
+        gross_revenue = cursor.fetchone()[0]
+
+        # Calculate total cost (simplified - using buy prices)
+        cursor.execute("""
+            SELECT
+                COALESCE(SUM(s.quantity * COALESCE(p.price_buy, 0)), 0) as total_cost
+            FROM sales s
+            LEFT JOIN products p ON p.id = s.product_id
+            WHERE s.date >= %s AND s.date < %s
+        """, period.params())
+        total_cost = cursor.fetchone()[0]
+
+        # Get daily financial breakdown
+        cursor.execute("""
+            SELECT
+                DATE(t.date) as sale_date,
+                COALESCE(SUM(t.total_price), 0) as daily_revenue,
+                COALESCE(SUM(c.ticket_cost), 0) as daily_cost
+            FROM tickets t
+            LEFT JOIN (
+                SELECT s.ticket_id, SUM(s.quantity * COALESCE(p.price_buy, 0)) as ticket_cost
+                FROM sales s
+                LEFT JOIN products p ON p.id = s.product_id
+                WHERE s.date >= %s AND s.date < %s
+                GROUP BY s.ticket_id
+            ) c ON c.ticket_id = t.id
+            WHERE t.date >= %s AND t.date < %s
+            GROUP BY DATE(t.date)
+            ORDER BY sale_date DESC
+        """, period.params() * 2)
+        financial_data = cursor.fetchall()
+
+        return {'gross_revenue': gross_revenue, 'total_cost': total_cost, 'daily': financial_data}
+
+    def show_financial_report(self, data):
+        """Fill the financial report tab"""
         try:
-            cursor = self.parent.conn.cursor()
-            
-            # Get financial overview
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(total_price), 0) as gross_revenue
-                FROM tickets 
-                WHERE date BETWEEN ? AND ?
-            """, (from_date, to_date + " 23:59:59"))
-            
-            gross_revenue = cursor.fetchone()[0]
-            
-            # Calculate total cost (simplified - using buy prices)
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(
-                        json_extract(value, '$.quantity') * COALESCE(p.price_buy, 0)
-                    ), 0) as total_cost
-                FROM tickets t, json_each(t.items)
-                LEFT JOIN products p ON json_extract(value, '$.name') = p.name
-                WHERE t.date BETWEEN ? AND ?
-            """, (from_date, to_date + " 23:59:59"))
-            
-            total_cost = cursor.fetchone()[0]
+            gross_revenue = data['gross_revenue']
+            total_cost = data['total_cost']
             gross_profit = gross_revenue - total_cost
             profit_margin = (gross_profit / gross_revenue * 100) if gross_revenue > 0 else 0
-            
+
             # Update financial KPIs
             self.gross_revenue_card.value_label.setText(f"{gross_revenue:,.2f} DA")
             self.total_cost_card.value_label.setText(f"{total_cost:,.2f} DA")
             self.gross_profit_card.value_label.setText(f"{gross_profit:,.2f} DA")
             self.profit_margin_card.value_label.setText(f"{profit_margin:.1f}%")
-            
-            # Get daily financial breakdown
-            cursor.execute("""
-                SELECT 
-                    DATE(t.date) as sale_date,
-                    COALESCE(SUM(t.total_price), 0) as daily_revenue,
-                    COALESCE(SUM(
-                        json_extract(value, '$.quantity') * COALESCE(p.price_buy, 0)
-                    ), 0) as daily_cost
-                FROM tickets t, json_each(t.items)
-                LEFT JOIN products p ON json_extract(value, '$.name') = p.name
-                WHERE t.date BETWEEN ? AND ?
-                GROUP BY DATE(t.date)
-                ORDER BY sale_date DESC
-            """, (from_date, to_date + " 23:59:59"))
-            
-            financial_data = cursor.fetchall()
-            
+
+            financial_data = data['daily']
+
             # Update financial breakdown table
             self.financial_table.setRowCount(len(financial_data))
-            
+
             for row, (date, revenue, cost) in enumerate(financial_data):
                 profit = revenue - cost
                 margin = (profit / revenue * 100) if revenue > 0 else 0
-                
-                self.financial_table.setItem(row, 0, QTableWidgetItem(date))
+
+                self.financial_table.setItem(row, 0, QTableWidgetItem(str(date)))
                 self.financial_table.setItem(row, 1, QTableWidgetItem(f"{revenue:,.2f}"))
                 self.financial_table.setItem(row, 2, QTableWidgetItem(f"{cost:,.2f}"))
                 self.financial_table.setItem(row, 3, QTableWidgetItem(f"{profit:,.2f}"))
                 self.financial_table.setItem(row, 4, QTableWidgetItem(f"{margin:.1f}%"))
-            
+
             # Generate business insights
             insights = self.generate_business_insights(gross_revenue, gross_profit, profit_margin)
             self.insights_text.setPlainText(insights)
-            
+
         except Exception as e:
             print(f"Error loading financial report: {e}")
-    
+
     def generate_business_insights(self, revenue, profit, margin):
         """Generate business insights and recommendations"""
         insights = "📊 BUSINESS INSIGHTS & RECOMMENDATIONS\n"
@@ -1075,6 +1114,12 @@ class ReportsWidget(QWidget):
     
     def export_to_csv(self):
         """Export report data to CSV"""
+        # The export reads the summary and product tabs; load them first if never opened
+        if not {'sales_summary', 'product_performance'} <= self._loaded:
+            self.when_loaded(['sales_summary', 'product_performance'], self.export_to_csv,
+                             lambda message: QMessageBox.critical(
+                                 self, "Export Error", f"Failed to export report: {message}"))
+            return
         try:
             file_path, _ = QFileDialog.getSaveFileName(
                 self,
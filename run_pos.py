@@ -59,6 +59,12 @@ def check_database():
         else:
             print("✓ Database connection successful")
             print(f"✓ Found {len(tables)} database tables")
+
+            from schema_migrations import run_migrations
+            version, deferred = run_migrations()
+            print(f"✓ Database schema is at version {version}")
+            for number, reason in deferred:
+                print(f"⚠ Migration {number} pending: {reason}")
         
     except Exception as e:
         print(f"✗ Database connection failed: {e}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Normalized sale lines.
+
+Checkout writes one row per cart line into the `sales` table next to the
+ticket, so reports aggregate with indexed joins instead of unnesting the
+tickets.items JSON. Run this module directly to backfill tickets that
+were recorded before sale lines existed:
+
+    python sales_ledger.py [--batch-size N] [--dry-run]
+"""
+
+import argparse
+import json
+
+from mysql_config import MySQLConnectionManager
+
+INSERT_SALE_LINE = '''
+    INSERT INTO sales (ticket_id, product_id, product_name, quantity, unit_price, total_price, date)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+'''
+
+SALES_INDEXES = {
+    'idx_sales_ticket': 'ticket_id',
+    'idx_sales_date_product': 'date, product_id',
+    'idx_sales_product_date': 'product_id, date',
+}
+
+
+def ticket_items(cart_items):
+    """Serialize cart items for tickets.items (kept for receipts and ticket views)"""
+    return [{
+        'product_id': item['id'],
+        'name': item['name'],
+        'quantity': item['quantity'],
+        'price': item['price'],
+        'total': item['price'] * item['quantity']
+    } for item in cart_items]
+
+
+def record_sale_lines(cursor, ticket_id, sale_date, cart_items):
+    """Insert one sales row per cart line in a single batched statement"""
+    rows = [(ticket_id, item['id'], item['name'], item['quantity'], item['price'],
+             item['price'] * item['quantity'], sale_date) for item in cart_items]
+    if rows:
+        cursor.executemany(INSERT_SALE_LINE, rows)
+    return len(rows)
+
+
+def delete_sale_lines(cursor, ticket_id):
+    """Remove the sale lines of a ticket (call before deleting the ticket)"""
+    cursor.execute('DELETE FROM sales WHERE ticket_id = %s', (ticket_id,))
+
+
+def detach_product(cursor, product_id):
+    """Keep sale history of a product that is being deleted; the name stays on the line"""
+    cursor.execute('UPDATE sales SET product_id = NULL WHERE product_id = %s', (product_id,))
+
+
+def ensure_sales_schema(cursor):
+    """Add the product_name column and reporting indexes to older databases"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'sales' AND column_name = 'product_name'
+    ''')
+    if not cursor.fetchone()[0]:
+        cursor.execute('ALTER TABLE sales ADD COLUMN product_name VARCHAR(255) AFTER product_id')
+
+    cursor.execute('''
+        SELECT DISTINCT index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'sales'
+    ''')
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, columns in SALES_INDEXES.items():
+        if name not in existing:
+            cursor.execute(f'CREATE INDEX {name} ON sales ({columns})')
+
+
+def _line_from_item(ticket_id, ticket_date, item, product_ids):
+    """Build a sales row from one tickets.items entry, resolving the product by name"""
+    name = item.get('name')
+    quantity = int(item.get('quantity') or 0)
+    price = float(item.get('price') or 0)
+    total = float(item.get('total') if item.get('total') is not None else price * quantity)
+    product_id = item.get('product_id') or product_ids.get(name)
+    return (ticket_id, product_id, name, quantity, price, total, ticket_date)
+
+
+def backfill_tickets(cursor, batch_size=500, dry_run=False, conn=None):
+    """Write sales rows for tickets that have none yet; returns (tickets, lines, unresolved)
+
+    When conn is given each batch is committed on its own so a large
+    history does not sit in one huge transaction.
+    """
+    cursor.execute('SELECT id, name FROM products')
+    product_ids = {name: product_id for product_id, name in cursor.fetchall()}
+
+    tickets_done = lines_done = unresolved = 0
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT t.id, t.date, t.items
+            FROM tickets t
+            WHERE t.id > %s
+              AND NOT EXISTS (SELECT 1 FROM sales s WHERE s.ticket_id = t.id)
+            ORDER BY t.id
+            LIMIT %s
+        ''', (last_id, batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+
+        rows = []
+        for ticket_id, ticket_date, items_json in batch:
+            last_id = ticket_id
+            try:
+                items = json.loads(items_json) if items_json else []
+            except (TypeError, ValueError):
+                print(f"Skipping ticket {ticket_id}: unreadable items")
+                continue
+            for item in items:
+                row = _line_from_item(ticket_id, ticket_date, item, product_ids)
+                if row[1] is None:
+                    unresolved += 1
+                rows.append(row)
+            tickets_done += 1
+
+        if rows and not dry_run:
+            cursor.executemany(INSERT_SALE_LINE, rows)
+            if conn is not None:
+                conn.commit()
+        lines_done += len(rows)
+
+    return tickets_done, lines_done, unresolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill sales rows from tickets.items JSON")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be written")
+    args = parser.parse_args()
+
+    with MySQLConnectionManager() as (cursor, conn):
+        ensure_sales_schema(cursor)
+        tickets, lines, unresolved = backfill_tickets(cursor, args.batch_size, args.dry_run, conn)
+        if args.dry_run:
+            conn.rollback()
+
+    action = "Would write" if args.dry_run else "Wrote"
+    print(f"{action} {lines} sale lines for {tickets} tickets")
+    if unresolved:
+        print(f"{unresolved} lines reference products that no longer exist (kept by name)")
+
+
+if __name__ == '__main__':
+    main()
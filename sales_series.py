@@ -0,0 +1,83 @@
+"""
+Bucketed sales time series.
+
+One GROUP BY round trip returns the transaction count and revenue of every
+hour, day, week or month bucket in a DateRange; buckets without sales are
+filled with zeros on the Python side so charts always get a full axis.
+"""
+
+from datetime import timedelta
+from typing import NamedTuple
+
+from date_ranges import month_range, to_day
+
+# bucket -> (MySQL key expression, matching strftime pattern)
+BUCKET_KEYS = {
+    'hour': ("DATE_FORMAT(date, '%%Y-%%m-%%d %%H')", "%Y-%m-%d %H"),
+    'day': ("DATE_FORMAT(date, '%%Y-%%m-%%d')", "%Y-%m-%d"),
+    'week': ("DATE_FORMAT(DATE(date) - INTERVAL WEEKDAY(date) DAY, '%%Y-%%m-%%d')", "%Y-%m-%d"),
+    'month': ("DATE_FORMAT(date, '%%Y-%%m')", "%Y-%m"),
+}
+
+
+class SeriesPoint(NamedTuple):
+    start: object          # datetime at the start of the bucket
+    transactions: int
+    total: float
+
+    @property
+    def average(self):
+        return self.total / self.transactions if self.transactions else 0.0
+
+
+def bucket_starts(period, bucket):
+    """Start datetimes of every bucket overlapping the period"""
+    if bucket == 'hour':
+        current = period.start.replace(minute=0, second=0, microsecond=0)
+        step = lambda value: value + timedelta(hours=1)
+    elif bucket == 'day':
+        current = to_day(period.start)
+        step = lambda value: value + timedelta(days=1)
+    elif bucket == 'week':
+        current = to_day(period.start) - timedelta(days=period.start.weekday())
+        step = lambda value: value + timedelta(days=7)
+    elif bucket == 'month':
+        current = to_day(period.start).replace(day=1)
+        step = lambda value: month_range(value).end
+    else:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    starts = []
+    while current < period.end:
+        starts.append(current)
+        current = step(current)
+    return starts
+
+
+def sales_series(cursor, period, bucket='day', cashier_id=None):
+    """Zero-filled [SeriesPoint] for the period, oldest bucket first"""
+    key_sql, key_format = BUCKET_KEYS[bucket]
+    query = f"""
+        SELECT {key_sql} as bucket, COUNT(*), COALESCE(SUM(total_price), 0)
+        FROM tickets
+        WHERE {period.sql('date')}
+    """
+    params = list(period.params())
+    if cashier_id is not None:
+        query += " AND cashier_id = %s"
+        params.append(cashier_id)
+    query += " GROUP BY bucket"
+
+    cursor.execute(query, params)
+    found = {key: (count, float(total)) for key, count, total in cursor.fetchall()}
+
+    series = []
+    for start in bucket_starts(period, bucket):
+        count, total = found.get(start.strftime(key_format), (0, 0.0))
+        series.append(SeriesPoint(start, count, total))
+    return series
+
+
+def series_totals(series):
+    """(transactions, revenue) summed over a series"""
+    return sum(p.transactions for p in series), sum(p.total for p in series)
@@ -0,0 +1,172 @@
+"""
+Keyboard-wedge USB scanner fast path.
+
+USB scanners "type" a code as keystrokes a few milliseconds apart, usually
+followed by Enter. ScannerWedge is an application-wide event filter that
+holds each printable keystroke for a moment: keystrokes that follow one
+another within BURST_GAP_MS and add up to MIN_LENGTH characters are a scan,
+emitted on `scanned` without reaching any widget, wherever the focus is.
+Anything else is replayed to the widget it was typed into, so typing by
+hand is only delayed by FLUSH_MS.
+
+Digits typed by hand followed by `*` (e.g. `3*`) set the quantity of the
+next scan; take_quantity() hands it to whoever processes the scan, and the
+digits are taken back out of the line edit they went to. Escape clears it.
+
+The filter only acts while enabled (the POS screen sets it while shown) and
+no modal dialog is open.
+
+    POS_WEDGE_GAP_MS      longest gap between two keystrokes of a scan (default 30)
+    POS_WEDGE_MIN_LENGTH  shortest code taken as a scan (default 6)
+"""
+
+import os
+import time
+
+from PyQt5 import sip
+from PyQt5.QtCore import QEvent, QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtWidgets import QApplication, QLineEdit
+
+BURST_GAP_MS = int(os.getenv('POS_WEDGE_GAP_MS', 30))
+MIN_LENGTH = int(os.getenv('POS_WEDGE_MIN_LENGTH', 6))
+# Real time a held keystroke waits for the next one; longer than the gap, as
+# key events can reach the event loop late when the GUI thread was busy
+FLUSH_MS = 2 * BURST_GAP_MS
+MAX_QUANTITY_DIGITS = 3
+QUANTITY_SECONDS = 30.0        # a quantity not followed by a scan lapses
+
+TERMINATORS = (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Tab)
+MODIFIER_KEYS = (Qt.Key_Shift, Qt.Key_Control, Qt.Key_Alt, Qt.Key_AltGr, Qt.Key_Meta, Qt.Key_CapsLock)
+
+
+class ScannerWedge(QObject):
+    """Event filter turning scanner keystroke bursts into scanned(code)"""
+    scanned = pyqtSignal(str)
+    quantity_changed = pyqtSignal(int)   # quantity for the next scan, 1 once used or cleared
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.enabled = False
+        self.scans = 0               # bursts taken as scans
+        self.replayed = 0            # keystrokes handed back to widgets
+        self._held = []              # [(timestamp ms, key, modifiers, text)]
+        self._target = None          # widget the held keystrokes were meant for
+        self._replaying = False
+        self._digits = ''            # digits just typed by hand, a possible quantity prefix
+        self._quantity = 1
+        self._quantity_at = 0.0
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+
+    # ---------------- Quantity prefix ----------------
+
+    def set_quantity(self, quantity):
+        self._quantity = quantity
+        self._quantity_at = time.monotonic()
+        self.quantity_changed.emit(quantity)
+
+    def take_quantity(self):
+        """Quantity for the scan being processed (1 unless a prefix was typed); resets it"""
+        quantity = self._quantity
+        if quantity == 1:
+            return 1
+        self.set_quantity(1)
+        return quantity if time.monotonic() - self._quantity_at < QUANTITY_SECONDS else 1
+
+    # ---------------- Filtering ----------------
+
+    def eventFilter(self, obj, event):
+        if self._replaying or not self.enabled or event.type() != QEvent.KeyPress:
+            return False
+        # Key presses are seen for the window and every parent they propagate to; act on the first widget only
+        if not obj.isWidgetType() or obj is not (QApplication.focusWidget() or QApplication.activeWindow()):
+            return False
+        if QApplication.activeModalWidget() is not None:
+            return False
+
+        key, text = event.key(), event.text()
+        if key in MODIFIER_KEYS:
+            return False             # scanners press Shift for capitals in the middle of a code
+        if key in TERMINATORS and self._held:
+            if len(self._held) >= MIN_LENGTH:
+                self._take_scan()
+                return True
+            self.flush()
+            return False
+
+        typed = (text and text.isprintable() and not event.isAutoRepeat() and
+                 not event.modifiers() & (Qt.ControlModifier | Qt.AltModifier | Qt.MetaModifier))
+        if not typed:
+            self.flush()
+            self._digits = ''
+            if key == Qt.Key_Escape and self._quantity != 1:
+                self.set_quantity(1)
+            return False
+
+        at = event.timestamp() or int(time.monotonic() * 1000)
+        if self._held and (at - self._held[-1][0] > BURST_GAP_MS or obj is not self._target):
+            self.flush()
+        if not self._held:
+            self._target = obj
+        self._held.append((at, key, event.modifiers(), text))
+        self._flush_timer.start(FLUSH_MS)
+        return True
+
+    def flush(self):
+        """Pass held keystrokes on: as a scan if they were one, else to the widget they were typed into"""
+        self._flush_timer.stop()
+        if len(self._held) >= MIN_LENGTH:
+            self._take_scan()
+            return
+        held, target = self._held, self._target
+        self._held, self._target = [], None
+        for _, key, modifiers, text in held:
+            self._replay(target, key, modifiers, text)
+
+    def _take_scan(self):
+        self._flush_timer.stop()
+        code = ''.join(text for _, _, _, text in self._held).strip()
+        self._held, self._target = [], None
+        self._digits = ''
+        if code:
+            self.scans += 1
+            self.scanned.emit(code)
+
+    def _replay(self, target, key, modifiers, text):
+        if target is None or sip.isdeleted(target):
+            return
+        if text == '*' and 0 < len(self._digits) <= MAX_QUANTITY_DIGITS and int(self._digits) > 0:
+            self._take_back(target, self._digits)
+            self.set_quantity(int(self._digits))
+            self._digits = ''
+            return
+        self._digits = self._digits + text if text.isdigit() else ''
+        self.replayed += 1
+        self._replaying = True
+        try:
+            QApplication.sendEvent(target, QKeyEvent(QEvent.KeyPress, key, modifiers, text))
+        finally:
+            self._replaying = False
+
+    @staticmethod
+    def _take_back(target, digits):
+        """Remove a quantity prefix from the end of the line edit it was typed into"""
+        if isinstance(target, QLineEdit) and target.text().endswith(digits) \
+                and target.cursorPosition() == len(target.text()):
+            for _ in digits:
+                target.backspace()
+
+
+_wedge = None
+
+
+def get_wedge():
+    """The application-wide wedge, installed on first use"""
+    global _wedge
+    if _wedge is None:
+        app = QApplication.instance()
+        _wedge = ScannerWedge(app)
+        app.installEventFilter(_wedge)
+    return _wedge
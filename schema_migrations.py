@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+Each migration runs once and is recorded in the schema_version table. A
+migration the data is not ready for (duplicate barcodes for the unique
+index) raises MigrationDeferred: it stays pending, the others go ahead, and
+it is tried again at the next start.
+main.py (POSApplication.init_database) and run_pos.check_database apply
+pending migrations at startup; run this module directly to migrate by hand
+and print EXPLAIN plans of the hot queries before and after:
+
+    python schema_migrations.py [--explain]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from mysql_config import MySQLConnectionManager
+from sales_ledger import ensure_sales_schema
+from barcode_index import ensure_catalog_versioning
+from ticket_sequence import ensure_ticket_sequence
+from offline_journal import ensure_idempotency_key
+from unknown_barcodes import ensure_unknown_barcode_counts
+
+LOCK_NAME = 'pos_schema_migrations'
+
+
+class MigrationDeferred(Exception):
+    """A migration the current data does not allow yet; left pending for the next start"""
+
+
+def _index_exists(cursor, table, name):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    ''', (table, name))
+    return cursor.fetchone()[0] > 0
+
+
+def _create_index(cursor, table, name, columns, unique=False):
+    """Create an index unless one with that name already exists"""
+    if _index_exists(cursor, table, name):
+        return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    cursor.execute(f'CREATE {kind} {name} ON {table} ({columns})')
+    return True
+
+
+def _unique_barcodes(cursor):
+    """Unique index on products.code_bar; deferred, listing them, while barcodes are duplicated"""
+    # An empty barcode is "no barcode"; NULLs do not collide in a unique index
+    cursor.execute("UPDATE products SET code_bar = NULL WHERE TRIM(code_bar) = ''")
+    cursor.execute('''
+        SELECT code_bar, COUNT(*) FROM products
+        WHERE code_bar IS NOT NULL
+        GROUP BY code_bar HAVING COUNT(*) > 1
+    ''')
+    duplicates = cursor.fetchall()
+    if duplicates:
+        # Scans stay indexed until the barcodes are cleaned up
+        _create_index(cursor, 'products', 'idx_products_code_bar', 'code_bar')
+        listing = '\n'.join(f"  {code}: {count} products" for code, count in duplicates)
+        raise MigrationDeferred("Several products share a barcode, so a scan may find the wrong one. "
+                                "Give each product its own barcode in Product Management; "
+                                "the upgrade is tried again at the next start:\n" + listing)
+    _create_index(cursor, 'products', 'uq_products_code_bar', 'code_bar', unique=True)
+    # Databases migrated while duplicates were tolerated have a non-unique index instead
+    if _index_exists(cursor, 'products', 'idx_products_code_bar'):
+        cursor.execute('DROP INDEX idx_products_code_bar ON products')
+
+
+def _hot_path_indexes(cursor):
+    """Indexes for barcode scans, product search and every date-filtered ticket query"""
+    _create_index(cursor, 'products', 'idx_products_name', 'name')
+    _create_index(cursor, 'products', 'idx_products_category_name', 'category, name')
+    _create_index(cursor, 'tickets', 'idx_tickets_date', 'date')
+    _create_index(cursor, 'tickets', 'idx_tickets_date_cashier', 'date, cashier_id')
+    _create_index(cursor, 'tickets', 'idx_tickets_cashier_date', 'cashier_id, date')
+    _create_index(cursor, 'tickets', 'idx_tickets_customer_date', 'customer_name, date')
+    _unique_barcodes(cursor)
+
+
+# (version, description, function(cursor)) -- append only, never renumber
+MIGRATIONS = [
+    (1, 'Hot-path indexes for products and tickets', _hot_path_indexes),
+    (2, 'Sales product_name column and reporting indexes', ensure_sales_schema),
+    (3, 'Catalog version counter for barcode indexes', ensure_catalog_versioning),
+    (4, 'Ticket number sequence', ensure_ticket_sequence),
+    (5, 'Idempotency keys for journaled sales', ensure_idempotency_key),
+    (6, 'Unknown barcode scan counts', ensure_unknown_barcode_counts),
+    (7, 'Unique barcode index where duplicates were tolerated', _unique_barcodes),
+    (8, 'Clock row versions instead of the catalog version counter', ensure_catalog_versioning),
+]
+
+
+def ensure_version_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_date DATETIME NOT NULL
+        )
+    ''')
+
+
+def current_version(cursor):
+    ensure_version_table(cursor)
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    return cursor.fetchone()[0]
+
+
+def pending_migrations(cursor):
+    """Migrations not recorded yet, deferred ones included"""
+    ensure_version_table(cursor)
+    cursor.execute('SELECT version FROM schema_version')
+    applied = {row[0] for row in cursor.fetchall()}
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def migrate(cursor, conn):
+    """Apply pending migrations in order; returns (applied versions, [(version, reason)] deferred)
+
+    DDL commits implicitly in MySQL, so each migration is recorded and
+    committed on its own. A named lock keeps two starting tills from
+    migrating at the same time.
+    """
+    cursor.execute('SELECT GET_LOCK(%s, 30)', (LOCK_NAME,))
+    if not cursor.fetchone()[0]:
+        raise RuntimeError("Another instance is migrating the database")
+
+    applied, deferred = [], []
+    try:
+        for version, description, apply in pending_migrations(cursor):
+            print(f"Applying migration {version}: {description}")
+            try:
+                apply(cursor)
+            except MigrationDeferred as e:
+                print(f"Migration {version} deferred: {e}")
+                conn.commit()
+                deferred.append((version, str(e)))
+                continue
+            cursor.execute('''
+                INSERT INTO schema_version (version, description, applied_date)
+                VALUES (%s, %s, %s)
+            ''', (version, description, datetime.now()))
+            conn.commit()
+            applied.append(version)
+    finally:
+        cursor.execute('SELECT RELEASE_LOCK(%s)', (LOCK_NAME,))
+        cursor.fetchone()
+    return applied, deferred
+
+
+def run_migrations():
+    """Migrate the configured database; returns (schema version afterwards, deferred migrations)"""
+    with MySQLConnectionManager() as (cursor, conn):
+        _, deferred = migrate(cursor, conn)
+        return current_version(cursor), deferred
+
+
+# ---------------- EXPLAIN report ----------------
+
+def known_queries():
+    """The hot queries whose plans the migrations are meant to improve"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+    return [
+        ('Barcode scan', 'SELECT * FROM products WHERE code_bar = %s', ('1234567890123',)),
+        ('Product search', 'SELECT * FROM products WHERE name LIKE %s ORDER BY name', ('Co%',)),
+        ('Category filter', 'SELECT * FROM products WHERE category = %s ORDER BY name', ('Beverages',)),
+        ('Tickets of the day',
+         'SELECT COUNT(*), SUM(total_price) FROM tickets WHERE date >= %s AND date < %s',
+         (today, tomorrow)),
+        ('Cashier day stats',
+         'SELECT COUNT(*), SUM(total_price) FROM tickets WHERE cashier_id = %s AND date >= %s AND date < %s',
+         (1, today, tomorrow)),
+        ('Customer history',
+         'SELECT * FROM tickets WHERE customer_name = %s ORDER BY date DESC LIMIT 20',
+         ('Ahmed Benali',)),
+        ('Top products of the day',
+         'SELECT product_name, SUM(quantity) FROM sales WHERE date >= %s AND date < %s GROUP BY product_name',
+         (today, tomorrow)),
+    ]
+
+
+def explain_plans(cursor):
+    """Return {query name: [plan rows as dicts]} for the known queries"""
+    plans = {}
+    for name, sql, params in known_queries():
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = cursor.column_names
+        plans[name] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return plans
+
+
+def format_plans(plans):
+    lines = []
+    for name, rows in plans.items():
+        for row in rows:
+            lines.append(f"  {name:<24} table={row.get('table')} type={row.get('type')} "
+                         f"key={row.get('key')} rows={row.get('rows')}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply POS schema migrations")
+    parser.add_argument('--explain', action='store_true',
+                        help="Print EXPLAIN plans of the hot queries before and after")
+    args = parser.parse_args()
+
+    with MySQLConnectionManager() as (cursor, conn):
+        if args.explain:
+            print("Before:")
+            print(format_plans(explain_plans(cursor)))
+
+        applied, deferred = migrate(cursor, conn)
+        print(f"Applied {len(applied)} migration(s), schema version {current_version(cursor)}")
+        for version, reason in deferred:
+            print(f"Migration {version} still pending: {reason}")
+
+        if args.explain:
+            print("After:")
+            print(format_plans(explain_plans(cursor)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Screens kept alive in a QStackedWidget instead of rebuilt on every visit.
+
+Each screen is registered with a factory and built the first time it is
+shown. Switching back to a screen that is still alive only raises it in the
+stack, then calls its optional screen_shown(hidden_for) hook with the
+seconds it spent hidden, so the screen reloads what went stale in the
+meantime and nothing else. Up to `capacity` retained screens stay alive;
+showing another evicts the least recently shown one. Screens registered
+with retain=False (login, activation) are dropped as soon as another
+screen is shown. lazy_class() factories import a screen's module on its
+first visit, keeping heavy screens out of application startup.
+
+The time Qt spends polishing each newly built screen is kept in
+polish_times (and printed with POS_STYLE_TIMING=1, see theme).
+"""
+
+import importlib
+import time
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QStackedWidget
+
+import theme
+
+DEFAULT_CAPACITY = 5
+
+
+def lazy_class(module_name, class_name):
+    """Callable building class_name from module_name, importing the module on first call"""
+    def build(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), class_name)(*args, **kwargs)
+    build.__qualname__ = f"lazy {module_name}.{class_name}"
+    return build
+
+
+class ScreenManager(QStackedWidget):
+    """Central widget switching between named, lazily built screens"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._factories = {}              # name -> (factory, retain)
+        self._alive = OrderedDict()       # name -> widget, least recently shown first
+        self._hidden_at = {}              # name -> time.monotonic() when it left the screen
+        self._current = None
+        self.polish_times = {}            # name -> seconds spent polishing its last build
+
+    def register(self, name, factory, retain=True):
+        self._factories[name] = (factory, retain)
+
+    def current_name(self):
+        return self._current
+
+    def screen(self, name):
+        """The live widget for a screen, or None if it is not built"""
+        return self._alive.get(name)
+
+    def show_screen(self, name):
+        """Raise a screen, building it on first use; returns its widget"""
+        factory, retain = self._factories[name]
+        previous = self._current
+        widget = self._alive.get(name)
+        if widget is None:
+            widget = factory()
+            self.addWidget(widget)
+            self._alive[name] = widget
+            self.polish_times[name] = theme.polish_time(widget)
+            if theme.TIMING:
+                print(f"Screen {name} polished in {self.polish_times[name] * 1000:.1f} ms")
+            hidden_for = None
+        else:
+            self._alive.move_to_end(name)
+            hidden_for = time.monotonic() - self._hidden_at.pop(name, time.monotonic())
+
+        self._current = name
+        self.setCurrentWidget(widget)
+        if previous is not None and previous != name:
+            self._hidden_at[previous] = time.monotonic()
+            if not self._factories[previous][1]:
+                self.discard(previous)
+
+        if hidden_for is not None and hasattr(widget, 'screen_shown'):
+            widget.screen_shown(hidden_for)
+        self._evict()
+        return widget
+
+    def _evict(self):
+        retained = [name for name in self._alive if self._factories[name][1]]
+        for name in retained[:max(0, len(retained) - self.capacity)]:
+            if name != self._current:
+                self.discard(name)
+
+    def discard(self, name):
+        """Destroy a screen; it is rebuilt from its factory next time"""
+        widget = self._alive.pop(name, None)
+        self._hidden_at.pop(name, None)
+        if widget is None:
+            return
+        if name == self._current:
+            self._current = None
+        self.removeWidget(widget)
+        widget.close()
+        widget.deleteLater()
+
+    def clear(self, keep=None):
+        """Destroy every screen except keep (e.g. on logout)"""
+        for name in list(self._alive):
+            if name != keep:
+                self.discard(name)
@@ -0,0 +1,116 @@
+"""
+Cold-start profiling for `python main.py --profile-startup[=FILE]`.
+
+main.py enables the profiler before its other imports, so every module
+imported from then on is timed (inclusive of what it imports in turn).
+Startup phases -- database connect, settings, main window -- are timed with
+phase(), and the run ends once the login screen has been shown: the report
+goes to stderr, and to FILE as JSON when given, so cold start can be
+compared across releases.
+
+When profiling is off, phase() and mark() cost nothing.
+"""
+
+import builtins
+import contextlib
+import json
+import sys
+import time
+
+FLAG = '--profile-startup'
+REPORT_IMPORTS = 15
+
+profiler = None
+
+
+class StartupProfiler:
+    """Import and phase timings, in seconds since the profiler was enabled"""
+
+    def __init__(self, output=None):
+        self.started = time.perf_counter()
+        self.output = output
+        self.imports = []        # (module, seconds, depth)
+        self.phases = []         # (label, seconds)
+        self.marks = []          # (label, seconds since start)
+        self._depth = 0
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = self._depth
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports.append((name, time.perf_counter() - started, depth))
+
+    @contextlib.contextmanager
+    def phase(self, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((label, time.perf_counter() - started))
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.started))
+
+    def top_imports(self, count=REPORT_IMPORTS):
+        """Slowest imports made directly by main.py"""
+        return sorted((item for item in self.imports if item[2] == 0), key=lambda item: -item[1])[:count]
+
+    def report(self):
+        total_imports = sum(seconds for _, seconds, depth in self.imports if depth == 0)
+        lines = ["", "Startup profile", f"  imports (top level)  {total_imports * 1000:8.1f} ms"]
+        lines += [f"    {name:<28} {seconds * 1000:8.1f} ms" for name, seconds, _ in self.top_imports()]
+        lines += [f"  {label:<20} {seconds * 1000:8.1f} ms" for label, seconds in self.phases]
+        lines += [f"  {label:<20} {seconds * 1000:8.1f} ms after start" for label, seconds in self.marks]
+        print("\n".join(lines), file=sys.stderr)
+
+        if self.output:
+            with open(self.output, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'imports_ms': round(total_imports * 1000, 1),
+                    'top_imports_ms': {name: round(seconds * 1000, 1) for name, seconds, _ in self.top_imports()},
+                    'phases_ms': {label: round(seconds * 1000, 1) for label, seconds in self.phases},
+                    'marks_ms': {label: round(seconds * 1000, 1) for label, seconds in self.marks},
+                }, f, indent=2)
+
+
+def requested(argv):
+    """The --profile-startup argument (True or its FILE), or None"""
+    for arg in argv[1:]:
+        if arg == FLAG:
+            return True
+        if arg.startswith(FLAG + '='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def enable(output=None):
+    global profiler
+    if profiler is None:
+        profiler = StartupProfiler(output)
+        profiler.install()
+    return profiler
+
+
+def phase(label):
+    return profiler.phase(label) if profiler is not None else contextlib.nullcontext()
+
+
+def mark(label):
+    if profiler is not None:
+        profiler.mark(label)
@@ -0,0 +1,229 @@
+"""
+Application theme: one compiled stylesheet per mode and named style classes.
+
+Widgets no longer carry their own stylesheets for recurring looks (cards,
+toolbar and keypad buttons, amounts, status badges). They are tagged with a
+styleClass and optional tone dynamic property instead,
+
+    set_style(card, 'card', 'green')
+    set_tone(self.change_display, 'red')
+
+and every rule lives in the application stylesheet, compiled from the
+light or dark palette once per mode and cached with its QPalette. Creating
+a tagged widget therefore parses no stylesheet, and switching a tone only
+repolishes that widget.
+
+polish_time() measures how long Qt spends polishing a screen; the screen
+manager logs it for every screen it builds when POS_STYLE_TIMING=1.
+"""
+
+import os
+import time
+from functools import lru_cache
+from string import Template
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPalette
+
+TIMING = os.getenv('POS_STYLE_TIMING', '') not in ('', '0')
+
+LIGHT = {
+    'window_top': '#f3f4f6', 'window_bottom': '#e5e7eb',
+    'surface': 'white', 'surface_alt': '#f9fafb', 'border': '#e5e7eb',
+    'text': '#1f2937', 'text_muted': '#6b7280', 'heading': '#374151',
+    'accent': '#10b981', 'accent_top': '#10b981', 'accent_bottom': '#059669',
+    'accent_hover': '#34d399', 'accent_pressed': '#047857', 'accent_text': 'white',
+    'selection': '#d1fae5', 'selection_text': '#065f46',
+    'tab': '#f3f4f6', 'tab_hover': '#e5e7eb', 'chip': '#f8f9fa', 'chip_hover': '#e9ecef',
+}
+
+DARK = dict(LIGHT, **{
+    'window_top': '#18181b', 'window_bottom': '#18181b',
+    'surface': '#111115', 'surface_alt': '#202022', 'border': '#27272a',
+    'text': '#e5e7eb', 'text_muted': '#a3a3a3', 'heading': '#d1d5db',
+    'accent_top': '#10b981', 'accent_bottom': '#10b981',
+    'accent_pressed': '#059669', 'accent_text': '#081016',
+    'selection': '#064e3b', 'selection_text': '#ecfdf5',
+    'tab': '#202022', 'tab_hover': '#27272a', 'chip': '#202022', 'chip_hover': '#27272a',
+})
+
+# Accent colors a widget can take through its tone property
+TONES = {
+    'green': '#22c55e', 'red': '#ef4444', 'amber': '#f59e0b', 'yellow': '#fbbf24',
+    'sky': '#0ea5e9', 'blue': '#3b82f6', 'violet': '#6d28d9', 'purple': '#9b59b6',
+    'teal': '#20c997', 'orange': '#fd7e14', 'gray': '#6b7280',
+}
+
+BASE_RULES = """
+QMainWindow {
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 $window_top, stop:1 $window_bottom);
+    font-family: 'Segoe UI', 'Arial', sans-serif;
+}
+QPushButton {
+    border: none; border-radius: 8px; padding: 12px 20px;
+    font-weight: 600; font-size: 14px; color: $accent_text;
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 $accent_top, stop:1 $accent_bottom);
+}
+QPushButton:hover { background: $accent_hover; }
+QPushButton:pressed { background: $accent_pressed; }
+QLineEdit, QTextEdit, QComboBox, QDateEdit {
+    border: 2px solid $border; border-radius: 8px; padding: 12px 16px; font-size: 14px;
+    background-color: $surface; color: $text;
+    selection-background-color: $accent; selection-color: $selection_text;
+}
+QLineEdit:focus, QTextEdit:focus, QComboBox:focus, QDateEdit:focus { border-color: $accent; }
+QLabel { color: $text; font-size: 14px; }
+QTableWidget, QTableView {
+    border: 1px solid $border; border-radius: 8px; background-color: $surface; color: $text;
+    gridline-color: $border; font-size: 13px;
+    selection-background-color: $selection; selection-color: $selection_text;
+}
+QTableWidget::item { padding: 10px; border-bottom: 1px solid $border; }
+QTableWidget::item:selected { background-color: $selection; color: $selection_text; }
+QHeaderView::section {
+    background: $surface_alt; padding: 12px; border: none; border-bottom: 2px solid $border;
+    font-weight: 600; font-size: 12px; color: $heading;
+}
+QGroupBox {
+    font-weight: 600; font-size: 16px; border: 2px solid $border; border-radius: 8px;
+    margin-top: 12px; padding-top: 16px; background-color: $surface;
+}
+QGroupBox::title {
+    subcontrol-origin: margin; left: 12px; padding: 0 8px; color: $heading; background-color: $surface;
+}
+QTabWidget::pane { border: 1px solid $border; border-radius: 8px; background-color: $surface; margin-top: -1px; }
+QTabBar::tab {
+    background: $tab; padding: 12px 24px; margin-right: 2px;
+    border-top-left-radius: 8px; border-top-right-radius: 8px; font-weight: 600; color: $text_muted;
+}
+QTabBar::tab:selected { background: $surface; color: $accent; border-bottom: 2px solid $accent; }
+QTabBar::tab:hover:!selected { background: $tab_hover; }
+"""
+
+# Dark mode also repaints the plain containers that screens leave white
+DARK_RULES = """
+QWidget { background-color: $window_top; color: $text; }
+"""
+
+CLASS_RULES = """
+*[styleClass="panel"] { background: $surface; border: 1px solid $border; border-radius: 8px; }
+*[styleClass="display"] { background: $surface_alt; border: 2px solid $border; border-radius: 12px; }
+*[styleClass="card"] {
+    background: $surface; border: 1px solid $border; border-left: 4px solid $border; border-radius: 8px;
+}
+*[styleClass="tile"] {
+    background: $surface; border: 1px solid $border; border-left: 4px solid $border; border-radius: 10px;
+}
+*[styleClass="tile"]:hover { background: $surface_alt; }
+QLabel[styleClass="tile-title"] { font-size: 14px; font-weight: bold; color: $heading; background: transparent; border: none; }
+QLabel[styleClass="card-icon"] { font-size: 28px; background: transparent; border: none; }
+QLabel[styleClass="card-value"] { font-size: 22px; font-weight: 700; background: transparent; border: none; }
+QLabel[styleClass="card-title"] {
+    font-size: 12px; font-weight: 600; color: $text_muted; background: transparent; border: none;
+}
+QLabel[styleClass="card-subtext"] { font-size: 11px; color: $text_muted; background: transparent; border: none; }
+QLabel[styleClass="amount"] {
+    font-size: 20px; font-weight: 600; font-family: 'Courier New', monospace; background: $surface;
+    padding: 8px 12px; border-radius: 6px; border: 2px solid $border;
+}
+QLabel[styleClass="status"] { font-size: 13px; font-weight: 600; background: transparent; border: none; }
+QPushButton[styleClass="nav"] {
+    color: white; border-radius: 6px; padding: 8px 12px; font-size: 13px;
+}
+QPushButton[styleClass="pad"] {
+    color: white; border-radius: 8px; padding: 12px 8px; font-size: 11px; min-height: 60px;
+}
+QPushButton[styleClass="row-action"] { color: white; border-radius: 4px; padding: 4px 8px; font-weight: bold; }
+QPushButton[styleClass="chip"] {
+    background: $chip; color: $heading; border: 1px solid $border; border-radius: 4px;
+    padding: 6px 12px; font-size: 12px; font-weight: normal; margin-left: 5px;
+}
+QPushButton[styleClass="chip"]:hover { background: $chip_hover; }
+"""
+
+TONE_RULES = """
+QLabel[tone="$tone"] { color: $color; }
+QPushButton[tone="$tone"] { background: $color; }
+QPushButton[tone="$tone"]:hover { background: $hover; }
+QPushButton[tone="$tone"]:pressed { background: $pressed; }
+*[styleClass="card"][tone="$tone"], *[styleClass="tile"][tone="$tone"] { border-left-color: $color; }
+*[styleClass="tile"][tone="$tone"]:hover { border-color: $color; }
+QLabel[styleClass="amount"][tone="$tone"] { border-color: $color; }
+"""
+
+
+@lru_cache(maxsize=None)
+def stylesheet(dark=False):
+    """The application stylesheet for a mode, compiled once"""
+    colors = DARK if dark else LIGHT
+    # Later rules win ties, so the catch-all dark rule goes first
+    parts = [Template(DARK_RULES).substitute(colors)] if dark else []
+    parts.append(Template(BASE_RULES).substitute(colors))
+    parts.append(Template(CLASS_RULES).substitute(colors))
+    for tone, color in TONES.items():
+        parts.append(Template(TONE_RULES).substitute(
+            tone=tone, color=color,
+            hover=QColor(color).darker(115).name(), pressed=QColor(color).darker(130).name()))
+    return "".join(parts)
+
+
+@lru_cache(maxsize=None)
+def palette(dark=False):
+    """The application palette for a mode, built once"""
+    if not dark:
+        return QPalette()
+    result = QPalette()
+    result.setColor(QPalette.Window, QColor(24, 24, 27))
+    result.setColor(QPalette.Base, QColor(17, 17, 19))
+    result.setColor(QPalette.AlternateBase, QColor(32, 32, 36))
+    result.setColor(QPalette.WindowText, QColor(229, 231, 235))
+    result.setColor(QPalette.Text, QColor(229, 231, 235))
+    result.setColor(QPalette.ButtonText, QColor(229, 231, 235))
+    result.setColor(QPalette.ToolTipBase, QColor(17, 17, 19))
+    result.setColor(QPalette.ToolTipText, QColor(229, 231, 235))
+    result.setColor(QPalette.Button, QColor(38, 38, 42))
+    result.setColor(QPalette.Highlight, QColor(16, 185, 129))
+    result.setColor(QPalette.HighlightedText, QColor(17, 24, 39))
+    result.setColor(QPalette.BrightText, QColor(239, 68, 68))
+    return result
+
+
+_applied = None
+
+
+def apply_theme(app, dark=False):
+    """Install the palette and stylesheet for a mode; a no-op if already installed"""
+    global _applied
+    if _applied == dark:
+        return
+    app.setStyle("Fusion")
+    app.setPalette(palette(dark))
+    app.setStyleSheet(stylesheet(dark))
+    _applied = dark
+
+
+def set_style(widget, style_class, tone=None):
+    """Tag a widget with a style class (and tone) from the application stylesheet"""
+    widget.setProperty('styleClass', style_class)
+    if tone is not None:
+        widget.setProperty('tone', tone)
+    # Plain QWidgets only paint stylesheet borders and backgrounds with this set
+    widget.setAttribute(Qt.WA_StyledBackground, True)
+    return widget
+
+
+def set_tone(widget, tone):
+    """Change a widget's tone, repolishing it only when the tone actually changes"""
+    if widget.property('tone') == tone:
+        return
+    widget.setProperty('tone', tone)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+
+
+def polish_time(widget):
+    """Seconds Qt spends polishing widget and its children (0 if already polished)"""
+    started = time.perf_counter()
+    widget.ensurePolished()
+    return time.perf_counter() - started
@@ -2,17 +2,23 @@ import sys
 from datetime import datetime
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QPushButton, QTableWidget, QTableWidgetItem, QTableView, QHeaderView,
                              QComboBox, QDialog, QFormLayout, QMessageBox, QAbstractItemView,
                              QTextEdit, QDateEdit)
-from PyQt5.QtGui import QColor
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import QDate
 import json
+from mysql_config import MySQLConnectionManager
+from sales_ledger import delete_sale_lines
+from date_ranges import custom_range
+from query_worker import QueryRunner
+from ticket_table_model import TicketTableModel, ACTIONS_COLUMN, ACTION_BUTTONS, ITEMS
+from action_delegate import ActionButtonsDelegate
 
 class TicketManagementWidget(QWidget):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        self.queries = QueryRunner(self)
         self.init_ui()
         self.load_tickets()
     
@@ -135,48 +141,62 @@ class TicketManagementWidget(QWidget):
         """)
         filter_btn.clicked.connect(self.filter_tickets)
         
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size: 14px; color: #6c757d;")
+        
         filter_layout.addWidget(date_label)
         filter_layout.addWidget(self.date_from)
         filter_layout.addWidget(to_label)
         filter_layout.addWidget(self.date_to)
         filter_layout.addWidget(filter_btn)
         filter_layout.addStretch()
+        filter_layout.addWidget(self.status_label)
         
         # Tickets table
-        self.tickets_table = QTableWidget()
-        self.tickets_table.setColumnCount(6)
-        self.tickets_table.setHorizontalHeaderLabels([
-            "Ticket #", "Date", "Total", "Discount", "Items", "Actions"
-        ])
-        
-        # Set column widths
+        self.tickets_model = TicketTableModel(self.queries, self)
+        self.tickets_model.status_changed.connect(self.update_status)
+        self.tickets_table = QTableView()
+        self.tickets_table.setModel(self.tickets_model)
+        
+        self.actions_delegate = ActionButtonsDelegate(ACTION_BUTTONS, self.tickets_table)
+        self.actions_delegate.clicked.connect(self.on_action_clicked)
+        self.tickets_table.setItemDelegateForColumn(ACTIONS_COLUMN, self.actions_delegate)
+        self.tickets_table.setMouseTracking(True)
+        self.tickets_table.doubleClicked.connect(
+            lambda index: self.view_ticket(self.tickets_model.ticket(index.row())))
+        
+        # Fixed column and row sizes: the view never measures rows it has not shown
         header = self.tickets_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setSectionResizeMode(4, QHeaderView.Stretch)
-        header.setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        for column, width in enumerate((140, 170, 110, 110, 0, 150)):
+            if width:
+                self.tickets_table.setColumnWidth(column, width)
+        rows = self.tickets_table.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(44)
+        rows.hide()
         
         self.tickets_table.setAlternatingRowColors(True)
         self.tickets_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tickets_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tickets_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: white;
                 border: 1px solid #dee2e6;
                 border-radius: 8px;
                 gridline-color: #f1f3f4;
                 font-size: 13px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px 8px;
                 border-bottom: 1px solid #f8f9fa;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background: #e3f2fd;
                 color: #1976d2;
             }
-            QTableWidget::item:alternate {
+            QTableView::item:alternate {
                 background: #f8f9fa;
             }
             QHeaderView::section {
@@ -195,190 +215,36 @@ class TicketManagementWidget(QWidget):
         self.setLayout(main_layout)
     
     def load_tickets(self):
-        """Load tickets into table"""
-        cursor = self.parent.conn.cursor()
-        cursor.execute('SELECT * FROM tickets ORDER BY date DESC')
-        tickets = cursor.fetchall()
-        
-        self.tickets_table.setRowCount(len(tickets))
-        
-        for row, ticket in enumerate(tickets):
-            # Ticket number
-            number_item = QTableWidgetItem(str(ticket[1]))
-            number_item.setTextAlignment(Qt.AlignCenter)
-            self.tickets_table.setItem(row, 0, number_item)
-            
-            # Date
-            date_item = QTableWidgetItem(ticket[2])
-            self.tickets_table.setItem(row, 1, date_item)
-            
-            # Total
-            total_item = QTableWidgetItem(f"{ticket[3]:.2f} DA")
-            total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.tickets_table.setItem(row, 2, total_item)
-            
-            # Discount
-            discount_item = QTableWidgetItem(f"{ticket[4]:.2f} DA")
-            discount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.tickets_table.setItem(row, 3, discount_item)
-            
-            # Items summary
-            try:
-                items = json.loads(ticket[5]) if ticket[5] else []
-                items_summary = f"{len(items)} items"
-                if items:
-                    first_item = items[0]['name'] if 'name' in items[0] else 'Item'
-                    if len(items) > 1:
-                        items_summary = f"{first_item} + {len(items)-1} more"
-                    else:
-                        items_summary = first_item
-            except:
-                items_summary = "No items"
-            
-            items_item = QTableWidgetItem(items_summary)
-            self.tickets_table.setItem(row, 4, items_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout()
-            actions_layout.setContentsMargins(5, 5, 5, 5)
-            
-            view_btn = QPushButton("View")
-            view_btn.setStyleSheet("""
-                QPushButton {
-                    background: #17a2b8;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #138496;
-                }
-            """)
-            view_btn.clicked.connect(lambda checked, t=ticket: self.view_ticket(t))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #dc3545;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #c82333;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, t=ticket: self.delete_ticket(t))
-            
-            actions_layout.addWidget(view_btn)
-            actions_layout.addWidget(delete_btn)
-            actions_widget.setLayout(actions_layout)
-            
-            self.tickets_table.setCellWidget(row, 5, actions_widget)
+        """Browse all tickets, newest first"""
+        self.tickets_model.set_period(None)
     
     def filter_tickets(self):
         """Filter tickets by date range"""
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-        
-        cursor = self.parent.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM tickets 
-            WHERE date BETWEEN ? AND ? 
-            ORDER BY date DESC
-        ''', (date_from, date_to))
-        
-        tickets = cursor.fetchall()
-        self.tickets_table.setRowCount(len(tickets))
-        
-        for row, ticket in enumerate(tickets):
-            # Same logic as load_tickets but for filtered results
-            # Ticket number
-            number_item = QTableWidgetItem(str(ticket[1]))
-            number_item.setTextAlignment(Qt.AlignCenter)
-            self.tickets_table.setItem(row, 0, number_item)
-            
-            # Date
-            date_item = QTableWidgetItem(ticket[2])
-            self.tickets_table.setItem(row, 1, date_item)
-            
-            # Total
-            total_item = QTableWidgetItem(f"{ticket[3]:.2f} DA")
-            total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.tickets_table.setItem(row, 2, total_item)
-            
-            # Discount
-            discount_item = QTableWidgetItem(f"{ticket[4]:.2f} DA")
-            discount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.tickets_table.setItem(row, 3, discount_item)
-            
-            # Items summary
-            try:
-                items = json.loads(ticket[5]) if ticket[5] else []
-                items_summary = f"{len(items)} items"
-                if items:
-                    first_item = items[0]['name'] if 'name' in items[0] else 'Item'
-                    if len(items) > 1:
-                        items_summary = f"{first_item} + {len(items)-1} more"
-                    else:
-                        items_summary = first_item
-            except:
-                items_summary = "No items"
-            
-            items_item = QTableWidgetItem(items_summary)
-            self.tickets_table.setItem(row, 4, items_item)
-            
-            # Actions
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout()
-            actions_layout.setContentsMargins(5, 5, 5, 5)
-            
-            view_btn = QPushButton("View")
-            view_btn.setStyleSheet("""
-                QPushButton {
-                    background: #17a2b8;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #138496;
-                }
-            """)
-            view_btn.clicked.connect(lambda checked, t=ticket: self.view_ticket(t))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background: #dc3545;
-                    color: white;
-                    padding: 6px 12px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 12px;
-                    font-weight: 600;
-                }
-                QPushButton:hover {
-                    background: #c82333;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, t=ticket: self.delete_ticket(t))
-            
-            actions_layout.addWidget(view_btn)
-            actions_layout.addWidget(delete_btn)
-            actions_widget.setLayout(actions_layout)
-            
-            self.tickets_table.setCellWidget(row, 5, actions_widget)
+        period = custom_range(self.date_from.date().toString("yyyy-MM-dd"),
+                              self.date_to.date().toString("yyyy-MM-dd"))
+        self.tickets_model.set_period(period)
+    
+    def screen_shown(self, hidden_for):
+        """Back on screen: pick up the tickets sold meanwhile"""
+        self.tickets_model.reload()
+    
+    def update_status(self):
+        """Loaded/total ticket counter next to the filter"""
+        model = self.tickets_model
+        if model.error:
+            self.status_label.setText("Failed to load tickets")
+        elif model.total is None:
+            self.status_label.setText("Loading…")
+        else:
+            self.status_label.setText(f"Showing {model.rowCount():,} of {model.total:,} tickets")
+    
+    def on_action_clicked(self, row, button):
+        """View (0) or Delete (1) button of a ticket row"""
+        ticket = self.tickets_model.ticket(row)
+        if button == 0:
+            self.view_ticket(ticket)
+        else:
+            self.delete_ticket(ticket)
     
     def view_ticket(self, ticket):
         """View ticket details"""
@@ -392,11 +258,11 @@ class TicketManagementWidget(QWidget):
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                cursor = self.parent.conn.cursor()
-                cursor.execute('DELETE FROM tickets WHERE id = ?', (ticket[0],))
-                self.parent.conn.commit()
+                with MySQLConnectionManager() as (cursor, conn):
+                    delete_sale_lines(cursor, ticket[0])
+                    cursor.execute('DELETE FROM tickets WHERE id = %s', (ticket[0],))
                 QMessageBox.information(self, "Success", "Ticket deleted successfully!")
-                self.load_tickets()
+                self.tickets_model.reload()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete ticket: {str(e)}")
 
@@ -442,7 +308,7 @@ class TicketViewDialog(QDialog):
         items_table.setHorizontalHeaderLabels(["Product", "Quantity", "Price", "Total"])
         
         try:
-            items = json.loads(self.ticket[5]) if self.ticket[5] else []
+            items = json.loads(self.ticket[ITEMS]) if self.ticket[ITEMS] else []
             items_table.setRowCount(len(items))
             
             for row, item in enumerate(items):
@@ -0,0 +1,183 @@
+"""
+Ticket numbers from a shared sequence, handed out to lanes in blocks.
+
+The number_sequences table holds the next free value of each sequence. A
+lane reserves BLOCK_SIZE numbers with one UPDATE committed on its own
+connection, then mints numbers locally until the block runs out, so lanes
+touch the sequence row once per block instead of once per sale and never
+hand out the same number twice. Numbers of a block left unused when a lane
+closes, and of sales that were rolled back, are skipped: the sequence is
+unique and increasing, not gapless.
+
+The printed form is a str.format template with {number}, {store}, {lane}
+and {date} fields, read from the settings table:
+
+    ticket_number_format            store-wide template
+    ticket_number_format.<lane>     template for one lane
+    store_code                      value of {store}
+
+The lane name comes from the POS_LANE environment variable, or the host name.
+The template is read again with every block, so edits reach the other
+lanes within BLOCK_SIZE sales; the lane that saved them reloads at once.
+Checkout and replication share the lane's numberer (get_numberer).
+
+Offline, a lane keeps minting from the block it holds; once that runs out,
+sales get a provisional number from the lane's journal (lane, date and
+journal sequence, see provisional_ticket_number) that the ticket keeps.
+A ticket checked out with no number at all is numbered from its row id in
+the configured format, behind FALLBACK_PREFIX so it cannot take a number
+the sequence hands out.
+"""
+
+import os
+import socket
+import threading
+from datetime import datetime
+
+from mysql_config import MySQLConnectionManager
+
+SEQUENCE_NAME = 'tickets'
+BLOCK_SIZE = 50
+DEFAULT_FORMAT = 'TKT{number:06d}'
+PROVISIONAL_FORMAT = '{lane}-{date:%y%m%d}-{serial:05d}'
+FALLBACK_PREFIX = 'R-'          # row-id numbers share the range of the sequence
+
+
+def ensure_ticket_sequence(cursor):
+    """Sequence table, starting the ticket sequence past every number issued so far"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS number_sequences (
+            name VARCHAR(64) PRIMARY KEY,
+            next_value BIGINT NOT NULL
+        )
+    ''')
+    # Earlier numbers were COUNT(*) + 1 or the ticket id, both at most MAX(id)
+    cursor.execute('''
+        INSERT IGNORE INTO number_sequences (name, next_value)
+        SELECT %s, COALESCE(MAX(id), 0) + 1 FROM tickets
+    ''', (SEQUENCE_NAME,))
+
+
+def allocate_block(cursor, size=BLOCK_SIZE, name=SEQUENCE_NAME):
+    """Reserve size values of a sequence; returns the range [start, end)"""
+    cursor.execute('UPDATE number_sequences SET next_value = LAST_INSERT_ID(next_value + %s) WHERE name = %s',
+                   (size, name))
+    if cursor.rowcount != 1:
+        raise LookupError(f"Sequence '{name}' does not exist")
+    cursor.execute('SELECT LAST_INSERT_ID()')
+    end = cursor.fetchone()[0]
+    return end - size, end
+
+
+def lane_name():
+    return os.getenv('POS_LANE') or socket.gethostname()
+
+
+def load_number_format(cursor, lane):
+    """(template, store code) for a lane, falling back to the store-wide template"""
+    cursor.execute('SELECT `key`, value FROM settings WHERE `key` IN (%s, %s, %s)',
+                   ('ticket_number_format', f'ticket_number_format.{lane}', 'store_code'))
+    settings = dict(cursor.fetchall())
+    template = (settings.get(f'ticket_number_format.{lane}') or settings.get('ticket_number_format')
+                or DEFAULT_FORMAT)
+    return template, settings.get('store_code') or ''
+
+
+def format_ticket_number(template, number, store='', lane='', date=None):
+    return template.format(number=number, store=store, lane=lane, date=date or datetime.now())
+
+
+def fallback_ticket_number(cursor, ticket_id, date=None, lane=None):
+    """Number for a ticket checked out without one, from its row id in the configured format"""
+    lane = lane or lane_name()
+    template, store = load_number_format(cursor, lane)
+    try:
+        number = format_ticket_number(template, ticket_id, store, lane, date)
+    except (KeyError, IndexError, ValueError):
+        number = format_ticket_number(DEFAULT_FORMAT, ticket_id)
+    return FALLBACK_PREFIX + number
+
+
+def provisional_ticket_number(serial, date=None, lane=None):
+    """Lane-local number for a sale made while the sequence was out of reach"""
+    return PROVISIONAL_FORMAT.format(lane=(lane or lane_name())[:32], date=date or datetime.now(), serial=serial)
+
+
+class TicketNumberer:
+    """Mints ticket numbers for one lane from blocks of the shared sequence"""
+
+    def __init__(self, lane=None, block_size=BLOCK_SIZE):
+        self.lane = lane or lane_name()
+        self.block_size = block_size
+        self.template = None
+        self.store = ''
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """(number, template, store) from the block held, or None once it is spent"""
+        with self._lock:
+            if self._next >= self._end:
+                return None
+            number = self._next
+            self._next += 1
+            return number, self.template, self.store
+
+    def top_up(self):
+        """Reserve a new block if the one held is spent
+
+        The round trip to MySQL is made outside the lock, so minting from a
+        block never waits on the server; a block reserved by two callers at
+        once is simply skipped.
+        """
+        with self._lock:
+            if self._next < self._end:
+                return
+        with MySQLConnectionManager() as (cursor, conn):
+            template, store = load_number_format(cursor, self.lane)
+            start, end = allocate_block(cursor, self.block_size)
+        with self._lock:
+            self.template, self.store = template, store
+            if self._next >= self._end:
+                self._next, self._end = start, end
+
+    def next_number(self, date=None, reserve=True):
+        """Next ticket number, or None when the sequence is unavailable
+
+        Without reserve only the block already held is used (no MySQL round
+        trip), and None comes back once it is spent.
+        """
+        taken = self._take()
+        if taken is None and reserve:
+            try:
+                self.top_up()
+            except Exception as e:
+                print(f"Ticket sequence unavailable: {e}")
+                return None
+            taken = self._take()
+        if taken is None:
+            return None
+        number, template, store = taken
+        try:
+            return format_ticket_number(template, number, store, self.lane, date)
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"Invalid ticket number format {template!r}: {e}")
+            return format_ticket_number(DEFAULT_FORMAT, number)
+
+    def reload_format(self):
+        """Number with the template saved in the settings from now on, keeping the block"""
+        with MySQLConnectionManager() as (cursor, conn):
+            template, store = load_number_format(cursor, self.lane)
+        with self._lock:
+            self.template, self.store = template, store
+
+
+_numberer = None
+
+
+def get_numberer():
+    """The lane's numberer, shared by checkout and replication so they draw on one block"""
+    global _numberer
+    if _numberer is None:
+        _numberer = TicketNumberer()
+    return _numberer
@@ -0,0 +1,176 @@
+"""
+Ticket history model.
+
+TicketTableModel browses tickets newest first with keyset pages on
+(date, id): each page is one indexed range read whatever the size of the
+history, and pages are fetched on the view's QueryRunner as the table is
+scrolled. The total shown next to the filter comes from a separate
+COUNT(*) in the background. Item summaries are parsed from the items JSON
+the first time a row is painted.
+"""
+
+import json
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+# Same column order as the tickets table, which TicketViewDialog indexes into
+TICKET_COLUMNS = 'id, ticket_number, date, total_price, remis, payment_method, customer_name, items, status, cashier_id'
+ITEMS = 7
+HEADERS = ["Ticket #", "Date", "Total", "Discount", "Items", "Actions"]
+ACTIONS_COLUMN = 5
+ACTION_BUTTONS = (("View", "#17a2b8", "#138496"), ("Delete", "#dc3545", "#c82333"))
+FETCH_BATCH = 100
+
+
+def fetch_ticket_page(cursor, period=None, after=None, limit=FETCH_BATCH):
+    """Next page of tickets before the (date, id) key, newest first"""
+    conditions, params = [], []
+    if period:
+        conditions.append(period.sql('date'))
+        params += period.params()
+    if after:
+        conditions.append('(date < %s OR (date = %s AND id < %s))')
+        params += [after[0], after[0], after[1]]
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor.execute(f'''
+        SELECT {TICKET_COLUMNS} FROM tickets
+        {where}
+        ORDER BY date DESC, id DESC
+        LIMIT %s
+    ''', params + [limit])
+    return cursor.fetchall()
+
+
+def fetch_ticket_count(cursor, period=None):
+    if period:
+        cursor.execute(f"SELECT COUNT(*) FROM tickets WHERE {period.sql('date')}", period.params())
+    else:
+        cursor.execute('SELECT COUNT(*) FROM tickets')
+    return cursor.fetchone()[0]
+
+
+def items_summary(items_json):
+    """'First item + N more' from a ticket's items JSON"""
+    try:
+        items = json.loads(items_json) if items_json else []
+        if not items:
+            return "0 items"
+        first_item = items[0].get('name', 'Item')
+        if len(items) > 1:
+            return f"{first_item} + {len(items) - 1} more"
+        return first_item
+    except (ValueError, TypeError, AttributeError):
+        return "No items"
+
+
+class TicketTableModel(QAbstractTableModel):
+    """Tickets of a DateRange (None for all), loaded a page at a time in the background"""
+
+    # Emitted when the loaded row count, the total or the loading state changes
+    status_changed = pyqtSignal()
+
+    def __init__(self, queries, parent=None):
+        super().__init__(parent)
+        self.queries = queries
+        self._rows = []
+        self._summaries = {}
+        self._period = None
+        self._exhausted = True
+        self._pending = False
+        self.total = None
+        self.error = None
+
+    def set_period(self, period=None):
+        """Drop the loaded rows and browse the DateRange from its newest ticket"""
+        self.beginResetModel()
+        self._rows = []
+        self._summaries = {}
+        self._period = period
+        self._exhausted = False
+        self._pending = False
+        self.total = None
+        self.error = None
+        self.endResetModel()
+
+        self.queries.submit('ticket_count', fetch_ticket_count, self._set_total, period)
+        self.fetchMore(QModelIndex())
+
+    def reload(self):
+        self.set_period(self._period)
+
+    def ticket(self, row):
+        return self._rows[row]
+
+    @property
+    def loading(self):
+        return self._pending or self.total is None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._pending
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        after = (self._rows[-1][2], self._rows[-1][0]) if self._rows else None
+        self._pending = True
+        self.queries.submit('ticket_page', fetch_ticket_page, self._append_page,
+                            self._period, after, on_error=self._page_failed)
+        self.status_changed.emit()
+
+    def _append_page(self, page):
+        self._pending = False
+        if len(page) < FETCH_BATCH:
+            self._exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+        self.status_changed.emit()
+
+    def _page_failed(self, message):
+        self._pending = False
+        self._exhausted = True
+        self.error = message
+        self.status_changed.emit()
+
+    def _set_total(self, total):
+        self.total = int(total)
+        self.status_changed.emit()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        ticket = self._rows[row]
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(ticket[1])
+            if column == 1:
+                return str(ticket[2])
+            if column == 2:
+                return f"{ticket[3]:.2f} DA"
+            if column == 3:
+                return f"{ticket[4]:.2f} DA"
+            if column == 4:
+                if row not in self._summaries:
+                    self._summaries[row] = items_summary(ticket[ITEMS])
+                return self._summaries[row]
+        elif role == Qt.TextAlignmentRole:
+            if column == 0:
+                return Qt.AlignCenter
+            if column in (2, 3):
+                return Qt.AlignRight | Qt.AlignVCenter
+        return None
@@ -0,0 +1,212 @@
+"""
+Unknown barcodes: collected off the GUI thread, reviewed in bulk.
+
+A scan that matches no product used to be INSERTed (and committed) on the
+GUI thread, one row per scan, so a faulty label scanned over and over
+flooded the table. Scans now go to the process-wide collector:
+record() only updates an in-memory tally, and a code counts at most once
+per DEDUP_SECONDS, however often it is scanned in between. A background thread flushes the
+tally every FLUSH_SECONDS in one batch that upserts unknown_barcodes (one
+row per code with scan_count and last_seen). If MySQL is unreachable, the
+tally is kept and sent with the next flush.
+
+The review screen (unknown_barcodes_widget) lists unresolved codes and
+attaches them to products in one transaction.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from mysql_config import MySQLConnectionManager
+
+DEDUP_SECONDS = 10.0
+FLUSH_SECONDS = 5.0
+MAX_PENDING = 5000          # distinct codes held while the server is unreachable
+
+
+def ensure_unknown_barcode_counts(cursor):
+    """One unknown_barcodes row per code, with scan_count and last_seen"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'unknown_barcodes' AND column_name = 'scan_count'
+    ''')
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute('ALTER TABLE unknown_barcodes ADD COLUMN scan_count INT NOT NULL DEFAULT 1, '
+                   'ADD COLUMN last_seen DATETIME NULL')
+    # Fold the one-row-per-scan history into the first row of each code
+    cursor.execute('''
+        UPDATE unknown_barcodes u
+        JOIN (SELECT MIN(id) AS id, COUNT(*) AS scans, MAX(scan_date) AS last_seen, MIN(resolved) AS resolved
+              FROM unknown_barcodes GROUP BY barcode) g ON u.id = g.id
+        SET u.scan_count = g.scans, u.last_seen = g.last_seen, u.resolved = g.resolved
+    ''')
+    cursor.execute('''
+        DELETE u FROM unknown_barcodes u
+        JOIN (SELECT barcode, MIN(id) AS id FROM unknown_barcodes GROUP BY barcode) g
+          ON u.barcode = g.barcode AND u.id <> g.id
+    ''')
+    cursor.execute('UPDATE unknown_barcodes SET last_seen = scan_date WHERE last_seen IS NULL')
+    cursor.execute('CREATE UNIQUE INDEX uq_unknown_barcodes_barcode ON unknown_barcodes (barcode)')
+
+
+def upsert_sightings(cursor, sightings):
+    """Add {code: (count, first_seen, last_seen)} to unknown_barcodes; a resolved code seen again reopens"""
+    cursor.executemany('''
+        INSERT INTO unknown_barcodes (barcode, scan_date, last_seen, scan_count)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE scan_count = scan_count + VALUES(scan_count),
+                                last_seen = GREATEST(COALESCE(last_seen, scan_date), VALUES(last_seen)),
+                                resolved = 0
+    ''', [(code, first, last, count) for code, (count, first, last) in sightings.items()])
+
+
+def fetch_unresolved(cursor, limit=1000):
+    """[(barcode, scan_count, first seen, last seen)], most scanned first"""
+    cursor.execute('''
+        SELECT barcode, scan_count, scan_date, COALESCE(last_seen, scan_date)
+        FROM unknown_barcodes WHERE resolved = 0
+        ORDER BY scan_count DESC, last_seen DESC LIMIT %s
+    ''', (limit,))
+    return cursor.fetchall()
+
+
+def barcode_conflicts(cursor, assignments):
+    """Problems with {barcode: product_id} before attaching: [message]"""
+    problems = []
+    product_ids = list(assignments.values())
+    for product_id in set(product_ids):
+        if product_ids.count(product_id) > 1:
+            codes = ', '.join(code for code, pid in assignments.items() if pid == product_id)
+            problems.append(f"One product can only take one barcode: {codes}")
+    codes = list(assignments)
+    if not codes:
+        return problems
+    placeholders = ', '.join(['%s'] * len(codes))
+    cursor.execute(f'SELECT code_bar, name FROM products WHERE code_bar IN ({placeholders})', codes)
+    for code, name in cursor.fetchall():
+        problems.append(f"{code} already belongs to {name}")
+    return problems
+
+
+def attach_barcodes(cursor, assignments):
+    """Give each product its barcode and resolve the codes; runs in the caller's transaction"""
+    cursor.executemany('UPDATE products SET code_bar = %s WHERE id = %s',
+                       [(code, product_id) for code, product_id in assignments.items()])
+    resolve_barcodes(cursor, list(assignments))
+
+
+def resolve_barcodes(cursor, codes):
+    """Take codes off the review list (attached, or dismissed as bad labels)"""
+    cursor.executemany('UPDATE unknown_barcodes SET resolved = 1 WHERE barcode = %s', [(code,) for code in codes])
+
+
+class UnknownBarcodeCollector(threading.Thread):
+    """Tallies unknown scans in memory and upserts them in batches from its own thread"""
+
+    def __init__(self, dedup_seconds=DEDUP_SECONDS, flush_seconds=FLUSH_SECONDS):
+        super().__init__(name='unknown-barcodes', daemon=True)
+        self.dedup_seconds = dedup_seconds
+        self.flush_seconds = flush_seconds
+        self.recorded = 0            # sightings counted since start
+        self.suppressed = 0          # repeats inside the dedup window
+        self.dropped = 0             # new codes refused while MAX_PENDING were waiting
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pending = {}           # code -> [count, first_seen, last_seen]
+        self._last_sighting = {}     # code -> time.monotonic() of its last counted sighting
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def record(self, code):
+        """Count a scan of an unknown code; True if it is a new sighting, False for a repeat"""
+        code = (code or '').strip()
+        if not code:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            # Repeats do not move the window, or a label scanned over and over would never count again
+            previous = self._last_sighting.get(code)
+            if previous is not None and now - previous < self.dedup_seconds:
+                self.suppressed += 1
+                return False
+            self._last_sighting[code] = now
+            seen = datetime.now()
+            entry = self._pending.get(code)
+            if entry is None:
+                if len(self._pending) >= MAX_PENDING:
+                    self.dropped += 1
+                    return True
+                self._pending[code] = [1, seen, seen]
+            else:
+                entry[0] += 1
+                entry[2] = seen
+            self.recorded += 1
+            if len(self._last_sighting) > MAX_PENDING:
+                self._forget_old_sightings(now)
+        return True
+
+    def _forget_old_sightings(self, now):
+        self._last_sighting = {code: at for code, at in self._last_sighting.items()
+                               if now - at < self.dedup_seconds}
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Upsert the tally now; on failure it is kept for the next flush"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            with MySQLConnectionManager() as (cursor, conn):
+                upsert_sightings(cursor, {code: tuple(entry) for code, entry in batch.items()})
+            self.last_error = None
+            return len(batch)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error logging unknown barcodes: {e}")
+            with self._lock:
+                for code, (count, first, last) in batch.items():
+                    entry = self._pending.get(code)
+                    if entry is None:
+                        self._pending[code] = [count, first, last]
+                    else:
+                        entry[0] += count
+                        entry[1] = min(entry[1], first)
+                        entry[2] = max(entry[2], last)
+            return 0
+
+    def stop(self):
+        """Stop the thread after a final flush"""
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+
+_collector = None
+
+
+def get_collector():
+    """The process-wide collector, started on first use"""
+    global _collector
+    if _collector is None:
+        _collector = UnknownBarcodeCollector()
+        _collector.start()
+    return _collector
+
+
+def stop_collector(timeout=5.0):
+    """Flush what is left and stop the collector, if it was started"""
+    if _collector is not None and _collector.is_alive():
+        _collector.stop()
+        _collector.join(timeout)
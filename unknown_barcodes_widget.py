@@ -0,0 +1,195 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView, QComboBox, QCompleter,
+                             QStyledItemDelegate, QMessageBox)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+from query_worker import QueryRunner
+from theme import set_style
+from unknown_barcodes import (attach_barcodes, barcode_conflicts, fetch_unresolved, get_collector,
+                              resolve_barcodes)
+
+PRODUCT_COLUMN = 4
+
+
+class ProductPickerDelegate(QStyledItemDelegate):
+    """Searchable product combo for the Product column; the product id is kept in Qt.UserRole"""
+
+    def __init__(self, products, parent=None):
+        super().__init__(parent)
+        self.products = products            # QStandardItemModel shared by every editor
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.NoInsert)
+        combo.setModel(self.products)
+        combo.completer().setFilterMode(Qt.MatchContains)
+        combo.completer().setCompletionMode(QCompleter.PopupCompletion)
+        return combo
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(max(editor.findData(index.data(Qt.UserRole)), 0))
+
+    def setModelData(self, editor, model, index):
+        product_id = editor.currentData()
+        model.setData(index, editor.currentText() if product_id else "", Qt.DisplayRole)
+        model.setData(index, product_id, Qt.UserRole)
+
+
+class UnknownBarcodesWidget(QWidget):
+    """Review queue of scanned codes that matched no product"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.queries = QueryRunner(self)
+        self.products = QStandardItemModel(self)
+        self.product_barcodes = {}          # product id -> its current barcode
+        self.init_ui()
+        self.load_data()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        header = QHBoxLayout()
+        back_btn = set_style(QPushButton("← Products"), 'nav', 'gray')
+        back_btn.clicked.connect(self.parent.show_product_management)
+        title = QLabel("Unknown Barcodes")
+        title.setStyleSheet("font-size: 28px; font-weight: 700; margin-left: 20px;")
+        attach_btn = set_style(QPushButton("✔ Attach to Products"), 'nav', 'green')
+        attach_btn.clicked.connect(self.attach_chosen)
+        dismiss_btn = set_style(QPushButton("✕ Dismiss Selected"), 'nav', 'red')
+        dismiss_btn.clicked.connect(self.dismiss_selected)
+        refresh_btn = set_style(QPushButton("🔄 Refresh"), 'nav', 'blue')
+        refresh_btn.clicked.connect(self.load_data)
+        header.addWidget(back_btn)
+        header.addWidget(title)
+        header.addStretch()
+        header.addWidget(attach_btn)
+        header.addWidget(dismiss_btn)
+        header.addWidget(refresh_btn)
+
+        self.summary_label = set_style(QLabel(), 'status', 'gray')
+        hint = QLabel("Pick a product for each code (double-click the Product cell), then attach them all at once. "
+                      "Dismiss codes from damaged or foreign labels.")
+        hint.setWordWrap(True)
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Barcode", "Scans", "First Seen", "Last Seen", "Product"])
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked |
+                                   QAbstractItemView.EditKeyPressed)
+        self.table.setAlternatingRowColors(True)
+        self.table.verticalHeader().hide()
+        self.table.setItemDelegateForColumn(PRODUCT_COLUMN, ProductPickerDelegate(self.products, self.table))
+        columns = self.table.horizontalHeader()
+        columns.setSectionResizeMode(QHeaderView.ResizeToContents)
+        columns.setSectionResizeMode(PRODUCT_COLUMN, QHeaderView.Stretch)
+
+        layout.addLayout(header)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(hint)
+        layout.addWidget(self.table)
+
+    def screen_shown(self, hidden_for):
+        """Back on screen: new unknown codes may have been scanned meanwhile"""
+        self.load_data()
+
+    def load_data(self):
+        self.summary_label.setText("Loading…")
+        self.queries.submit('review', self.fetch_review, self.show_review, on_error=self.show_load_error)
+
+    @staticmethod
+    def fetch_review(cursor):
+        # Scans still waiting in the collector belong in the list
+        get_collector().flush()
+        unresolved = fetch_unresolved(cursor)
+        cursor.execute('SELECT id, name, code_bar FROM products ORDER BY name')
+        return unresolved, cursor.fetchall()
+
+    def show_load_error(self, message):
+        self.summary_label.setText("")
+        QMessageBox.warning(self, "Database Error", f"Failed to load unknown barcodes: {message}")
+
+    def show_review(self, result):
+        unresolved, products = result
+        self.products.clear()
+        self.products.appendRow(QStandardItem(""))
+        self.product_barcodes = {}
+        # Products without a barcode are the likely match, so they come first
+        for product_id, name, code in sorted(products, key=lambda p: (bool(p[2]), p[1] or "")):
+            item = QStandardItem(f"{name} — {code}" if code else name)
+            item.setData(product_id, Qt.UserRole)
+            self.products.appendRow(item)
+            self.product_barcodes[product_id] = code
+
+        self.table.setRowCount(0)
+        self.table.setRowCount(len(unresolved))
+        for row, (code, scans, first_seen, last_seen) in enumerate(unresolved):
+            cells = (code, f"{scans:,}", f"{first_seen:%Y-%m-%d %H:%M}", f"{last_seen:%Y-%m-%d %H:%M}", "")
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column != PRODUCT_COLUMN:
+                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                if column == 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        total = sum(scans for _, scans, _, _ in unresolved)
+        self.summary_label.setText(f"{len(unresolved)} unresolved codes, {total:,} scans")
+
+    def assignments(self):
+        """{barcode: product id} for every row given a product"""
+        chosen = {}
+        for row in range(self.table.rowCount()):
+            product_id = self.table.item(row, PRODUCT_COLUMN).data(Qt.UserRole)
+            if product_id:
+                chosen[self.table.item(row, 0).text()] = product_id
+        return chosen
+
+    def selected_codes(self):
+        return [self.table.item(index.row(), 0).text() for index in self.table.selectionModel().selectedRows()]
+
+    def attach_chosen(self):
+        """Attach every code that was given a product, in one transaction"""
+        chosen = self.assignments()
+        if not chosen:
+            QMessageBox.information(self, "Attach", "Choose a product for at least one code first.")
+            return
+        replaced = [code for code, product_id in chosen.items() if self.product_barcodes.get(product_id)]
+        if replaced:
+            reply = QMessageBox.question(
+                self, "Replace Barcodes",
+                f"{len(replaced)} of the chosen products already have a barcode, which will be replaced. Continue?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        self.queries.submit('attach', self.save_assignments, self.show_attached, chosen,
+                            on_error=lambda message: QMessageBox.critical(
+                                self, "Error", f"Failed to attach barcodes: {message}"))
+
+    @staticmethod
+    def save_assignments(cursor, chosen):
+        problems = barcode_conflicts(cursor, chosen)
+        if not problems:
+            attach_barcodes(cursor, chosen)
+        return len(chosen), problems
+
+    def show_attached(self, result):
+        attached, problems = result
+        if problems:
+            QMessageBox.warning(self, "Nothing Attached", "Fix these first:\n\n" + "\n".join(problems))
+            return
+        QMessageBox.information(self, "Success", f"{attached} barcode(s) attached.")
+        self.load_data()
+
+    def dismiss_selected(self):
+        codes = self.selected_codes()
+        if not codes:
+            return
+        reply = QMessageBox.question(self, "Dismiss", f"Remove {len(codes)} code(s) from the review list?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.queries.submit('dismiss', resolve_barcodes, lambda _: self.load_data(), codes)